@@ -1,33 +1,26 @@
-import requests
 from bs4 import BeautifulSoup
 import pandas as pd
 import re
-import time
-from datetime import datetime
-import random
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
+import argparse
+from http_cache import ResponseCache
+from fragment_cache import MISSING, FragmentCache, code_version
+from table_io import BATCH_SIZE, SCHEMAS, ChunkedTableWriter, batched, export_text_dates, read_table
+from normalize import normalize_table
+from parse_pool import ParsePool
+from snapshot_store import SnapshotStore
+from platforms import ListingPage, Platform
+from crawl_scheduler import crawl_platforms
+import run_metrics
 
-def setup_requests_session():
-    """
-    Set up a requests session with retry capability
-    """
-    session = requests.Session()
-    
-    # Configure retry strategy
-    retries = Retry(
-        total=5,
-        backoff_factor=1,
-        status_forcelist=[429, 500, 502, 503, 504],
-        allowed_methods=["GET"]
-    )
-    
-    # Mount the adapter with retry strategy to the session
-    adapter = HTTPAdapter(max_retries=retries)
-    session.mount("http://", adapter)
-    session.mount("https://", adapter)
-    
-    return session
+# Fields filled in from an individual campaign page
+DETAIL_FIELDS = ['Start Date', 'End Date', 'Percentage Completion', 'Number of Donors',
+                 'Amount Raised', 'Target Amount', 'Days Left']
+
+# Pagination block of the campaign list; its links are labelled with page numbers
+PAGINATION_CLASS = 'tcb-pagination'
+
+# Element of each campaign on a list page
+CAMPAIGN_ARTICLE = ('article', 'type-campaigns')
 
 def get_browser_headers():
     """
@@ -42,313 +35,406 @@ def get_browser_headers():
         'Cache-Control': 'max-age=0'
     }
 
-def scrape_campaign_list(url, session=None, timeout=30):
+def parse_campaign_list(content, url, fragments=None):
+    """
+    Extract campaign titles and URLs from a campaign list page
+    """
+    # Parse the HTML content
+    _, campaigns = list_page(content, url, fragments)
+    return campaigns
+
+def parse_first_campaign_list(content, url, fragments=None):
+    """
+    Parse the first list page like parse_campaign_list, also reading how many list
+    pages there are. Returns {'campaigns': [...], 'page_count': pages or None}.
+    """
+    soup, campaigns = list_page(content, url, fragments)
+    return {'campaigns': campaigns, 'page_count': list_page_count(soup)}
+
+def list_page(content, url, fragments=None):
     """
-    Scrape a list of campaign URLs from the main campaigns page
+    Parse a list page. Returns (soup, campaigns).
+    With a FragmentCache, the campaign articles whose HTML is unchanged since an
+    earlier run are cut out of the page before it is parsed and reuse their
+    stored record, so only the changed articles are parsed.
     """
-    if session is None:
-        session = setup_requests_session()
+    split = fragments.split(content, *CAMPAIGN_ARTICLE) if fragments is not None else None
+    if split is not None:
+        cards, rest = split
+        soup = BeautifulSoup(rest, 'html.parser')
+        articles = soup.find_all(CAMPAIGN_ARTICLE[0], class_=CAMPAIGN_ARTICLE[1])
+        if len(articles) == sum(record is MISSING for _, record in cards):
+            return soup, list_page_campaigns(articles, url, cards, fragments)
     
-    print(f"Scraping campaign list from: {url}")
+    soup = BeautifulSoup(content, 'html.parser')
+    return soup, list_page_campaigns(soup.find_all(CAMPAIGN_ARTICLE[0], class_=CAMPAIGN_ARTICLE[1]), url)
+
+def list_page_count(soup):
+    """
+    Highest page number in a list page's pagination, or None when it shows no page numbers
+    """
+    pagination = soup.find(class_=PAGINATION_CLASS)
+    if pagination is None:
+        return None
+    numbers = [int(element.text.strip()) for element in pagination.find_all(['a', 'span'])
+               if element.text.strip().isdigit()]
+    return max(numbers) if numbers else None
+
+def list_page_campaigns(campaign_articles, url, cards=None, fragments=None):
+    """
+    Campaign titles and URLs of the campaign articles of a parsed list page.
+    cards is the page's [(digest, record or MISSING)] from FragmentCache.split(),
+    campaign_articles then holding only the MISSING ones, whose records are
+    added to the FragmentCache.
+    """
+    if cards is None:
+        cards = [(None, MISSING)] * len(campaign_articles)
     
-    try:
-        # Send GET request to the website
-        response = session.get(url, headers=get_browser_headers(), timeout=timeout)
-        
-        # Check if request was successful
-        if response.status_code != 200:
-            print(f"Failed to access the website. Status code: {response.status_code}")
-            return []
-        
-        # Parse the HTML content
-        soup = BeautifulSoup(response.content, 'html.parser')
-        
-        # Find all campaign articles
-        campaign_articles = soup.find_all('article', class_='type-campaigns')
-        
-        if not campaign_articles:
-            print(f"No campaign articles found on {url}")
-            return []
-        
-        print(f"Found {len(campaign_articles)} campaigns on this page")
-        
-        # List to store campaign data
-        campaigns_data = []
+    if not cards:
+        print(f"No campaign articles found on {url}")
+        return []
+    
+    print(f"Found {len(cards)} campaigns on this page")
+    
+    # List to store campaign data
+    campaigns_data = []
+    articles = iter(campaign_articles)
+    
+    # Process each campaign article to extract title and URL
+    for digest, campaign_data in cards:
+        if campaign_data is MISSING:
+            campaign_data = article_campaign(next(articles))
+            if digest is not None:
+                fragments.add(digest, campaign_data)
         
-        # Process each campaign article to extract title and URL
-        for article in campaign_articles:
-            campaign_data = {}
+        if campaign_data['URL']:
+            campaigns_data.append(campaign_data)
+        else:
+            print(f"Skipping campaign with no URL: {campaign_data['Campaign Title']}")
+    
+    return campaigns_data
+
+def article_campaign(article):
+    """
+    Title and URL of one campaign article
+    """
+    campaign_data = {}
+    
+    # Extract campaign title
+    title_element = article.find(class_='thrive-shortcode-content', attrs={'data-shortcode': 'tcb_post_title'})
+    if title_element and title_element.a:
+        campaign_data['Campaign Title'] = title_element.a.text.strip()
+        campaign_data['URL'] = title_element.a.get('href', '')
+    elif title_element:
+        campaign_data['Campaign Title'] = title_element.text.strip()
+        campaign_data['URL'] = ''
+    else:
+        # Try alternative method to find title
+        title_element = article.find('h2')
+        if title_element and title_element.find('a'):
+            campaign_data['Campaign Title'] = title_element.find('a').text.strip()
+            campaign_data['URL'] = title_element.find('a').get('href', '')
+        else:
+            # One more attempt with any link in the article
+            links = article.find_all('a')
+            if links:
+                for link in links:
+                    if link.text.strip():
+                        campaign_data['Campaign Title'] = link.text.strip()
+                        campaign_data['URL'] = link.get('href', '')
+                        break
             
-            # Extract campaign title
-            title_element = article.find(class_='thrive-shortcode-content', attrs={'data-shortcode': 'tcb_post_title'})
-            if title_element and title_element.a:
-                campaign_data['Campaign Title'] = title_element.a.text.strip()
-                campaign_data['URL'] = title_element.a.get('href', '')
-            elif title_element:
-                campaign_data['Campaign Title'] = title_element.text.strip()
+            if 'Campaign Title' not in campaign_data:
+                campaign_data['Campaign Title'] = 'Unknown'
                 campaign_data['URL'] = ''
-            else:
-                # Try alternative method to find title
-                title_element = article.find('h2')
-                if title_element and title_element.find('a'):
-                    campaign_data['Campaign Title'] = title_element.find('a').text.strip()
-                    campaign_data['URL'] = title_element.find('a').get('href', '')
-                else:
-                    # One more attempt with any link in the article
-                    links = article.find_all('a')
-                    if links:
-                        for link in links:
-                            if link.text.strip():
-                                campaign_data['Campaign Title'] = link.text.strip()
-                                campaign_data['URL'] = link.get('href', '')
-                                break
-                    
-                    if 'Campaign Title' not in campaign_data:
-                        campaign_data['Campaign Title'] = 'Unknown'
-                        campaign_data['URL'] = ''
-            
-            if campaign_data['URL']:
-                campaigns_data.append(campaign_data)
-            else:
-                print(f"Skipping campaign with no URL: {campaign_data['Campaign Title']}")
-        
-        return campaigns_data
     
-    except requests.exceptions.Timeout as e:
-        print(f"Timeout error while accessing {url}: {e}")
-        if timeout < 60:
-            print("Retrying with increased timeout...")
-            return scrape_campaign_list(url, session, timeout + 15)
-        return []
-    except requests.exceptions.RequestException as e:
-        print(f"Request error while accessing {url}: {e}")
-        return []
-    except Exception as e:
-        print(f"An error occurred while processing {url}: {e}")
-        return []
+    return campaign_data
 
-def scrape_campaign_details(campaign_url, session=None, timeout=30):
+def parse_campaign_details(content):
     """
-    Scrape detailed information from an individual campaign page
+    Extract dates, progress, donors and amounts from an individual campaign page.
+    Dates and amounts are kept as the page shows them; save_to_excel() types them.
     """
-    if session is None:
-        session = setup_requests_session()
+    # Parse the HTML content
+    soup = BeautifulSoup(content, 'html.parser')
     
-    print(f"Scraping details from: {campaign_url}")
+    # Initialize details dictionary
+    details = {}
     
-    try:
-        # Send GET request to the campaign page
-        response = session.get(campaign_url, headers=get_browser_headers(), timeout=timeout)
-        
-        # Check if request was successful
-        if response.status_code != 200:
-            print(f"Failed to access campaign page. Status code: {response.status_code}")
-            return {}
-        
-        # Parse the HTML content
-        soup = BeautifulSoup(response.content, 'html.parser')
+    # Extract date range
+    class_elements = soup.find_all(class_='tve_shortcode_rendered')
+    date_element = class_elements[1]
+    if date_element and date_element.p:
+        date_text = date_element.p.text.strip()
+        date_match = re.search(r'(\d+\s+\w+\s+\d+)\s+–\s+(\d+\s+\w+\s+\d+)', date_text)
+        if date_match:
+            details['Start Date'] = date_match.group(1)
+            details['End Date'] = date_match.group(2)
+    
+    # Look for progress bar information
+    progress_div = soup.find('div', class_='single-page-progressbar')
+    if progress_div:
+        # Extract percentage
+        percentage_element = progress_div.find('span', class_='percentage-text')
+        if percentage_element:
+            percentage_text = percentage_element.text.strip()
+            percentage_match = re.search(r'(\d+\.?\d*)%', percentage_text)
+            if percentage_match:
+                details['Percentage Completion'] = percentage_match.group(1)
         
-        # Initialize details dictionary
-        details = {}
+        # Extract number of donors
+        donors_element = progress_div.find('div', class_='percentage-backers')
+        if donors_element and donors_element.span:
+            donors_text = donors_element.span.text.strip()
+            donors_match = re.search(r'(\d+)', donors_text)
+            if donors_match:
+                details['Number of Donors'] = int(donors_match.group(1))
         
-        # Extract date range
-        class_elements = soup.find_all(class_='tve_shortcode_rendered')
-        date_element = class_elements[1]
-        if date_element and date_element.p:
-            date_text = date_element.p.text.strip()
-            date_match = re.search(r'(\d+\s+\w+\s+\d+)\s+–\s+(\d+\s+\w+\s+\d+)', date_text)
-            if date_match:
-                details['Start Date'] = date_match.group(1)
-                details['End Date'] = date_match.group(2)
+        # Extract raised and target amounts
+        raised_element = progress_div.find('span', class_='raised-text')
+        if raised_element:
+            raised_text = raised_element.text.strip()
+            amounts_match = re.search(r'\$(\d+(?:,\d+)*(?:\.\d+)?) of \$(\d+(?:,\d+)*(?:\.\d+)?)', raised_text)
+            if amounts_match:
+                details['Amount Raised'] = amounts_match.group(1)
+                details['Target Amount'] = amounts_match.group(2)
         
-        # Look for progress bar information
-        progress_div = soup.find('div', class_='single-page-progressbar')
-        if progress_div:
-            # Extract percentage
-            percentage_element = progress_div.find('span', class_='percentage-text')
-            if percentage_element:
-                percentage_text = percentage_element.text.strip()
-                percentage_match = re.search(r'(\d+\.?\d*)%', percentage_text)
-                if percentage_match:
-                    details['Percentage Completion'] = float(percentage_match.group(1))
-            
-            # Extract number of donors
-            donors_element = progress_div.find('div', class_='percentage-backers')
-            if donors_element and donors_element.span:
-                donors_text = donors_element.span.text.strip()
-                donors_match = re.search(r'(\d+)', donors_text)
-                if donors_match:
-                    details['Number of Donors'] = int(donors_match.group(1))
-            
-            # Extract raised and target amounts
-            raised_element = progress_div.find('span', class_='raised-text')
-            if raised_element:
-                raised_text = raised_element.text.strip()
-                amounts_match = re.search(r'\$(\d+(?:,\d+)*(?:\.\d+)?) of \$(\d+(?:,\d+)*(?:\.\d+)?)', raised_text)
-                if amounts_match:
-                    raised_amount = amounts_match.group(1).replace(',', '')
-                    target_amount = amounts_match.group(2).replace(',', '')
-                    details['Amount Raised'] = float(raised_amount)
-                    details['Target Amount'] = float(target_amount)
-            
-            # Extract days left
-            days_element = progress_div.find('span', class_='days-text')
-            if days_element:
-                days_text = days_element.text.strip()
-                days_match = re.search(r'(\d+) days? left', days_text)
-                if days_match:
-                    details['Days Left'] = int(days_match.group(1))
-                elif 'Campaign has ended' in days_text:
-                    details['Days Left'] = 0
-        
-        return details
+        # Extract days left
+        days_element = progress_div.find('span', class_='days-text')
+        if days_element:
+            days_text = days_element.text.strip()
+            days_match = re.search(r'(\d+) days? left', days_text)
+            if days_match:
+                details['Days Left'] = int(days_match.group(1))
+            elif 'Campaign has ended' in days_text:
+                details['Days Left'] = 0
     
-    except requests.exceptions.Timeout as e:
-        print(f"Timeout error while accessing campaign page: {e}")
-        if timeout < 60:
-            print("Retrying with increased timeout...")
-            return scrape_campaign_details(campaign_url, session, timeout + 15)
-        return {}
-    except requests.exceptions.RequestException as e:
-        print(f"Request error while accessing campaign page: {e}")
+    return details
+
+def load_frozen_campaigns(name="G2C_campaigns", directory='.'):
+    """
+    Return {url: details} for campaigns that had already ended (0 days left) in a
+    previous output table in directory. Their pages no longer change, so they need no new fetch.
+    """
+    previous = read_table(name, directory)
+    if previous is None:
+        print(f"No previous output found for {name}. Scraping every campaign.")
         return {}
-    except Exception as e:
-        print(f"An error occurred while processing campaign page: {e}")
+    
+    if 'Days Left' not in previous.columns:
         return {}
+    
+    # Dates are kept in their text form, as parse_campaign_details returns them
+    ended = export_text_dates(previous[previous['Days Left'] == 0].drop_duplicates('URL'), name)
+    
+    frozen = {}
+    for record in ended.to_dict('records'):
+        frozen[record['URL']] = {
+            field: record[field] for field in DETAIL_FIELDS
+            if field in record and pd.notna(record[field])
+        }
+    return frozen
 
-def scrape_all_campaigns(base_url, max_pages=17):
+class G2CPlatform(Platform):
     """
-    Scrape all campaigns from the list pages, then get details from each campaign page
+    Giving to Children (G2C): one paginated campaign list, whose campaign pages
+    give the dates, progress, donors and amounts. When the first list page shows
+    how many list pages there are, exactly those pages are crawled; otherwise
+    pages are probed up to max_pages, stopping at the first empty one.
     """
-    session = setup_requests_session()
-    all_campaigns = []
-    
-    # First get all campaign URLs from all pages
-    print("Phase 1: Collecting all campaign URLs...")
-    campaign_urls = []
-    
-    # Scrape first page
-    first_page_campaigns = scrape_campaign_list(base_url, session)
-    campaign_urls.extend(first_page_campaigns)
-    
-    # If first page returned results, try the rest
-    if first_page_campaigns:
-        # Scrape remaining pages
-        for page_num in range(2, max_pages + 1):
-            page_url = f"{base_url}page/{page_num}/"
-            page_campaigns = scrape_campaign_list(page_url, session)
-            
-            # If no campaigns found, we might have reached the end
-            if not page_campaigns:
-                print(f"No campaigns found on page {page_num}, might be the last page")
-                break
-            
-            campaign_urls.extend(page_campaigns)
-            
-            # Be respectful to the server
-            sleep_time = 0.5
-            print(f"Waiting {sleep_time:.2f} seconds before next request...")
-            time.sleep(sleep_time)
+    name = 'g2c'
+    table = 'G2C_campaigns'
+    headers = get_browser_headers()
+    requests_per_second = 2.0
+    timeout = 30
     
-    print(f"Total campaigns found: {len(campaign_urls)}")
+    def __init__(self, base_url="https://www.childrensociety.org.sg/g2c/campaigns/", max_pages=17):
+        # List pages are {base_url}page/N/
+        self.base_url = base_url.rstrip('/') + '/'
+        self.max_pages = max_pages
     
-    # Now get details for each campaign
-    print("\nPhase 2: Collecting details for each campaign...")
-    for i, campaign in enumerate(campaign_urls):
-        print(f"Processing campaign {i+1}/{len(campaign_urls)}: {campaign['Campaign Title']}")
-        
-        if not campaign['URL']:
-            print("  No URL available, skipping details extraction")
-            all_campaigns.append(campaign)
-            continue
-        
-        # Get campaign details
-        details = scrape_campaign_details(campaign['URL'], session)
-        
-        # Merge campaign basic info with details
-        complete_data = {**campaign, **details}
+    def page_url(self, page_num):
+        return self.base_url if page_num == 1 else f"{self.base_url}page/{page_num}/"
+    
+    def listing_pages(self):
+        return [ListingPage(self.base_url, (0, 1), {})]
+    
+    def parse_listing(self, content, page, fragments=None):
+        if page.key[1] == 1:
+            return parse_first_campaign_list(content, page.url, fragments)
+        return {'campaigns': parse_campaign_list(content, page.url, fragments), 'page_count': None}
+    
+    def next_pages(self, page, listing):
+        page_num = page.key[1]
+        if page_num == 1 and listing['page_count'] is not None:
+            print(f"The first list page lists {listing['page_count']} as the last page")
+            return [ListingPage(self.page_url(number), (0, number), {})
+                    for number in range(2, listing['page_count'] + 1)]
         
-        # Add to all campaigns list
-        all_campaigns.append(complete_data)
+        if page_num == 1:
+            if not listing['campaigns']:
+                return []
+            print(f"No page count on the first list page; probing up to page {self.max_pages}")
+        elif not page.context.get('probe'):
+            return []
+        elif not listing['campaigns']:
+            print(f"No campaigns found on page {page_num}, might be the last page")
+            return []
         
-        # Be respectful to the server
-        if i < len(campaign_urls) - 1:  # No need to wait after the last campaign
-            sleep_time = 0.5
-            print(f"Waiting {sleep_time:.2f} seconds before next request...")
-            time.sleep(sleep_time)
+        if page_num >= self.max_pages:
+            return []
+        return [ListingPage(self.page_url(page_num + 1), (0, page_num + 1), {'probe': True})]
+    
+    def detail_url(self, campaign):
+        return campaign['URL'] or None
+    
+    def parse_detail(self, content):
+        return parse_campaign_details(content)
     
-    return all_campaigns
+    def frozen_details(self, directory='.'):
+        frozen = load_frozen_campaigns(self.table, directory)
+        if frozen:
+            print(f"Reusing details for {len(frozen)} ended campaigns from the previous run")
+        return frozen
+    
+    def save(self, campaigns, details, excel=True, batch_size=BATCH_SIZE, directory='.'):
+        return save_to_excel(self.records(campaigns, details), self.table, excel, batch_size, directory)
+
+def scrape_all_campaigns(base_url, max_pages=17, workers=1, requests_per_second=2.0, cache=None, max_rate=None,
+                         excel=True, parse_pool=None, output_dir='.', resume=False, restart=False, incremental=False,
+                         fragments=None, snapshots=None):
+    """
+    Crawl the campaign list and every campaign page with a CrawlScheduler and
+    save the full records, in list order, as G2C_campaigns in output_dir.
+    Up to `workers` pages are fetched at a time (1 fetches one page at a time),
+    so the list and detail crawls overlap. Requests start at
+    requests_per_second and adapt to the server's responses.
+    Each campaign's details are journaled as soon as they are scraped; with
+    resume=True the campaigns already in the journal of an interrupted run are
+    not fetched again, and with restart=True that journal is discarded instead.
+    With incremental=True, campaigns that had ended in the previous output
+    (see load_frozen_campaigns) reuse their previous details.
+    With a FragmentCache, only the list page articles that changed are parsed.
+    With a ParsePool, the other pages are parsed in its worker processes.
+    Pass a SnapshotStore to append the saved table to its history.
+    Returns True if the table was saved.
+    """
+    platform = G2CPlatform(base_url, max_pages)
+    saved = crawl_platforms([platform], max(workers, 1), cache, requests_per_second, max_rate, excel, parse_pool,
+                            output_dir, resume, restart, incremental, {platform.name: fragments}, snapshots)
+    return bool(saved and saved[platform.name])
+
+# Completion ranges reported after saving
+PCT_RANGES = [
+    (0, 25, 'Less than 25%'),
+    (25, 50, '25% to 50%'),
+    (50, 75, '50% to 75%'),
+    (75, 100, '75% to 100%'),
+    (100, float('inf'), 'Over 100%')
+]
 
-def save_to_excel(campaigns, filename="G2C_campaigns.xlsx"):
+def save_to_excel(campaigns, name="G2C_campaigns", excel=True, batch_size=BATCH_SIZE, directory='.'):
     """
-    Save the campaign data to an Excel file
+    Save the campaign data as {name}.parquet in directory, plus an Excel export unless excel=False.
+    campaigns can be any iterable of records, such as G2CPlatform.records(); it is
+    written in batches of batch_size records as they arrive, so the table is
+    never held in memory as a whole. Each batch is typed by normalize_table().
     """
-    if not campaigns:
+    columns = list(SCHEMAS.get(name, {})) or None
+    total_raised = 0.0
+    pct_counts = [0] * len(PCT_RANGES)
+    
+    with ChunkedTableWriter(name, excel=excel, directory=directory, columns=columns) as writer:
+        for batch in batched(campaigns, batch_size):
+            df = normalize_table(pd.DataFrame(batch, columns=columns), name)
+            writer.write(df)
+            
+            # Summary figures, accumulated batch by batch
+            total_raised += df['Amount Raised'].sum()
+            for i, (lower, upper, _) in enumerate(PCT_RANGES):
+                pct_counts[i] += ((df['Percentage Completion'] >= lower) & (df['Percentage Completion'] < upper)).sum()
+    
+    if not writer.rows:
         print("No campaign data to save")
         return False
     
-    # Convert to DataFrame
-    df = pd.DataFrame(campaigns)
+    if not writer.saved:
+        return False
     
-    # Save to Excel
-    try:
-        df.to_excel(filename, index=False)
-        print(f"Data successfully saved to {filename}")
-        print(f"Total campaigns scraped: {len(df)}")
-        
-        # Print a summary of the data
-        print("\nData Summary:")
-        print(f"- Number of campaigns: {len(df)}")
-        
-        # Calculate total amount raised
-        if 'Amount Raised' in df.columns:
-            numeric_amounts = pd.to_numeric(df['Amount Raised'], errors='coerce')
-            total_raised = numeric_amounts.sum()
-            print(f"- Total amount raised: ${total_raised:,.2f}")
-        
-        # Show the number of campaigns by percentage completion ranges
-        if 'Percentage Completion' in df.columns:
-            numeric_pct = pd.to_numeric(df['Percentage Completion'], errors='coerce')
-            pct_ranges = [
-                (0, 25, 'Less than 25%'),
-                (25, 50, '25% to 50%'),
-                (50, 75, '50% to 75%'),
-                (75, 100, '75% to 100%'),
-                (100, float('inf'), 'Over 100%')
-            ]
-            
-            print("- Campaigns by completion percentage:")
-            for lower, upper, label in pct_ranges:
-                count = ((numeric_pct >= lower) & (numeric_pct < upper)).sum()
-                print(f"  {label}: {count}")
-        
-        return True
-    except Exception as e:
-        print(f"Error saving to Excel: {e}")
-        # Try saving as CSV as fallback
-        try:
-            csv_filename = filename.replace('.xlsx', '.csv')
-            df.to_csv(csv_filename, index=False)
-            print(f"Data saved as CSV instead: {csv_filename}")
-            return True
-        except Exception as csv_e:
-            print(f"Error saving as CSV: {csv_e}")
-            return False
+    print(f"Total campaigns scraped: {writer.rows}")
+    
+    # Print a summary of the data
+    print("\nData Summary:")
+    print(f"- Number of campaigns: {writer.rows}")
+    print(f"- Total amount raised: ${total_raised:,.2f}")
+    
+    # Show the number of campaigns by percentage completion ranges
+    print("- Campaigns by completion percentage:")
+    for (_, _, label), count in zip(PCT_RANGES, pct_counts):
+        print(f"  {label}: {count}")
+    
+    return True
 
 def main():
-    # Base URL of the charity website
-    base_url = "https://www.childrensociety.org.sg/g2c/campaigns/"
+    parser = argparse.ArgumentParser(description="Scrape G2C campaigns")
+    parser.add_argument('--workers', type=int, default=0,
+                        help="number of concurrent page fetches (0 or 1 fetches one page at a time)")
+    parser.add_argument('--rate', type=float, default=2.0,
+                        help="requests per second to start from; the rate then adapts to the server's responses")
+    parser.add_argument('--max-rate', type=float,
+                        help="highest requests per second the rate may climb to (default 4x --rate)")
+    parser.add_argument('--incremental', action='store_true',
+                        help="reuse details of campaigns that had ended in the previous G2C_campaigns output")
+    parser.add_argument('--no-excel', dest='excel', action='store_false',
+                        help="only write Parquet output, without the Excel export")
+    parser.add_argument('--resume', action='store_true',
+                        help="continue an interrupted run, skipping the campaigns already in its journal")
+    parser.add_argument('--restart', action='store_true',
+                        help="discard the journal of an interrupted run and scrape every campaign again")
+    parser.add_argument('--output-dir', default='.',
+                        help="directory to write G2C_campaigns and its journal to")
+    parser.add_argument('--snapshot-db',
+                        help="SQLite file to append this run's campaign progress to (see snapshot_store.py)")
+    parser.add_argument('--base-url', default="https://www.childrensociety.org.sg/g2c/campaigns/",
+                        help="URL of the first campaign list page")
+    parser.add_argument('--cache-dir', help="directory for the on-disk HTTP response cache (disabled if omitted)")
+    parser.add_argument('--cache-ttl', type=float, default=0,
+                        help="seconds a cached page is used without revalidating it with the server")
+    parser.add_argument('--fragment-cache',
+                        help="JSON file of the records of earlier runs' campaign list articles by hash, so only "
+                             "changed articles are parsed (disabled if omitted)")
+    parser.add_argument('--parse-workers', type=int, default=0,
+                        help="processes to parse pages in (0 parses them on the fetching threads)")
+    parser.add_argument('--metrics', action='store_true',
+                        help="time every request, parse, save and sleep and print a summary at the end")
+    parser.add_argument('--trace', help="JSON-lines file to write every timed event to (implies --metrics)")
+    args = parser.parse_args()
+    
+    if args.metrics or args.trace:
+        run_metrics.enable(args.trace)
+    
+    cache = ResponseCache(args.cache_dir, ttl=args.cache_ttl) if args.cache_dir else None
+    fragments = FragmentCache(args.fragment_cache, code_version(__file__)) if args.fragment_cache else None
+    parse_pool = ParsePool(args.parse_workers) if args.parse_workers else None
+    snapshots = SnapshotStore(args.snapshot_db) if args.snapshot_db else None
     
     print("Starting comprehensive charity campaign scraper...")
     
-    # Scrape all campaigns from all pages
-    all_campaigns = scrape_all_campaigns(base_url)
+    # Every campaign is journaled as soon as it is scraped, and streamed into the output in list order
+    try:
+        scrape_all_campaigns(args.base_url, workers=args.workers, requests_per_second=args.rate, cache=cache,
+                             max_rate=args.max_rate, excel=args.excel, parse_pool=parse_pool, output_dir=args.output_dir,
+                             resume=args.resume, restart=args.restart, incremental=args.incremental,
+                             fragments=fragments, snapshots=snapshots)
+    finally:
+        if snapshots is not None:
+            snapshots.close()
+        if parse_pool is not None:
+            parse_pool.close()
+    if parse_pool is not None:
+        parse_pool.print_summary()
     
-    # Save to Excel
-    if all_campaigns:
-        save_to_excel(all_campaigns)
-    else:
-        print("No campaigns were scraped")
+    run_metrics.finish()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,113 +1,249 @@
 import pandas as pd
-import requests
 from bs4 import BeautifulSoup
 import re
-import time
-from datetime import datetime
-import os
+import argparse
+from http_cache import ResponseCache
+from table_io import BATCH_SIZE, export_text_dates, read_table, write_table
+from normalize import days_active, run_timestamp
+from parse_pool import ParsePool
+from snapshot_store import SnapshotStore
+from crawl_scheduler import crawl_platforms
+import RoH_scraper
+import run_metrics
 
-def scrape_campaign_details():
+# Headers for request
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+# Columns added to the unique campaigns by this scraper
+DETAIL_COLUMNS = ['Start Date', 'Number of Donors', 'Days Active']
+
+def parse_campaign_page(content):
     """
-    Reads the unique campaigns Excel file and scrapes additional details from each campaign page
+    Extract the start date and number of donors from a campaign page
     """
-    # Check if the unique campaigns file exists
-    if not os.path.exists('ray_of_hope_campaigns_unique.xlsx'):
-        print("Error: Could not find ray_of_hope_campaigns_unique.xlsx")
-        if os.path.exists('ray_of_hope_campaigns_unique.csv'):
-            print("Found CSV version instead. Using that.")
-            unique_campaigns = pd.read_csv('ray_of_hope_campaigns_unique.csv')
-        else:
-            print("No campaign data found. Please run the main scraper first.")
-            return
-    else:
-        # Load the unique campaigns file
-        unique_campaigns = pd.read_excel('ray_of_hope_campaigns_unique.xlsx')
+    details = {}
+    
+    # Parse the HTML content
+    soup = BeautifulSoup(content, 'html.parser')
+    
+    # Extract start date
+    start_date_elem = soup.find('div', class_='wpneo-campaign-date')
+    if start_date_elem:
+        # Extract date string from "Started on DD/MM/YYYY"
+        date_match = re.search(r'Started on (\d{2}/\d{2}/\d{4})', start_date_elem.text)
+        if date_match:
+            details['Start Date'] = date_match.group(1)
+    
+    # Extract number of donors
+    donors_elem = soup.find('span', class_='info-text percentage-completed')
+    if donors_elem:
+        # Extract number from "From XX Donors"
+        donors_match = re.search(r'From (\d+) Donors?', donors_elem.text)
+        if donors_match:
+            details['Number of Donors'] = int(donors_match.group(1))
+    
+    return details
+
+def merge_details(campaigns, results, run_time=None):
+    """
+    Join the per-URL detail results onto the campaigns DataFrame in one pass.
+    Days Active is counted from each start date to the day of run_time (default
+    now; see normalize.run_timestamp), for all campaigns at once.
+    Kept out of parse_campaign_page so cached parse results never go stale.
+    """
+    details_df = pd.DataFrame.from_dict(results, orient='index', columns=DETAIL_COLUMNS)
+    details_df['Number of Donors'] = details_df['Number of Donors'].astype('Int64')
+    details_df['Days Active'] = days_active(details_df['Start Date'],
+                                            run_time if run_time is not None else run_timestamp())
+    
+    campaigns = campaigns.drop(columns=DETAIL_COLUMNS, errors='ignore')
+    return campaigns.join(details_df, on='URL')
+
+def load_frozen_details(unique_campaigns=None, directory='.'):
+    """
+    Return {url: details} from the previous detailed output in directory for campaigns that were
+    already closed (0 days to go) when last scraped, and, given the unique campaigns, are still closed now.
+    Their start date and donor count can no longer change, so they need no new fetch.
+    """
+    previous = read_table('ray_of_hope_campaigns_detailed', directory)
+    if previous is None:
+        print("No previous detailed output found. Scraping every campaign.")
+        return {}
     
-    print(f"Loaded {len(unique_campaigns)} unique campaigns. Starting to scrape additional details...")
+    if not set(DETAIL_COLUMNS).issubset(previous.columns):
+        return {}
     
-    # Headers for request
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+    # Start dates are kept in their scraped DD/MM/YYYY text, as parse_campaign_page returns them
+    previous = export_text_dates(previous, 'ray_of_hope_campaigns_detailed')
+    
+    frozen = previous[
+        (previous['Days to Go'] == 0)
+        & previous['Start Date'].notna()
+        & previous['Number of Donors'].notna()
+    ].drop_duplicates('URL')
+    if unique_campaigns is not None:
+        frozen = frozen[frozen['URL'].isin(unique_campaigns.loc[unique_campaigns['Days to Go'] == 0, 'URL'])]
+    
+    return {
+        url: {'Start Date': str(start_date), 'Number of Donors': int(donors)}
+        for url, start_date, donors in zip(frozen['URL'], frozen['Start Date'], frozen['Number of Donors'])
     }
+
+class RoHDetailPlatform(RoH_scraper.RoHPlatform):
+    """
+    Ray of Hope campaign pages, which give the start date and donor count of the
+    unique campaigns. With input_dir the campaigns are those of the unique
+    campaigns table saved there by RoH_scraper.py; otherwise the listings are
+    crawled too, and written as RoH_scraper.py writes them.
+    Days Active is counted to run_time (default: when the crawl starts).
+    """
+    table = 'ray_of_hope_campaigns_detailed'
+    headers = HEADERS
+    requests_per_second = 10.0
+    details = True
     
-    # Add new columns for the additional details
-    unique_campaigns['Start Date'] = None
-    unique_campaigns['Number of Donors'] = None
-    unique_campaigns['Days Active'] = None  # Calculate days from start to now or end
+    def __init__(self, parser='html.parser', input_dir=None, run_time=None):
+        super().__init__(parser)
+        self.input_dir = input_dir
+        self.run_time = run_time if run_time is not None else run_timestamp()
     
-    # Counter for progress reporting
-    total = len(unique_campaigns)
-    count = 0
+    def listing_pages(self):
+        return [] if self.input_dir is not None else super().listing_pages()
     
-    # Process each campaign URL
-    for index, row in unique_campaigns.iterrows():
-        count += 1
-        url = row['URL']
-        
-        if url == "Unknown" or pd.isna(url):
-            print(f"Skipping campaign with unknown URL: {row['Title']}")
-            continue
+    def known_campaigns(self):
+        if self.input_dir is None:
+            return []
         
-        print(f"[{count}/{total}] Scraping details for: {row['Title']}")
+        # Read again when saving, so the platform stays small enough to send to a ParsePool
+        unique_campaigns = read_table('ray_of_hope_campaigns_unique', self.input_dir)
+        print(f"Loaded {len(unique_campaigns)} unique campaigns. Starting to scrape additional details...")
+        for title, url in zip(unique_campaigns['Title'], unique_campaigns['URL']):
+            if self.detail_url({'URL': url}) is None:
+                print(f"Skipping campaign with unknown URL: {title}")
+        return unique_campaigns.to_dict('records')
+    
+    def detail_url(self, campaign):
+        url = campaign['URL']
+        return url if isinstance(url, str) and url and url != "Unknown" else None
+    
+    def parse_detail(self, content):
+        return parse_campaign_page(content)
+    
+    def frozen_details(self, directory='.'):
+        return load_frozen_details(directory=directory)
+    
+    def ended(self, campaign):
+        # 'Days to Go' is a number in the unique campaigns table and text like "0 Days to go" on a listing page
+        days = re.search(r'\d+', str(campaign.get('Days to Go', '')))
+        return days is not None and int(days.group()) == 0
+    
+    def save(self, campaigns, details, excel=True, batch_size=BATCH_SIZE, directory='.'):
+        """
+        Write the unique campaigns joined with their details as the detailed table;
+        without input_dir the listing tables are written first (see RoH_scraper.save_to_excel)
+        """
+        if self.input_dir is None:
+            unique_campaigns = RoH_scraper.save_to_excel(campaigns, excel, batch_size, directory=directory)
+            if not len(unique_campaigns):
+                return False
+        else:
+            # The unique campaigns are only listed to queue their pages
+            for _ in campaigns:
+                pass
+            unique_campaigns = read_table('ray_of_hope_campaigns_unique', self.input_dir)
         
-        try:
-            # Add a delay to be respectful to the server
-            time.sleep(0.1)
-            
-            # Send GET request to the campaign page
-            response = requests.get(url, headers=headers, timeout=10)
-            
-            if response.status_code != 200:
-                print(f"  Error: Failed to retrieve page (Status code: {response.status_code})")
-                continue
-            
-            # Parse the HTML content
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Extract start date
-            start_date_elem = soup.find('div', class_='wpneo-campaign-date')
-            if start_date_elem:
-                # Extract date string from "Started on DD/MM/YYYY"
-                date_match = re.search(r'Started on (\d{2}/\d{2}/\d{4})', start_date_elem.text)
-                if date_match:
-                    start_date_str = date_match.group(1)
-                    unique_campaigns.at[index, 'Start Date'] = start_date_str
-                    
-                    # Calculate days active
-                    try:
-                        start_date = datetime.strptime(start_date_str, '%d/%m/%Y')
-                        today = datetime.now()
-                        days_active = (today - start_date).days
-                        unique_campaigns.at[index, 'Days Active'] = days_active
-                    except Exception as e:
-                        print(f"  Error parsing date: {e}")
-            
-            # Extract number of donors
-            donors_elem = soup.find('span', class_='info-text percentage-completed')
-            if donors_elem:
-                # Extract number from "From XX Donors"
-                donors_match = re.search(r'From (\d+) Donors?', donors_elem.text)
-                if donors_match:
-                    num_donors = int(donors_match.group(1))
-                    unique_campaigns.at[index, 'Number of Donors'] = num_donors
-            
-            print(f"  Successfully scraped details for {row['Title']}")
-            
-        except Exception as e:
-            print(f"  Error processing {url}: {e}")
-    
-    # Save the updated data
-    try:
-        unique_campaigns.to_excel('ray_of_hope_campaigns_detailed.xlsx', index=False)
-        print(f"Detailed campaign data saved to ray_of_hope_campaigns_detailed.xlsx")
-    except Exception as e:
-        print(f"Error saving Excel file: {e}")
-        unique_campaigns.to_csv('ray_of_hope_campaigns_detailed.csv', index=False)
-        print("Detailed campaign data saved to ray_of_hope_campaigns_detailed.csv instead")
-    
-    return unique_campaigns
+        # Days Active is recomputed for every campaign, including those from an earlier run
+        unique_campaigns = merge_details(unique_campaigns, details, self.run_time)
+        return write_table(unique_campaigns, self.table, excel=excel, directory=directory)
+
+def scrape_campaign_details(workers=1, requests_per_second=10.0, cache=None, incremental=False, excel=True,
+                            snapshots=None, max_rate=None, resume=False, input_dir='.', run_time=None, parse_pool=None,
+                            restart=False, output_dir='.'):
+    """
+    Reads the unique campaigns table from input_dir and scrapes additional details
+    from each campaign page with a CrawlScheduler.
+    Requests start at requests_per_second and adapt to the server's responses, up
+    to max_rate (see AdaptiveThrottle). With workers > 1 up to that many pages are
+    fetched at a time. Pass a ResponseCache to reuse pages from earlier runs.
+    With incremental=True, closed campaigns are taken from the previous detailed output
+    and only new or still active campaigns are fetched.
+    The result is written to output_dir as Parquet, plus an Excel export unless excel=False.
+    Pass a SnapshotStore to append the donor counts to its history.
+    Each campaign's details are journaled in output_dir as soon as they are
+    scraped; with resume=True the campaigns already in the journal of an
+    interrupted run are not fetched again, and with restart=True that journal is
+    discarded instead (see crawl_scheduler.crawl_platforms).
+    Days Active is counted to run_time (default: when the run started).
+    Pass a ParsePool to parse the pages in worker processes, so parsing does not
+    hold up the fetching threads.
+    Returns the detailed DataFrame, or None if it was not written.
+    """
+    if read_table('ray_of_hope_campaigns_unique', input_dir) is None:
+        print(f"Error: Could not find ray_of_hope_campaigns_unique (.parquet, .xlsx or .csv) in {input_dir}")
+        print("No campaign data found. Please run the main scraper first.")
+        return
+    
+    platform = RoHDetailPlatform(input_dir=input_dir, run_time=run_time)
+    saved = crawl_platforms([platform], max(workers, 1), cache, requests_per_second, max_rate, excel, parse_pool,
+                            output_dir, resume, restart, incremental, snapshots=snapshots)
+    
+    if not saved or not saved[platform.name]:
+        return None
+    return read_table(platform.table, output_dir)
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scrape details for each unique Ray of Hope campaign")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="number of concurrent page fetches (1 fetches one page at a time)")
+    parser.add_argument('--rate', type=float, default=10.0,
+                        help="requests per second to start from; the rate then adapts to the server's responses")
+    parser.add_argument('--max-rate', type=float,
+                        help="highest requests per second the rate may climb to (default 4x --rate)")
+    parser.add_argument('--no-excel', dest='excel', action='store_false',
+                        help="only write Parquet output, without the Excel export")
+    parser.add_argument('--incremental', action='store_true',
+                        help="only fetch new or active campaigns, reusing closed ones from the previous detailed output")
+    parser.add_argument('--resume', action='store_true',
+                        help="continue an interrupted run, skipping the campaigns already in its journal")
+    parser.add_argument('--restart', action='store_true',
+                        help="discard the journal of an interrupted run and scrape every campaign again")
+    parser.add_argument('--snapshot-db',
+                        help="SQLite file to append this run's campaign progress to (see snapshot_store.py)")
+    parser.add_argument('--input-dir', default='.',
+                        help="directory holding ray_of_hope_campaigns_unique from RoH_scraper.py")
+    parser.add_argument('--output-dir', default='.',
+                        help="directory to write ray_of_hope_campaigns_detailed and its journal to")
+    parser.add_argument('--parse-workers', type=int, default=0,
+                        help="processes to parse pages in (0 parses them on the fetching threads)")
+    parser.add_argument('--run-date', help="date Days Active is counted to (default: today)")
+    parser.add_argument('--cache-dir', help="directory for the on-disk HTTP response cache (disabled if omitted)")
+    parser.add_argument('--cache-ttl', type=float, default=0,
+                        help="seconds a cached page is used without revalidating it with the server")
+    parser.add_argument('--metrics', action='store_true',
+                        help="time every request, parse, save and sleep and print a summary at the end")
+    parser.add_argument('--trace', help="JSON-lines file to write every timed event to (implies --metrics)")
+    args = parser.parse_args()
+    
+    if args.metrics or args.trace:
+        run_metrics.enable(args.trace)
+    
+    cache = ResponseCache(args.cache_dir, ttl=args.cache_ttl) if args.cache_dir else None
+    snapshots = SnapshotStore(args.snapshot_db) if args.snapshot_db else None
+    parse_pool = ParsePool(args.parse_workers) if args.parse_workers else None
+    
     print("Starting to scrape additional campaign details...")
-    campaign_data = scrape_campaign_details()
-    print("Scraping completed.")
\ No newline at end of file
+    try:
+        campaign_data = scrape_campaign_details(args.workers, args.rate, cache, args.incremental, args.excel, snapshots,
+                                                args.max_rate, args.resume, args.input_dir, run_timestamp(args.run_date),
+                                                parse_pool, args.restart, args.output_dir)
+    finally:
+        if snapshots is not None:
+            snapshots.close()
+        if parse_pool is not None:
+            parse_pool.close()
+    if parse_pool is not None:
+        parse_pool.print_summary()
+    print("Scraping completed.")
+    run_metrics.finish()
\ No newline at end of file
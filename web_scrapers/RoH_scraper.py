@@ -1,397 +1,757 @@
-import requests
 from bs4 import BeautifulSoup
-import csv
 import re
-import time
 import pandas as pd
-import os
-
-def scrape_ray_of_hope():
-    # Categories to scrape
-    categories = [
-        'children-12-years-and-below', 
-        'chronic-illness', 
-        'disability', 
-        'ex-offenders', 
-        'families-in-need', 
-        'mental-health', 
-        'migrant-workers', 
-        'other-marginalised-communities', 
-        'seniors', 
-        'youth-from-13-to-21-years'
-    ]
-    
-    # Add the giving circles as a special URL
-    giving_circles_url = "https://rayofhope.sg/campaigns/4-giving-circles/"
-    
-    # Headers for request
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-    }
-    
-    # Store all campaign data (including duplicates)
-    all_campaigns = []
-    
-    # First process regular categories
-    for category in categories:
-        print(f"Scraping category: {category}")
-        
-        # Process each page until no more campaigns are found or we hit the max
-        page_num = 1
-        max_pages = 6
+import argparse
+import math
+from collections import namedtuple
+from http_cache import ResponseCache
+from fragment_cache import MISSING, FragmentCache, code_version
+from table_io import BATCH_SIZE, ChunkedTableWriter, batched, read_table, write_table
+from platforms import ListingPage, Platform
+from crawl_scheduler import crawl_platforms
+from normalize import normalize_roh_listing
+from parse_pool import ParsePool
+from snapshot_store import SnapshotStore
+import run_metrics
+
+# lxml is optional; it is only needed for the faster 'lxml' listing parser
+try:
+    from lxml import etree
+    import lxml.html
+except ImportError:
+    lxml = None
+
+# Categories to scrape
+CATEGORIES = [
+    'children-12-years-and-below', 
+    'chronic-illness', 
+    'disability', 
+    'ex-offenders', 
+    'families-in-need', 
+    'mental-health', 
+    'migrant-workers', 
+    'other-marginalised-communities', 
+    'seniors', 
+    'youth-from-13-to-21-years'
+]
+
+# Root of the site; can point at a mirror or a local fixture server (see bench_scrapers.py)
+SITE_URL = "https://rayofhope.sg"
+
+# Listing pages scraped once after the categories: (path under SITE_URL, source category, name used in messages)
+SPECIAL_PAGES = [
+    ("campaigns/4-giving-circles/", '4-giving-circles', '4-giving-circles'),
+    ("campaigns/", 'main_page', 'main campaigns page'),
+]
+
+# Every value 'Source Category' can take, in crawl order. Positions in this list are
+# the category codes of the campaign/category link table.
+SOURCE_CATEGORIES = CATEGORIES + [source_cat for _, source_cat, _ in SPECIAL_PAGES]
+
+# Pages probed per category when page 1 does not say how many there are
+MAX_PAGES = 6
+
+# Column types set by normalize_roh_listing()
+NORMALIZED_DTYPES = {
+    'Days to Go': 'Int64',
+    'Amount Raised': 'float64',
+    'Target Amount': 'float64',
+    'Completion Percentage': 'float64'
+}
+
+# Headers for request
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+def get_category_page_url(category, page_num):
+    """
+    Build the listing URL for a category page
+    """
+    if page_num == 1:
+        return f"{SITE_URL}/product-tag/{category}/"
+    return f"{SITE_URL}/product-tag/{category}/page/{page_num}/"
+
+# Listing page parsers selectable with --parser
+LISTING_PARSERS = ['html.parser', 'lxml']
+
+# Amounts are shown as e.g. "S$1,234.50"
+AMOUNT_PATTERN = re.compile(r'S\$(\d+(?:,\d+)*(?:\.\d+)?)')
+NO_PRODUCTS_PATTERN = re.compile("No products were found")
+
+# Marks a field without which the campaign post is skipped
+REQUIRED = object()
+
+# Container of one campaign on a listing page, and the div inside it holding title and categories
+POST_CONTAINER = ('div', 'themeum-campaign-post')
+POST_CONTENT = ('div', 'themeum-campaign-post-content')
+
+# WooCommerce pagination widget, whose page-numbers links and spans are labelled with
+# their page numbers, and the result count ("Showing 1–12 of 40 results")
+PAGINATION = ('nav', 'woocommerce-pagination')
+PAGE_NUMBER = 'page-numbers'
+RESULT_COUNT = ('p', 'woocommerce-result-count')
+RESULT_TOTAL_PATTERN = re.compile(r'(?:of|all) ([\d,]+) results')
+
+# Field specs for a campaign post, in output column order:
+# (column, search from 'post' or 'content', path of (tag, class) steps, how to read the element, default)
+# Each step finds the first matching descendant of the previous one, like BeautifulSoup's find().
+CAMPAIGN_FIELDS = [
+    ('Title', 'content', [('h3', 'entry-title')], 'text', REQUIRED),
+    ('Days to Go', 'post', [('div', 'roh-days-to-go')], 'text', "No days information found"),
+    ('Amount Raised', 'post', [('div', 'progressbar-content-wrapper'), ('span', 'woocommerce-Price-amount')],
+     'amount', "Unknown"),
+    ('Target Amount', 'post', [('div', 'progressbar-content-wrapper'), ('div', 'thm-funding-goal'),
+                               ('span', 'woocommerce-Price-amount')], 'amount', "Unknown"),
+    ('Categories', 'content', [('span', 'entry-category')], 'links', ''),
+    ('URL', 'content', [('h3', 'entry-title'), ('a', None)], 'href', "Unknown"),
+]
+
+# Spec of the URL field, read first to tell whether a post's campaign was already parsed
+URL_FIELD = next(field for field in CAMPAIGN_FIELDS if field[0] == 'URL')
+
+# Result of parsing one listing page
+ParsedListing = namedtuple('ParsedListing', ['campaigns', 'post_count', 'no_products', 'page_count'])
+
+def class_xpath(tag, class_name, first=True):
+    """
+    XPath for descendant tags carrying class_name, matching like BeautifulSoup's
+    find(tag, class_=...) (first=True) or find_all(tag, class_=...)
+    """
+    xpath = f"descendant::{tag}"
+    if class_name is not None:
+        xpath += f"[contains(concat(' ', normalize-space(@class), ' '), ' {class_name} ')]"
+    return xpath + "[1]" if first else xpath
+
+def listing_page_count(page_labels, result_count, post_count):
+    """
+    Number of pages of a listing, from the labels of its pagination widget (the
+    highest page number) or else its result count text and posts per page.
+    None when the page shows neither, so the pages have to be probed.
+    """
+    numbers = [int(label.strip()) for label in page_labels if label.strip().isdigit()]
+    if numbers:
+        return max(numbers)
+    
+    if result_count is not None:
+        if 'single result' in result_count:
+            return 1
+        total_match = RESULT_TOTAL_PATTERN.search(result_count)
+        if total_match and post_count:
+            return max(1, math.ceil(int(total_match.group(1).replace(',', '')) / post_count))
+    return None
+
+class SoupBackend:
+    """
+    Runs the field specs on a BeautifulSoup html.parser tree
+    """
+    def load(self, html, cut_posts=0):
+        soup = BeautifulSoup(html, 'html.parser')
+        # Check if no campaigns found using string instead of text (to fix the deprecation warning)
+        no_products = soup.find(string=NO_PRODUCTS_PATTERN) is not None
+        posts = soup.find_all(POST_CONTAINER[0], class_=POST_CONTAINER[1])
         
-        while page_num <= max_pages:
-            if page_num == 1:
-                url = f"https://rayofhope.sg/product-tag/{category}/"
-            else:
-                url = f"https://rayofhope.sg/product-tag/{category}/page/{page_num}/"
-            
-            print(f"Scraping page {page_num}: {url}")
-            
-            # Send GET request
-            try:
-                response = requests.get(url, headers=headers, timeout=10)
-            except requests.exceptions.RequestException as e:
-                print(f"Error accessing {url}: {e}")
-                break
-            
-            # If page doesn't exist, break the loop
-            if response.status_code != 200:
-                print(f"Page {page_num} not found (Status code: {response.status_code}). Moving to next category.")
-                break
-            
-            # Parse HTML
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Check if no campaigns found using string instead of text (to fix the deprecation warning)
-            no_campaigns = soup.find(string=re.compile("No products were found"))
-            if no_campaigns:
-                print(f"No campaigns found on page {page_num}. Moving to next category.")
-                break
-            
-            # Find all campaign containers - THIS IS THE KEY PART FROM THE ORIGINAL CODE
-            campaign_posts = soup.find_all('div', class_='themeum-campaign-post')
-            
-            if not campaign_posts:
-                print(f"No campaign containers found on page {page_num}. Moving to next category.")
+        pagination = soup.find(PAGINATION[0], class_=PAGINATION[1])
+        page_labels = [element.text for element in pagination.find_all(['a', 'span'], class_=PAGE_NUMBER)] if pagination else []
+        result_count = soup.find(RESULT_COUNT[0], class_=RESULT_COUNT[1])
+        page_count = listing_page_count(page_labels, result_count.text if result_count else None,
+                                        len(posts) + cut_posts)
+        return posts, no_products, page_count
+    
+    def find(self, element, tag, class_name):
+        if class_name is None:
+            return element.find(tag)
+        return element.find(tag, class_=class_name)
+    
+    def text(self, element):
+        return element.text
+    
+    def attr(self, element, name):
+        return element.attrs.get(name)
+    
+    def link_texts(self, element):
+        return [link.text for link in element.find_all('a')]
+
+class LxmlBackend:
+    """
+    Runs the field specs on an lxml tree with XPath selectors compiled once up front
+    """
+    def __init__(self):
+        if lxml is None:
+            raise ImportError("The 'lxml' parser needs lxml installed (pip install lxml)")
+        steps = {POST_CONTENT} | {step for _, _, path, _, _ in CAMPAIGN_FIELDS for step in path}
+        self.selectors = {step: etree.XPath(class_xpath(*step)) for step in steps}
+        self.posts = etree.XPath(class_xpath(*POST_CONTAINER, first=False))
+        self.no_products = etree.XPath("boolean(//text()[contains(., 'No products were found')])")
+        self.all_links = etree.XPath("descendant::a")
+        self.page_labels = etree.XPath(
+            f"{class_xpath(*PAGINATION)}/descendant::*[self::a or self::span]"
+            f"[contains(concat(' ', normalize-space(@class), ' '), ' {PAGE_NUMBER} ')]"
+        )
+        self.result_count = etree.XPath(f"//{class_xpath(*RESULT_COUNT)}")
+    
+    def load(self, html, cut_posts=0):
+        root = lxml.html.document_fromstring(html, parser=lxml.html.HTMLParser(encoding='utf-8'))
+        posts = self.posts(root)
+        result_count = self.result_count(root)
+        page_count = listing_page_count([element.text_content() for element in self.page_labels(root)],
+                                        result_count[0].text_content() if result_count else None,
+                                        len(posts) + cut_posts)
+        return posts, self.no_products(root), page_count
+    
+    def find(self, element, tag, class_name):
+        found = self.selectors[(tag, class_name)](element)
+        return found[0] if found else None
+    
+    def text(self, element):
+        return element.text_content()
+    
+    def attr(self, element, name):
+        return element.get(name)
+    
+    def link_texts(self, element):
+        return [link.text_content() for link in self.all_links(element)]
+
+BACKENDS = {}
+
+def get_backend(parser):
+    # Backends are built on first use so lxml is only required when selected
+    if parser not in BACKENDS:
+        BACKENDS[parser] = LxmlBackend() if parser == 'lxml' else SoupBackend()
+    return BACKENDS[parser]
+
+def read_field(backend, element, how):
+    """
+    Read a value from the element a field spec points at. Returns None if it is not there.
+    """
+    if how == 'text':
+        return backend.text(element).strip()
+    if how == 'href':
+        return backend.attr(element, 'href')
+    if how == 'amount':
+        # Use regex to extract the number after S$
+        amount_match = AMOUNT_PATTERN.search(backend.text(element))
+        return amount_match.group(1) if amount_match else None
+    if how == 'links':
+        return ', '.join(text.strip() for text in backend.link_texts(element))
+    raise ValueError(f"Unknown field reader: {how}")
+
+def extract_campaign(backend, post, source_category):
+    """
+    Apply CAMPAIGN_FIELDS to one campaign post. Returns None if a required field is missing.
+    """
+    content_div = backend.find(post, *POST_CONTENT)
+    if content_div is None:
+        return None
+    
+    scopes = {'post': post, 'content': content_div}
+    # Elements found so far for this post, so shared path prefixes are only searched once
+    found = {}
+    
+    campaign_data = {}
+    for column, scope, path, how, default in CAMPAIGN_FIELDS:
+        element = scopes[scope]
+        for depth in range(len(path)):
+            key = (scope,) + tuple(path[:depth + 1])
+            if key not in found:
+                found[key] = backend.find(element, *path[depth])
+            element = found[key]
+            if element is None:
                 break
-            
-            # Count campaigns found on this page
-            campaigns_found = 0
-            
-            # Process each campaign post
-            for post in campaign_posts:
-                # Get the content div which has the title and categories
-                content_div = post.find('div', class_='themeum-campaign-post-content')
-                if not content_div:
-                    continue
-                
-                # Extract campaign title
-                title_element = content_div.find('h3', class_='entry-title')
-                if not title_element:
-                    continue
-                
-                title = title_element.text.strip()
-                
-                # Extract URL for deduplication
-                url_element = title_element.find('a')
-                if url_element and 'href' in url_element.attrs:
-                    campaign_url = url_element['href']
-                else:
-                    campaign_url = "Unknown"
-                
-                # Extract days to go
-                days_element = post.find('div', class_='roh-days-to-go')
-                days_to_go = days_element.text.strip() if days_element else "No days information found"
-                
-                # Extract amount raised and target amount
-                amount_raised = "Unknown"
-                target_amount = "Unknown"
-                
-                # Find the progress bar section
-                progress_section = post.find('div', class_='progressbar-content-wrapper')
-                if progress_section:
-                    # Extract amount raised
-                    amount_element = progress_section.find('span', class_='woocommerce-Price-amount')
-                    if amount_element:
-                        # Use regex to extract the number after S$
-                        amount_match = re.search(r'S\$(\d+(?:,\d+)*(?:\.\d+)?)', amount_element.text)
-                        if amount_match:
-                            amount_raised = amount_match.group(1)
-                    
-                    # Extract target amount
-                    target_element = progress_section.find('div', class_='thm-funding-goal')
-                    if target_element:
-                        target_amount_element = target_element.find('span', class_='woocommerce-Price-amount')
-                        if target_amount_element:
-                            target_match = re.search(r'S\$(\d+(?:,\d+)*(?:\.\d+)?)', target_amount_element.text)
-                            if target_match:
-                                target_amount = target_match.group(1)
-                
-                # Extract categories
-                categories_list = []
-                category_element = content_div.find('span', class_='entry-category')
-                if category_element:
-                    category_links = category_element.find_all('a')
-                    categories_list = [link.text.strip() for link in category_links]
-                
-                # Add current category to the list for tracking purposes
-                current_category = category
-                
-                # Create campaign data dictionary
-                campaign_data = {
-                    'Title': title,
-                    'Days to Go': days_to_go,
-                    'Amount Raised': amount_raised,
-                    'Target Amount': target_amount,
-                    'Categories': ', '.join(categories_list),
-                    'URL': campaign_url,
-                    'Source Category': current_category  # Track which category this was found in
-                }
-                
-                # Add to the campaigns list
-                all_campaigns.append(campaign_data)
-                campaigns_found += 1
-            
-            print(f"Found {campaigns_found} campaigns on page {page_num}")
-            
-            # Move to next page
-            page_num += 1
-            
-            # Be respectful to the server - add a delay
-            time.sleep(0.5)
+        
+        value = read_field(backend, element, how) if element is not None else None
+        if value is None:
+            if default is REQUIRED:
+                return None
+            value = default
+        campaign_data[column] = value
     
-    # Process the giving circles special URL
-    print(f"Scraping 4-giving-circles: {giving_circles_url}")
+    # Track which category this was found in
+    campaign_data['Source Category'] = source_category
+    return campaign_data
+
+def campaign_url(backend, post):
+    """
+    Read only the URL of a campaign post. Returns None if the post has no title link.
+    """
+    _, scope, path, how, _ = URL_FIELD
+    element = post if scope == 'post' else backend.find(post, *POST_CONTENT)
+    for step in path:
+        if element is None:
+            return None
+        element = backend.find(element, *step)
+    return read_field(backend, element, how) if element is not None else None
+
+def split_posts(html, backend, fragments):
+    """
+    Cut the posts whose record is in the FragmentCache out of a listing page and
+    load the rest. Returns (cards, posts, no_products, page_count), where cards
+    is [(digest, record or MISSING)] and posts holds the MISSING cards' posts.
+    Without a FragmentCache (or when the raw cards do not match the parsed
+    posts) the whole page is loaded and every card is MISSING, with no digest.
+    """
+    split = fragments.split(html, *POST_CONTAINER) if fragments is not None else None
+    if split is not None:
+        cards, rest = split
+        hits = sum(record is not MISSING for _, record in cards)
+        posts, no_products, page_count = backend.load(rest, hits)
+        if len(posts) == len(cards) - hits:
+            return cards, posts, no_products, page_count
     
-    try:
-        response = requests.get(giving_circles_url, headers=headers, timeout=10)
-        if response.status_code == 200:
-            soup = BeautifulSoup(response.content, 'html.parser')
-            campaign_posts = soup.find_all('div', class_='themeum-campaign-post')
-            
-            campaigns_found = 0
-            for post in campaign_posts:
-                # Similar extraction logic as above
-                content_div = post.find('div', class_='themeum-campaign-post-content')
-                if not content_div:
-                    continue
-                
-                title_element = content_div.find('h3', class_='entry-title')
-                if not title_element:
+    posts, no_products, page_count = backend.load(html)
+    return [(None, MISSING)] * len(posts), posts, no_products, page_count
+
+def parse_campaign_posts(html, source_category, parser='html.parser', index=None, fragments=None):
+    """
+    Parse the campaign posts of any Ray of Hope listing page (category pages,
+    giving circles, main campaigns page) with the chosen parser.
+    With a CampaignIndex, posts of campaigns it has already seen are not
+    extracted again; they become sightings carrying only URL and Source Category.
+    With a FragmentCache, only the posts whose HTML changed since an earlier
+    run are parsed; the others reuse the record stored for their hash.
+    """
+    backend = get_backend(parser)
+    cards, campaign_posts, no_products, page_count = split_posts(html, backend, fragments)
+    posts = iter(campaign_posts)
+    
+    campaigns = []
+    for digest, campaign_data in cards:
+        if campaign_data is MISSING:
+            post = next(posts)
+            # Posts going into the FragmentCache are extracted in full even when
+            # already seen, so they are not parsed again in the next run
+            if index is not None and digest is None:
+                url = campaign_url(backend, post)
+                if url in index.seen:
+                    campaigns.append({'URL': url, 'Source Category': source_category})
                     continue
-                
-                title = title_element.text.strip()
-                
-                url_element = title_element.find('a')
-                if url_element and 'href' in url_element.attrs:
-                    campaign_url = url_element['href']
-                else:
-                    campaign_url = "Unknown"
-                
-                days_element = post.find('div', class_='roh-days-to-go')
-                days_to_go = days_element.text.strip() if days_element else "No days information found"
-                
-                amount_raised = "Unknown"
-                target_amount = "Unknown"
-                
-                progress_section = post.find('div', class_='progressbar-content-wrapper')
-                if progress_section:
-                    amount_element = progress_section.find('span', class_='woocommerce-Price-amount')
-                    if amount_element:
-                        amount_match = re.search(r'S\$(\d+(?:,\d+)*(?:\.\d+)?)', amount_element.text)
-                        if amount_match:
-                            amount_raised = amount_match.group(1)
-                    
-                    target_element = progress_section.find('div', class_='thm-funding-goal')
-                    if target_element:
-                        target_amount_element = target_element.find('span', class_='woocommerce-Price-amount')
-                        if target_amount_element:
-                            target_match = re.search(r'S\$(\d+(?:,\d+)*(?:\.\d+)?)', target_amount_element.text)
-                            if target_match:
-                                target_amount = target_match.group(1)
-                
-                categories_list = []
-                category_element = content_div.find('span', class_='entry-category')
-                if category_element:
-                    category_links = category_element.find_all('a')
-                    categories_list = [link.text.strip() for link in category_links]
-                
-                campaign_data = {
-                    'Title': title,
-                    'Days to Go': days_to_go,
-                    'Amount Raised': amount_raised,
-                    'Target Amount': target_amount,
-                    'Categories': ', '.join(categories_list),
-                    'URL': campaign_url,
-                    'Source Category': '4-giving-circles'
-                }
-                
-                all_campaigns.append(campaign_data)
-                campaigns_found += 1
             
-            print(f"Found {campaigns_found} campaigns in 4-giving-circles")
-        else:
-            print(f"Failed to access 4-giving-circles (Status code: {response.status_code})")
-    except requests.exceptions.RequestException as e:
-        print(f"Error accessing 4-giving-circles: {e}")
+            campaign_data = extract_campaign(backend, post, source_category)
+            if digest is not None:
+                # Stored without the category, which comes from the page rather than the post
+                fragments.add(digest, campaign_data and {column: value for column, value in campaign_data.items()
+                                                         if column != 'Source Category'})
+        elif campaign_data is not None:
+            campaign_data = {**campaign_data, 'Source Category': source_category}
+        
+        if campaign_data is None:
+            continue
+        if index is not None:
+            if campaign_data['URL'] in index.seen:
+                campaigns.append({'URL': campaign_data['URL'], 'Source Category': source_category})
+                continue
+            if campaign_data['URL'] != "Unknown":
+                index.seen[campaign_data['URL']] = campaign_data
+        campaigns.append(campaign_data)
     
-    # Also scrape the main campaigns page
-    main_url = "https://rayofhope.sg/campaigns/"
-    print(f"Scraping main campaigns page: {main_url}")
+    return ParsedListing(campaigns, len(cards), no_products, page_count)
+
+def listing_campaigns(listing, page_num):
+    """
+    Campaigns of a parsed category page, or None when the page marks the end of the category
+    """
+    if listing.no_products:
+        print(f"No campaigns found on page {page_num}. Moving to next category.")
+        return None
     
-    try:
-        response = requests.get(main_url, headers=headers, timeout=10)
-        if response.status_code == 200:
-            soup = BeautifulSoup(response.content, 'html.parser')
-            campaign_posts = soup.find_all('div', class_='themeum-campaign-post')
-            
-            campaigns_found = 0
-            for post in campaign_posts:
-                # Same extraction logic
-                content_div = post.find('div', class_='themeum-campaign-post-content')
-                if not content_div:
-                    continue
-                
-                title_element = content_div.find('h3', class_='entry-title')
-                if not title_element:
-                    continue
-                
-                title = title_element.text.strip()
-                
-                url_element = title_element.find('a')
-                if url_element and 'href' in url_element.attrs:
-                    campaign_url = url_element['href']
-                else:
-                    campaign_url = "Unknown"
-                
-                days_element = post.find('div', class_='roh-days-to-go')
-                days_to_go = days_element.text.strip() if days_element else "No days information found"
-                
-                amount_raised = "Unknown"
-                target_amount = "Unknown"
-                
-                progress_section = post.find('div', class_='progressbar-content-wrapper')
-                if progress_section:
-                    amount_element = progress_section.find('span', class_='woocommerce-Price-amount')
-                    if amount_element:
-                        amount_match = re.search(r'S\$(\d+(?:,\d+)*(?:\.\d+)?)', amount_element.text)
-                        if amount_match:
-                            amount_raised = amount_match.group(1)
-                    
-                    target_element = progress_section.find('div', class_='thm-funding-goal')
-                    if target_element:
-                        target_amount_element = target_element.find('span', class_='woocommerce-Price-amount')
-                        if target_amount_element:
-                            target_match = re.search(r'S\$(\d+(?:,\d+)*(?:\.\d+)?)', target_amount_element.text)
-                            if target_match:
-                                target_amount = target_match.group(1)
-                
-                categories_list = []
-                category_element = content_div.find('span', class_='entry-category')
-                if category_element:
-                    category_links = category_element.find_all('a')
-                    categories_list = [link.text.strip() for link in category_links]
-                
-                campaign_data = {
-                    'Title': title,
-                    'Days to Go': days_to_go,
-                    'Amount Raised': amount_raised,
-                    'Target Amount': target_amount,
-                    'Categories': ', '.join(categories_list),
-                    'URL': campaign_url,
-                    'Source Category': 'main_page'
-                }
-                
-                all_campaigns.append(campaign_data)
-                campaigns_found += 1
-            
-            print(f"Found {campaigns_found} campaigns on main page")
-        else:
-            print(f"Failed to access main campaigns page (Status code: {response.status_code})")
-    except requests.exceptions.RequestException as e:
-        print(f"Error accessing main campaigns page: {e}")
+    if not listing.post_count:
+        print(f"No campaign containers found on page {page_num}. Moving to next category.")
+        return None
     
-    print(f"Total campaigns (with duplicates): {len(all_campaigns)}")
+    print(f"Found {len(listing.campaigns)} campaigns on page {page_num}")
     
-    # Save both versions
-    save_to_excel(all_campaigns)
+    return listing.campaigns
+
+def parse_category_page(content, category, page_num, parser='html.parser', index=None, fragments=None):
+    """
+    Parse one category listing page.
+    Returns the campaigns found, or None when the page marks the end of the category.
+    """
+    return listing_campaigns(parse_campaign_posts(content, category, parser, index, fragments), page_num)
+
+def parse_first_category_page(content, category, parser='html.parser', index=None, fragments=None):
+    """
+    Parse page 1 of a category like parse_category_page, also reading how many pages
+    the category has. Returns {'campaigns': campaigns or None, 'page_count': pages or None}.
+    """
+    listing = parse_campaign_posts(content, category, parser, index, fragments)
+    return {'campaigns': listing_campaigns(listing, 1), 'page_count': listing.page_count}
+
+def remaining_pages(category, page_count):
+    """
+    Page numbers to crawl after page 1: exactly the pages page 1 says there are,
+    or every page up to MAX_PAGES (stopping at the end) when it does not say
+    """
+    if page_count is None:
+        print(f"No page count on page 1 of {category}; probing up to page {MAX_PAGES}")
+        return range(2, MAX_PAGES + 1)
+    print(f"Page 1 of {category} lists {page_count} as the last page")
+    return range(2, page_count + 1)
+
+class RoHPlatform(Platform):
+    """
+    Ray of Hope listings: every category plus the SPECIAL_PAGES, written as the
+    listing tables by save_to_excel(). The campaign pages are crawled by
+    RoH_detail_scraper.RoHDetailPlatform.
+    With a CampaignIndex, posts of campaigns already extracted are not extracted
+    again (see parse_campaign_posts); its pages are then parsed in this process.
+    """
+    name = 'roh'
+    table = 'ray_of_hope_campaigns_unique'
+    headers = HEADERS
+    requests_per_second = 4.0
+    timeout = 10
+    details = False
+    
+    def __init__(self, parser='html.parser', index=None):
+        self.parser = parser
+        self.index = index
+        self.in_process = index is not None
     
-    return all_campaigns
+    def listing_pages(self):
+        pages = [ListingPage(get_category_page_url(category, 1), (seed, 1), {'category': category})
+                 for seed, category in enumerate(CATEGORIES)]
+        pages += [ListingPage(f"{SITE_URL}/{path}", (len(pages) + seed, 1), {'category': source_category, 'name': name})
+                  for seed, (path, source_category, name) in enumerate(SPECIAL_PAGES)]
+        return pages
+    
+    def parse_name(self, kind):
+        return f"{self.name}-{kind}-{self.parser}" if kind == 'listing' else super().parse_name(kind)
+    
+    def parse_listing(self, content, page, fragments=None):
+        category = page.context['category']
+        if 'name' in page.context:
+            campaigns = parse_campaign_posts(content, category, self.parser, self.index, fragments).campaigns
+            print(f"Found {len(campaigns)} campaigns on {page.context['name']}")
+            return {'campaigns': campaigns, 'page_count': None}
+        
+        page_num = page.key[1]
+        if page_num == 1:
+            return parse_first_category_page(content, category, self.parser, self.index, fragments)
+        return {'campaigns': parse_category_page(content, category, page_num, self.parser, self.index, fragments),
+                'page_count': None}
+    
+    def next_pages(self, page, listing):
+        seed, page_num = page.key
+        category = page.context['category']
+        if 'name' in page.context or listing['campaigns'] is None:
+            return []
+        
+        # Page 1 says how many pages follow; without that the pages are probed one at a time
+        if page_num == 1:
+            page_nums = remaining_pages(category, listing['page_count'])
+            probe = listing['page_count'] is None
+        elif page.context.get('probe'):
+            page_nums = range(page_num + 1, MAX_PAGES + 1)
+            probe = True
+        else:
+            return []
+        
+        if probe:
+            page_nums = page_nums[:1]
+        return [ListingPage(get_category_page_url(category, number), (seed, number), {'category': category, 'probe': probe})
+                for number in page_nums]
+    
+    def save(self, campaigns, details, excel=True, batch_size=BATCH_SIZE, directory='.'):
+        return len(save_to_excel(campaigns, excel, batch_size, self.index, directory)) > 0
 
-def save_to_excel(all_data):
+def scrape_ray_of_hope(use_async=False, max_per_host=4, requests_per_second=4.0, cache=None, parser='html.parser',
+                       excel=True, snapshots=None, max_rate=None, batch_size=BATCH_SIZE, fragments=None,
+                       parse_pool=None):
     """
-    Save both the full dataset and a deduplicated dataset with combined source categories
+    Scrape all Ray of Hope listing pages with a CrawlScheduler and save the results.
+    Requests start at requests_per_second per host and adapt to the server's
+    responses, up to max_rate (see AdaptiveThrottle).
+    Without use_async one page is fetched at a time; with it up to max_per_host
+    requests are in flight per host. Either way the campaigns are saved in the
+    order of the categories and their pages.
+    Pass a ResponseCache to reuse pages (and their parse results) from earlier runs.
+    parser selects the listing parser, one of LISTING_PARSERS.
+    excel=False skips the Excel/CSV exports and only writes Parquet.
+    Pass a SnapshotStore to append the unique campaigns to its history.
+    Campaigns stream into the output files in batches of batch_size (see
+    save_to_excel). Each campaign's fields are only extracted the first time
+    it is listed (see CampaignIndex), unless pages are cached or parsed in a
+    ParsePool, whose results cannot depend on the pages crawled before.
+    Pass a FragmentCache to only parse the posts that changed since an earlier
+    run; it is saved for the next run at the end.
+    Returns the deduplicated DataFrame, as save_to_excel() does. The list of
+    every listing record is not built, as it would defeat the streaming; it is
+    in ray_of_hope_campaigns_all instead.
     """
-    # Convert to pandas DataFrame
-    df_all = pd.DataFrame(all_data)
+    index = CampaignIndex() if cache is None and parse_pool is None else None
+    platform = RoHPlatform(parser, index)
+    saved = crawl_platforms([platform], max_per_host if use_async else 1, cache, requests_per_second, max_rate,
+                            excel, parse_pool, fragments={platform.name: fragments}, snapshots=snapshots,
+                            batch_size=batch_size)
     
-    # Clean data types
-    # Clean days to go - extract just the number
-    df_all['Days to Go'] = df_all['Days to Go'].str.extract(r'(\d+)').astype('Int64')
+    if not saved or not saved[platform.name]:
+        return pd.DataFrame()
+    return read_table(platform.table)
+
+def save_to_excel(all_data, excel=True, batch_size=BATCH_SIZE, index=None, directory='.'):
+    """
+    Save both the full dataset and a deduplicated dataset with combined source categories in directory.
+    Both are written as Parquet; excel=True also exports .xlsx and .csv copies.
+    The campaign/category link table is written next to them.
     
-    # Convert currency values to numeric (remove commas)
-    df_all['Amount Raised'] = pd.to_numeric(df_all['Amount Raised'].str.replace(',', ''), errors='coerce')
-    df_all['Target Amount'] = pd.to_numeric(df_all['Target Amount'].str.replace(',', ''), errors='coerce')
+    all_data can be any iterable of campaign records, such as a crawl's campaigns.
+    It is consumed in batches of batch_size records, each normalized and
+    appended to the full dataset and link table before the next one is read,
+    so memory only grows with the number of unique campaigns. Pass the
+    CampaignIndex the crawl used, so its sightings can be expanded.
+    Returns the deduplicated DataFrame.
+    """
+    if index is None:
+        index = CampaignIndex()
     
-    # Add completion percentage column
-    df_all['Completion Percentage'] = (df_all['Amount Raised'] / df_all['Target Amount'] * 100).round(2)
+    with ChunkedTableWriter('ray_of_hope_campaigns_all', excel=excel, csv=excel, directory=directory) as all_writer, \
+            ChunkedTableWriter('ray_of_hope_campaign_categories', excel=excel, csv=excel,
+                               directory=directory) as links_writer:
+        for batch in batched(all_data, batch_size):
+            df_batch, new_links = index.add(batch)
+            
+            # Save the full dataset with duplicates
+            all_writer.write(df_batch)
+            
+            # One row per (campaign, source category), so consumers need not re-split 'Source Category'
+            if new_links:
+                links_writer.write(build_category_links(new_links))
     
-    # Save the full dataset with duplicates
-    try:
-        df_all.to_excel('ray_of_hope_campaigns_all.xlsx', index=False)
-        print(f"Full data saved to ray_of_hope_campaigns_all.xlsx. Total campaigns: {len(df_all)}")
-        df_all.to_csv('ray_of_hope_campaigns_all.csv', index=False)
-    except Exception as e:
-        print(f"Error saving full Excel file: {e}")
-        df_all.to_csv('ray_of_hope_campaigns_all.csv', index=False)
-        print("Full data saved as CSV instead.")
+    print(f"Total campaigns: {all_writer.rows}")
+    if not all_writer.rows:
+        print("No campaigns were scraped")
+        return pd.DataFrame()
     
     # Create a deduplicated version with combined Source Categories
-    # Group by URL and combine Source Categories
-    url_groups = df_all.groupby('URL')
+    df_unique = index.table()
     
-    # Create a list to hold our deduplicated records
-    deduplicated_records = []
+    # Save the deduplicated dataset
+    write_table(df_unique, 'ray_of_hope_campaigns_unique', excel=excel, csv=excel, directory=directory)
+    print(f"Unique campaigns: {len(df_unique)}")
+    print(f"Campaign/category links: {links_writer.rows}")
+    index.print_summary()
     
-    for url, group in url_groups:
-        if url == "Unknown":
-            # Keep all unknown URL records as is
-            for _, row in group.iterrows():
-                deduplicated_records.append(row.to_dict())
-            continue
-        
-        # Get the first record in the group
-        first_record = group.iloc[0].to_dict()
+    return df_unique
+
+def save_deduplicated(df_all, excel=True, directory='.'):
+    """
+    Write the unique campaigns and campaign/category link tables of a full
+    listing table that was saved earlier, as save_to_excel() writes them during
+    a crawl. Returns the deduplicated DataFrame.
+    """
+    df_unique = deduplicate_campaigns(df_all)
+    known = df_all[df_all['URL'] != "Unknown"]
+    pairs = known[['URL', 'Source Category']].drop_duplicates()
+    
+    write_table(df_unique, 'ray_of_hope_campaigns_unique', excel=excel, csv=excel, directory=directory)
+    write_table(build_category_links(list(zip(pairs['URL'], pairs['Source Category']))),
+                'ray_of_hope_campaign_categories', excel=excel, csv=excel, directory=directory)
+    print(f"Unique campaigns: {len(df_unique)}")
+    print(f"Campaign/category links: {len(pairs)}")
+    return df_unique
+
+def build_category_links(pairs):
+    """
+    Normalized campaign/category link table from distinct (URL, source category)
+    pairs, as returned by CampaignIndex.add(). 'Source Category' is a
+    categorical over SOURCE_CATEGORIES, so filtering and grouping by category
+    work on integer codes.
+    """
+    df_links = pd.DataFrame(pairs, columns=['URL', 'Source Category'])
+    df_links['Source Category'] = pd.Categorical(df_links['Source Category'], categories=SOURCE_CATEGORIES)
+    return df_links
+
+class CampaignIndex:
+    """
+    URL index of the campaigns crawled so far, and the streaming counterpart of
+    deduplicate_campaigns(): add() the listing records batch by batch, then
+    build the same unique table with table(). Only the first record, source
+    categories and appearance count of each URL are kept.
+    
+    Passed to the crawl, the index also lets the parser skip campaigns it has
+    already extracted: their later posts become sightings carrying only URL
+    and Source Category (see parse_campaign_posts), which add() expands into
+    full rows of the all-records table from the first record.
+    """
+    def __init__(self):
+        # Records already extracted by the parser, by URL
+        self.seen = {}
+        self.columns = None
+        self.first = {}
+        self.categories = {}
+        self.appearances = {}
+        self.unknown = []
+        self.stats = {'records': 0, 'sightings': 0, 'parsed_repeats': 0}
+    
+    def add(self, batch):
+        """
+        Add a batch of listing records (full records and sightings). Returns the
+        batch's rows of the all-records table, normalized, and the (URL, source
+        category) pairs seen for the first time, in order of appearance; rows whose
+        URL is "Unknown" cannot be linked and are left out.
+        """
+        # A concurrent crawl parses pages out of order, so a campaign may be listed
+        # as a sighting first; that sighting takes the fields the parser extracted
+        listed = set(self.first)
+        records = []
+        for record in batch:
+            if 'Title' not in record and record['URL'] not in listed:
+                record = {**self.seen[record['URL']], 'Source Category': record['Source Category']}
+            listed.add(record['URL'])
+            records.append(record)
+        batch = records
         
-        # Combine all source categories from this group
-        all_source_categories = group['Source Category'].unique()
-        first_record['Source Category'] = ', '.join(all_source_categories)
+        # Only full records go through normalization; sightings have no fields to clean
+        full = [record for record in batch if 'Title' in record]
+        if full:
+            df_full = normalize_roh_listing(pd.DataFrame(full))
+            if self.columns is None:
+                self.columns = list(df_full.columns)
+            full = iter(df_full.to_dict('records'))
         
-        # Add a count of appearances
-        first_record['Category Appearances'] = len(group)
+        rows = []
+        new_links = []
+        for record in batch:
+            url = record['URL']
+            category = record['Source Category']
+            sighting = 'Title' not in record
+            if sighting:
+                self.stats['sightings'] += 1
+                record = {**self.first[url], 'Source Category': category}
+            else:
+                record = next(full)
+            rows.append(record)
+            
+            if url == "Unknown":
+                self.unknown.append(record)
+                continue
+            
+            if url not in self.appearances:
+                self.first[url] = record
+                self.categories[url] = [category]
+                self.appearances[url] = 1
+                new_links.append((url, category))
+                continue
+            
+            if not sighting:
+                self.stats['parsed_repeats'] += 1
+            self.appearances[url] += 1
+            if category not in self.categories[url]:
+                self.categories[url].append(category)
+                new_links.append((url, category))
         
-        # Add to our deduplicated records
-        deduplicated_records.append(first_record)
+        self.stats['records'] += len(batch)
+        # to_dict() records lose the column types, so they are set again
+        return pd.DataFrame(rows, columns=self.columns).astype(NORMALIZED_DTYPES), new_links
+    
+    def table(self):
+        """
+        The deduplicated DataFrame, as deduplicate_campaigns() returns it for all records added
+        """
+        df_first = pd.DataFrame([self.first[url] for url in sorted(self.first)], columns=self.columns)
+        df_first = df_first.astype(NORMALIZED_DTYPES)
+        df_first['Source Category'] = [', '.join(self.categories[url]) for url in df_first['URL']]
+        df_first['Category Appearances'] = [self.appearances[url] for url in df_first['URL']]
+        df_unknown = pd.DataFrame(self.unknown, columns=self.columns).astype(NORMALIZED_DTYPES)
+        return order_unique(df_first, df_unknown)
     
-    # Convert back to DataFrame
-    df_unique = pd.DataFrame(deduplicated_records)
+    def print_summary(self):
+        stats = self.stats
+        repeats = stats['sightings'] + stats['parsed_repeats']
+        print(f"URL index: {stats['records']} listing records of {len(self.first)} campaign URLs, {repeats} repeats; "
+              f"{stats['sightings']} skipped field extraction "
+              f"({stats['sightings'] / max(stats['records'], 1):.0%} of posts), "
+              f"{stats['parsed_repeats']} parsed in full")
+
+def deduplicate_campaigns(df_all):
+    """
+    Collapse campaigns found in several categories into one row per URL.
+    Each row keeps the first record for its URL, with all of its source categories
+    joined in order of appearance and a count of appearances. Rows whose URL is
+    "Unknown" are all kept as they are.
+    """
+    known = df_all['URL'] != "Unknown"
+    df_known = df_all[known]
+    
+    # First record per URL, plus combined Source Categories and appearance counts
+    url_groups = df_known.groupby('URL', sort=True)
+    df_first = df_known.drop_duplicates('URL').set_index('URL')
+    # Ordered-unique join: drop repeated (URL, category) pairs, then concatenate per URL in row order
+    category_pairs = df_known.drop_duplicates(['URL', 'Source Category'])
+    source_categories = (category_pairs['Source Category'] + ', ').groupby(category_pairs['URL'], sort=True).sum().str[:-2]
+    df_first['Source Category'] = source_categories
+    df_first['Category Appearances'] = url_groups.size()
+    df_first = df_first.sort_index().reset_index()[list(df_all.columns) + ['Category Appearances']]
+    
+    return order_unique(df_first, df_all[~known])
+
+def order_unique(df_first, df_unknown):
+    """
+    Combine the first record of each URL (sorted by URL, with its combined Source
+    Categories and Category Appearances) and the rows whose URL is "Unknown"
+    into the unique campaigns table
+    """
+    # Unknown URL rows sit where "Unknown" sorts among the URLs, as with a groupby over all rows
+    before_unknown = df_first['URL'] < "Unknown"
+    parts = [df_first[before_unknown], df_unknown, df_first[~before_unknown]]
+    df_unique = pd.concat([part for part in parts if len(part)], ignore_index=True)
     
     # Sort by Categories Appearances to see which campaigns appear in most categories
     if 'Category Appearances' in df_unique.columns:
         df_unique = df_unique.sort_values('Category Appearances', ascending=False)
     
-    # Save the deduplicated dataset
-    try:
-        df_unique.to_excel('ray_of_hope_campaigns_unique.xlsx', index=False)
-        print(f"Unique data saved to ray_of_hope_campaigns_unique.xlsx. Total campaigns: {len(df_unique)}")
-        df_unique.to_csv('ray_of_hope_campaigns_unique.csv', index=False)
-    except Exception as e:
-        print(f"Error saving unique Excel file: {e}")
-        df_unique.to_csv('ray_of_hope_campaigns_unique.csv', index=False)
-        print("Unique data saved as CSV instead.")
+    return df_unique
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scrape Ray of Hope campaign listings")
+    parser.add_argument('--async', dest='use_async', action='store_true',
+                        help="fetch pages concurrently instead of one page at a time")
+    parser.add_argument('--max-per-host', type=int, default=4,
+                        help="maximum concurrent requests per host with --async")
+    parser.add_argument('--rate', type=float, default=4.0,
+                        help="requests per second per host to start from; the rate then adapts to the server's responses")
+    parser.add_argument('--max-rate', type=float,
+                        help="highest requests per second per host the rate may climb to (default 4x --rate)")
+    parser.add_argument('--parser', choices=LISTING_PARSERS, default='html.parser',
+                        help="listing page parser; 'lxml' is faster and gives the same records")
+    parser.add_argument('--no-excel', dest='excel', action='store_false',
+                        help="only write Parquet output, without the Excel/CSV exports")
+    parser.add_argument('--snapshot-db',
+                        help="SQLite file to append this run's campaign progress to (see snapshot_store.py)")
+    parser.add_argument('--site-url', default=SITE_URL, help="root URL of the site to scrape")
+    parser.add_argument('--cache-dir', help="directory for the on-disk HTTP response cache (disabled if omitted)")
+    parser.add_argument('--cache-ttl', type=float, default=0,
+                        help="seconds a cached page is used without revalidating it with the server")
+    parser.add_argument('--fragment-cache',
+                        help="JSON file of the records of earlier runs' campaign posts by hash, so only changed "
+                             "posts are parsed (disabled if omitted)")
+    parser.add_argument('--parse-workers', type=int, default=0,
+                        help="processes to parse pages in (0 parses them on the fetching threads)")
+    parser.add_argument('--metrics', action='store_true',
+                        help="time every request, parse, save and sleep and print a summary at the end")
+    parser.add_argument('--trace', help="JSON-lines file to write every timed event to (implies --metrics)")
+    args = parser.parse_args()
+    
+    if args.metrics or args.trace:
+        run_metrics.enable(args.trace)
+    
+    SITE_URL = args.site_url.rstrip('/')
+    cache = ResponseCache(args.cache_dir, ttl=args.cache_ttl) if args.cache_dir else None
+    snapshots = SnapshotStore(args.snapshot_db) if args.snapshot_db else None
+    fragments = FragmentCache(args.fragment_cache, code_version(__file__)) if args.fragment_cache else None
+    parse_pool = ParsePool(args.parse_workers) if args.parse_workers else None
+    
     print("Starting to scrape Ray of Hope campaigns...")
-    all_campaigns = scrape_ray_of_hope()
-    print("Scraping completed.")
\ No newline at end of file
+    try:
+        campaign_data = scrape_ray_of_hope(args.use_async, args.max_per_host, args.rate, cache, args.parser, args.excel,
+                                           snapshots, args.max_rate, fragments=fragments, parse_pool=parse_pool)
+    finally:
+        if snapshots is not None:
+            snapshots.close()
+        if parse_pool is not None:
+            parse_pool.close()
+    if parse_pool is not None:
+        parse_pool.print_summary()
+    print("Scraping completed.")
+    run_metrics.finish()
\ No newline at end of file
@@ -0,0 +1,88 @@
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from RoH_scraper import CATEGORIES, deduplicate_campaigns
+
+def deduplicate_campaigns_loop(df_all):
+    """
+    Reference implementation: the original groupby + iterrows loop from save_to_excel
+    """
+    url_groups = df_all.groupby('URL')
+    deduplicated_records = []
+    
+    for url, group in url_groups:
+        if url == "Unknown":
+            # Keep all unknown URL records as is
+            for _, row in group.iterrows():
+                deduplicated_records.append(row.to_dict())
+            continue
+        
+        first_record = group.iloc[0].to_dict()
+        all_source_categories = group['Source Category'].unique()
+        first_record['Source Category'] = ', '.join(all_source_categories)
+        first_record['Category Appearances'] = len(group)
+        deduplicated_records.append(first_record)
+    
+    df_unique = pd.DataFrame(deduplicated_records)
+    if 'Category Appearances' in df_unique.columns:
+        df_unique = df_unique.sort_values('Category Appearances', ascending=False)
+    
+    return df_unique
+
+def make_synthetic_campaigns(rows, unique_urls, seed=0):
+    """
+    Build a cleaned df_all like save_to_excel does, with duplicates across
+    categories, "Unknown" URLs and missing values
+    """
+    rng = np.random.default_rng(seed)
+    url_ids = rng.integers(0, unique_urls, rows)
+    urls = np.array([f"https://rayofhope.sg/campaign/c{i}/" for i in range(unique_urls)], dtype=object)[url_ids]
+    urls[rng.random(rows) < 0.01] = "Unknown"
+    
+    amount = rng.integers(0, 50000, rows).astype(float)
+    amount[rng.random(rows) < 0.02] = np.nan
+    target = rng.choice([800.0, 1200.0, 3600.0, 25000.0], rows)
+    days = pd.array(rng.integers(0, 300, rows), dtype='Int64')
+    days[rng.random(rows) < 0.02] = pd.NA
+    
+    df_all = pd.DataFrame({
+        'Title': [f"Campaign {i}" for i in url_ids],
+        'Days to Go': days,
+        'Amount Raised': amount,
+        'Target Amount': target,
+        'Categories': rng.choice(['0 Seniors, Living Expenses', '0 Disability, Education'], rows),
+        'URL': urls,
+        'Source Category': rng.choice(CATEGORIES + ['4-giving-circles', 'main_page'], rows),
+    })
+    df_all['Completion Percentage'] = (df_all['Amount Raised'] / df_all['Target Amount'] * 100).round(2)
+    return df_all
+
+def check_same_output(expected, actual):
+    """
+    Compare values, row order and columns. Dtypes may differ: the loop rebuilt
+    'Days to Go' as float when values were missing, the vectorized path keeps Int64.
+    """
+    pd.testing.assert_frame_equal(expected.reset_index(drop=True), actual.reset_index(drop=True), check_dtype=False)
+    assert list(expected.index) == list(actual.index), "row order differs"
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check and time the vectorized campaign deduplication")
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--unique-urls', type=int, default=20000)
+    args = parser.parse_args()
+    
+    df_all = make_synthetic_campaigns(args.rows, args.unique_urls)
+    
+    start = time.perf_counter()
+    expected = deduplicate_campaigns_loop(df_all)
+    loop_seconds = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    actual = deduplicate_campaigns(df_all)
+    vectorized_seconds = time.perf_counter() - start
+    
+    check_same_output(expected, actual)
+    print(f"{args.rows} rows, {len(actual)} unique: identical output")
+    print(f"Loop: {loop_seconds:.2f}s, vectorized: {vectorized_seconds:.3f}s "
+          f"({loop_seconds / vectorized_seconds:.0f}x faster)")
@@ -0,0 +1,55 @@
+import argparse
+import itertools
+import os
+import time
+import numpy as np
+import pandas as pd
+from campaign_metrics import CampaignMetrics, prepare_roh
+from dashboard_aggregates import FILTERS
+
+DETAILED_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ray_of_hope_campaigns_detailed.xlsx')
+
+def make_snapshot_history(rows, seed=0):
+    """
+    Build a multi-year history of campaign snapshots by resampling the real detailed
+    campaigns with random start dates between 2018 and 2025 and jittered amounts
+    """
+    rng = np.random.default_rng(seed)
+    detailed = pd.read_excel(DETAILED_FILE)
+    history = detailed.iloc[rng.integers(0, len(detailed), rows)].reset_index(drop=True)
+    
+    days = rng.integers(0, 8 * 365, rows)
+    start = pd.Timestamp('2018-01-01') + pd.to_timedelta(days, unit='D')
+    history['Start Date'] = start.strftime('%d/%m/%Y')
+    history['Amount Raised'] = (history['Amount Raised'] * rng.uniform(0.5, 1.5, rows)).round(2)
+    history['Completion Percentage'] = (history['Amount Raised'] / history['Target Amount'] * 100).round(2)
+    return history
+
+def timed(label, fn):
+    start = time.perf_counter()
+    result = fn()
+    print(f"{label}: {time.perf_counter() - start:.2f}s")
+    return result
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time the metrics engine on a large synthetic snapshot history")
+    parser.add_argument('--rows', type=int, default=2000000)
+    args = parser.parse_args()
+    
+    history = make_snapshot_history(args.rows)
+    print(f"{args.rows} rows")
+    
+    start = time.perf_counter()
+    prepared = timed("Prepare (types, categoricals, primary category)", lambda: prepare_roh(history))
+    metrics = timed("Single groupby pass", lambda: CampaignMetrics(prepared))
+    
+    def all_tables():
+        for flags in itertools.product([False, True], repeat=len(FILTERS)):
+            filters = dict(zip(FILTERS, flags))
+            metrics.table(['Year'], round_overall=True, **filters)
+            metrics.table(['Source Category', 'Year'], **filters)
+            metrics.table(['Primary Category', 'Year'], **filters)
+            metrics.table(['Year', 'Month'], **filters)
+    
+    timed("All tables for 8 filter combinations", all_tables)
+    print(f"Total: {time.perf_counter() - start:.2f}s ({len(metrics.totals)} groups after the first pass)")
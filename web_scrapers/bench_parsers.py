@@ -0,0 +1,56 @@
+import argparse
+import glob
+import os
+import time
+from RoH_scraper import LISTING_PARSERS, parse_campaign_posts
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'roh')
+
+def load_fixtures(fixture_dir=FIXTURE_DIR):
+    """
+    Read every saved listing page as raw bytes, as the scraper receives them
+    """
+    fixtures = []
+    for path in sorted(glob.glob(os.path.join(fixture_dir, '*.html'))):
+        with open(path, 'rb') as f:
+            fixtures.append((os.path.basename(path), f.read()))
+    return fixtures
+
+def bench_listing_parser(fixtures, parser, repeat=20):
+    """
+    Parse all fixtures `repeat` times with one parser.
+    Returns (posts parsed per second, milliseconds per page).
+    """
+    # Warm up: builds the parser backend and its compiled selectors
+    for _, content in fixtures:
+        parse_campaign_posts(content, 'bench', parser)
+    
+    posts = 0
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for _, content in fixtures:
+            posts += parse_campaign_posts(content, 'bench', parser).post_count
+    elapsed = time.perf_counter() - start
+    
+    pages = repeat * len(fixtures)
+    return posts / elapsed, elapsed / pages * 1000
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Micro-benchmark the RoH listing parsers on saved HTML fixtures")
+    arg_parser.add_argument('--repeat', type=int, default=20, help="passes over the fixture set per parser")
+    arg_parser.add_argument('--fixtures', default=FIXTURE_DIR, help="directory of saved listing pages")
+    arg_parser.add_argument('--parser', choices=LISTING_PARSERS, action='append',
+                            help="parser to benchmark (repeatable, default all)")
+    args = arg_parser.parse_args()
+    
+    fixtures = load_fixtures(args.fixtures)
+    print(f"{len(fixtures)} fixture pages, {args.repeat} passes each")
+    print(f"{'Parser':<12} {'Posts/sec':>12} {'ms/page':>10}")
+    
+    for parser in args.parser or LISTING_PARSERS:
+        try:
+            posts_per_second, ms_per_page = bench_listing_parser(fixtures, parser, args.repeat)
+        except ImportError as e:
+            print(f"{parser:<12} skipped: {e}")
+            continue
+        print(f"{parser:<12} {posts_per_second:>12,.0f} {ms_per_page:>10.2f}")
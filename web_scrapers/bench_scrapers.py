@@ -0,0 +1,320 @@
+import argparse
+import contextlib
+import io
+import multiprocessing
+import os
+import random
+import re
+import resource
+import sys
+import tempfile
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+import G2C_scraper
+import RoH_detail_scraper
+import RoH_scraper
+import run_metrics
+from rate_limit import RETRY_STATUSES
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+# Saved pages the fixture server answers with, relative to FIXTURE_DIR
+FIXTURE_PAGES = {
+    'roh_listing': ['roh/category_page.html', 'roh/category_page_2.html'],
+    'roh_end': 'roh/no_products.html',
+    'roh_giving_circles': 'roh/giving_circles.html',
+    'roh_main': 'roh/main_page.html',
+    'roh_campaign': 'roh_campaign/campaign_page.html',
+    'g2c_list': 'g2c/campaign_list.html',
+    'g2c_end': 'g2c/campaign_list_end.html',
+    'g2c_campaign': 'g2c/campaign_page.html',
+}
+
+# Sites the saved pages link to; links are rewritten to point at the fixture server
+FIXTURE_SITES = [b'https://rayofhope.sg', b'https://www.childrensociety.org.sg']
+
+ROH_LISTING = re.compile(r'^/product-tag/[^/]+/(?:page/(\d+)/)?$')
+ROH_CAMPAIGN = re.compile(r'^/campaign/[^/]+/$')
+G2C_LISTING = re.compile(r'^/g2c/campaigns/(?:page/(\d+)/)?$')
+G2C_CAMPAIGN = re.compile(r'^/g2c/campaigns/[^/]+/$')
+
+# Campaign links on listing pages (but not the G2C pagination links)
+CAMPAIGN_LINK = re.compile(rb'(/campaign/|/g2c/campaigns/)(?!page/)([\w-]+)/')
+
+# Pagination widgets of the saved listing pages, replaced with ones matching the served page count
+ROH_PAGINATION = re.compile(rb'<nav class="woocommerce-pagination">.*?</nav>', re.DOTALL)
+G2C_PAGINATION = re.compile(rb'<div class="tcb-pagination">.*?</div>', re.DOTALL)
+
+def load_pages(fixture_dir=FIXTURE_DIR):
+    """
+    Read the fixture pages as raw bytes, keyed like FIXTURE_PAGES
+    """
+    def read(path):
+        with open(os.path.join(fixture_dir, path), 'rb') as f:
+            return f.read()
+    
+    return {key: [read(path) for path in paths] if isinstance(paths, list) else read(paths)
+            for key, paths in FIXTURE_PAGES.items()}
+
+def number_campaigns(content, page_num):
+    # Give the campaigns of every listing page their own URLs, so later pages are new campaigns
+    return CAMPAIGN_LINK.sub(rb'\1\2-p' + str(page_num).encode() + rb'/', content)
+
+def roh_pagination(listing_path, page_num, page_count):
+    """
+    WooCommerce page-numbers widget for page page_num of page_count; like
+    WooCommerce, a listing with a single page has none
+    """
+    if page_count <= 1:
+        return b''
+    items = []
+    for number in range(1, page_count + 1):
+        if number == page_num:
+            items.append(f'<li><span aria-current="page" class="page-numbers current">{number}</span></li>')
+        else:
+            items.append(f'<li><a class="page-numbers" href="{listing_path}page/{number}/">{number}</a></li>')
+    if page_num < page_count:
+        items.append(f'<li><a class="next page-numbers" href="{listing_path}page/{page_num + 1}/">&rarr;</a></li>')
+    return f'<nav class="woocommerce-pagination"><ul class="page-numbers">{"".join(items)}</ul></nav>'.encode()
+
+def g2c_pagination(page_num, page_count):
+    """
+    Numbered G2C list pagination for page page_num of page_count
+    """
+    links = [f'<a class="tcb-pagination-link" href="/g2c/campaigns/page/{number}/">{number}</a>'
+             for number in range(1, page_count + 1)]
+    if page_num < page_count:
+        links.append(f'<a class="tcb-pagination-link" href="/g2c/campaigns/page/{page_num + 1}/">Next</a>')
+    return f'<div class="tcb-pagination">{"".join(links)}</div>'.encode()
+
+def fixture_page(pages, path, page_count):
+    """
+    Return (status, body) for a path of the fixture site. Both the RoH and the G2C
+    listings have page_count pages, as their pagination widgets say; the pages
+    after them are past the end.
+    """
+    match = ROH_LISTING.match(path)
+    if match:
+        page_num = int(match.group(1) or 1)
+        if page_num > page_count:
+            return 404, pages['roh_end']
+        content = number_campaigns(pages['roh_listing'][(page_num - 1) % len(pages['roh_listing'])], page_num)
+        listing_path = path[:match.start(1) - len('page/')] if match.group(1) else path
+        return 200, ROH_PAGINATION.sub(lambda _: roh_pagination(listing_path, page_num, page_count), content)
+    
+    if path == '/campaigns/4-giving-circles/':
+        return 200, pages['roh_giving_circles']
+    if path == '/campaigns/':
+        return 200, pages['roh_main']
+    if ROH_CAMPAIGN.match(path):
+        return 200, pages['roh_campaign']
+    
+    match = G2C_LISTING.match(path)
+    if match:
+        page_num = int(match.group(1) or 1)
+        if page_num > page_count:
+            return 200, pages['g2c_end']
+        content = number_campaigns(pages['g2c_list'], page_num)
+        return 200, G2C_PAGINATION.sub(lambda _: g2c_pagination(page_num, page_count), content)
+    if G2C_CAMPAIGN.match(path):
+        return 200, pages['g2c_campaign']
+    
+    return 404, b'<html><body><h1>Not Found</h1></body></html>'
+
+class FixtureServer(ThreadingHTTPServer):
+    """
+    Local HTTP server answering with the fixture pages, after `latency` seconds
+    (jittered by +/-50%), and with a 503 for a seeded `error_rate` fraction of requests.
+    With a server_rate, requests beyond that many in the last second get a 429
+    with a Retry-After header, like a rate-limiting site.
+    """
+    daemon_threads = True
+    
+    def __init__(self, pages, page_count=3, latency=0.0, error_rate=0.0, seed=0, server_rate=0):
+        super().__init__(('127.0.0.1', 0), FixtureHandler)
+        self.origin = f"http://127.0.0.1:{self.server_address[1]}"
+        self.pages = {key: self.rewrite(value) for key, value in pages.items()}
+        self.page_count = page_count
+        self.latency = latency
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.server_rate = server_rate
+        self.recent = deque()
+        self.lock = threading.Lock()
+    
+    def over_rate(self):
+        # Sliding one-second window of accepted requests; called with the lock held
+        if not self.server_rate:
+            return False
+        now = time.monotonic()
+        while self.recent and now - self.recent[0] >= 1.0:
+            self.recent.popleft()
+        if len(self.recent) >= self.server_rate:
+            return True
+        self.recent.append(now)
+        return False
+    
+    def rewrite(self, content):
+        if isinstance(content, list):
+            return [self.rewrite(page) for page in content]
+        for site in FIXTURE_SITES:
+            content = content.replace(site, self.origin.encode())
+        return content
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    # Keep-alive, so connection reuse by the scrapers shows up in the numbers
+    protocol_version = 'HTTP/1.1'
+    # Headers and body go out as separate writes; without this Nagle's algorithm delays the body
+    disable_nagle_algorithm = True
+    
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            limited = server.over_rate()
+            delay = server.latency * server.random.uniform(0.5, 1.5)
+            failed = server.random.random() < server.error_rate
+        time.sleep(delay)
+        
+        if limited:
+            status, body = 429, b'<html><body><h1>Too Many Requests</h1></body></html>'
+        elif failed:
+            status, body = 503, b'<html><body><h1>Service Unavailable</h1></body></html>'
+        else:
+            status, body = fixture_page(server.pages, self.path.split('?')[0], server.page_count)
+        
+        self.send_response(status)
+        if limited:
+            self.send_header('Retry-After', '1')
+        self.send_header('Content-Type', 'text/html; charset=UTF-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def log_message(self, format, *args):
+        pass
+
+def serve(pages, page_count, latency, error_rate, seed, server_rate, ready):
+    server = FixtureServer(pages, page_count, latency, error_rate, seed, server_rate)
+    ready.put(server.origin)
+    server.serve_forever()
+
+def start_server(page_count=3, latency=0.0, error_rate=0.0, seed=0, server_rate=0, fixture_dir=FIXTURE_DIR):
+    """
+    Run the fixture server in its own process, so its work does not count towards
+    the scrapers' CPU time and memory. Returns (process, origin URL).
+    """
+    ready = multiprocessing.Queue()
+    process = multiprocessing.Process(target=serve, daemon=True,
+                                      args=(load_pages(fixture_dir), page_count, latency, error_rate, seed, server_rate, ready))
+    process.start()
+    return process, ready.get(timeout=10)
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def run_scraper(name, scrape, verbose=False):
+    """
+    Run one scraper with run metrics enabled and return its row of the report
+    """
+    output = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+    metrics = run_metrics.enable()
+    try:
+        with output:
+            start = time.perf_counter()
+            scrape()
+            elapsed = time.perf_counter() - start
+    finally:
+        run_metrics.finish(summary=False)
+    
+    latencies = np.array(metrics.durations['request']) * 1000
+    statuses = metrics.statuses
+    pages = statuses[200]
+    return {
+        'Scraper': name,
+        'Requests': len(latencies),
+        # Overload responses and failed requests; 404s are expected, they mark the end of a RoH category
+        'Errors': sum(count for status, count in statuses.items() if not isinstance(status, int) or status in RETRY_STATUSES),
+        'Seconds': elapsed,
+        'Pages/s': pages / elapsed if elapsed > 0 else 0,
+        'p50 ms': np.percentile(latencies, 50) if len(latencies) else 0,
+        'p99 ms': np.percentile(latencies, 99) if len(latencies) else 0,
+        'Parse s': sum(metrics.durations['parse'], 0.0),
+        'Sleep s': sum(metrics.durations['sleep'], 0.0),
+        'MB': metrics.bytes / (1024 * 1024),
+        'Peak RSS MB': peak_rss_mb()
+    }
+
+def bench_scrapers(origin, page_count=3, workers=1, requests_per_second=None, max_rate=None, parser='html.parser',
+                   verbose=False):
+    """
+    Run the RoH listing, RoH detail and G2C scrapers against the fixture server at
+    origin, in a temporary directory. workers=1 runs each scraper's serial crawl;
+    more workers use the concurrent modes. Without requests_per_second each
+    scraper starts from its own default rate.
+    """
+    RoH_scraper.SITE_URL = origin
+    g2c_url = f"{origin}/g2c/campaigns/"
+    concurrent = workers > 1
+    rates = {'max_rate': max_rate}
+    if requests_per_second is not None:
+        rates['requests_per_second'] = requests_per_second
+    
+    scrapers = [
+        ('RoH listing', lambda: RoH_scraper.scrape_ray_of_hope(concurrent, workers, parser=parser, excel=False, **rates)),
+        ('RoH details', lambda: RoH_detail_scraper.scrape_campaign_details(workers, excel=False, **rates)),
+        ('G2C', lambda: G2C_scraper.scrape_all_campaigns(g2c_url, page_count + 1, workers, excel=False, **rates)),
+    ]
+    
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        try:
+            return [run_scraper(name, scrape, verbose) for name, scrape in scrapers]
+        finally:
+            os.chdir(cwd)
+
+def print_report(rows):
+    columns = list(rows[0])
+    print(f"{columns[0]:<12}" + ''.join(f"{column:>12}" for column in columns[1:]))
+    for row in rows:
+        cells = [f"{row[column]:>12,}" if isinstance(row[column], int) else f"{row[column]:>12,.2f}"
+                 for column in columns[1:]]
+        print(f"{row['Scraper']:<12}" + ''.join(cells))
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Benchmark the scrapers end to end against a local fixture server")
+    arg_parser.add_argument('--pages', type=int, default=3,
+                            help="listing pages per RoH category and for G2C, as their pagination widgets show")
+    arg_parser.add_argument('--latency', type=float, default=20,
+                            help="mean server latency in milliseconds, jittered by +/-50%%")
+    arg_parser.add_argument('--error-rate', type=float, default=0.0,
+                            help="fraction of requests answered with 503 Service Unavailable")
+    arg_parser.add_argument('--server-rate', type=float, default=0,
+                            help="requests per second the server accepts before answering 429 with Retry-After (0 for no limit)")
+    arg_parser.add_argument('--seed', type=int, default=0, help="seed for the latency jitter and the errors")
+    arg_parser.add_argument('--workers', type=int, default=1,
+                            help="concurrent requests per scraper (1 runs the default serial crawls)")
+    arg_parser.add_argument('--rate', type=float,
+                            help="requests per second the scrapers start from (default: each scraper's own)")
+    arg_parser.add_argument('--max-rate', type=float,
+                            help="highest requests per second the scrapers' throttles may climb to (default 4x the start)")
+    arg_parser.add_argument('--parser', choices=RoH_scraper.LISTING_PARSERS, default='html.parser',
+                            help="RoH listing page parser")
+    arg_parser.add_argument('--verbose', action='store_true', help="show the scrapers' own output")
+    args = arg_parser.parse_args()
+    
+    process, origin = start_server(args.pages, args.latency / 1000, args.error_rate, args.seed, args.server_rate)
+    try:
+        print(f"Fixture server at {origin}: {args.pages} pages, {args.latency:g} ms latency, "
+              f"{args.error_rate:.0%} errors, {args.workers} worker(s)")
+        rows = bench_scrapers(origin, args.pages, args.workers, args.rate, args.max_rate, args.parser, args.verbose)
+    finally:
+        process.terminate()
+        process.join()
+    
+    print_report(rows)
@@ -0,0 +1,232 @@
+import numpy as np
+import pandas as pd
+from table_io import DATE_FORMATS, parse_dates
+
+# Metric keys of the dashboard's metricOptions (RayOfHopeAnalysis.js), in the same order
+METRICS = [
+    'TargetSuccessRate',
+    'FundraisingEfficiency',
+    'Campaigns',
+    'CampaignsMetTarget',
+    'Donors',
+    'AmountRaised',
+    'TargetAmount',
+    'AvgDonorsPerCampaign',
+    'AvgAmountPerDonor',
+    'AvgAmountPerCampaign'
+]
+
+# Per-campaign flags the dashboard filters on, kept as grouping keys so that
+# every filter combination can be answered from the same totals
+FLAG_KEYS = ['Completed', 'Outlier', 'Giving Circle']
+
+# Dimensions the metrics can be grouped by
+DIMENSIONS = ['Source Category', 'Primary Category', 'Year', 'Month']
+
+# Campaigns with a target at or above this are outliers
+OUTLIER_TARGET = 1000000
+
+def half_up(values):
+    """
+    Round to whole numbers with halves going up, like JavaScript's toFixed(0)
+    """
+    floor = np.floor(values)
+    return floor + (values - floor >= 0.5)
+
+def extract_primary_category(categories):
+    """
+    The primary category is the one starting with "0", without that prefix.
+    Falls back to the first category, or "Unknown" when there are none.
+    """
+    if not isinstance(categories, str) or not categories:
+        return "Unknown"
+    
+    parts = [part.strip() for part in categories.split(',')]
+    for part in parts:
+        if part.startswith('0'):
+            return part[1:].lstrip()
+    return parts[0] or "Unknown"
+
+def split_categories(source_category):
+    """
+    The distinct categories of a comma-joined 'Source Category' string, in order
+    """
+    if not isinstance(source_category, str):
+        return []
+    return list(dict.fromkeys(part.strip() for part in source_category.split(',')))
+
+def primary_categories(categories):
+    """
+    Primary category of every row as a categorical. extract_primary_category only
+    runs once per distinct 'Categories' string, however many rows share it.
+    """
+    codes, uniques = pd.factorize(categories)
+    primary = pd.Index([extract_primary_category(value) for value in uniques] + ["Unknown"])
+    names = pd.Index(sorted(primary.unique()))
+    # Missing 'Categories' has code -1, which picks the trailing "Unknown"
+    primary_codes = names.get_indexer(primary)[codes]
+    return pd.Categorical.from_codes(primary_codes, categories=names).remove_unused_categories()
+
+def giving_circles(source):
+    """
+    Whether each row's categorical 'Source Category' mentions giving circles
+    """
+    flags = source.cat.categories.str.lower().str.contains('giving-circles', regex=False)
+    return np.append(flags, False)[source.cat.codes]
+
+def prepare_roh(df):
+    """
+    Typed RoH campaign rows for CampaignMetrics, from the detailed campaigns table
+    """
+    start = parse_dates(df['Start Date'], DATE_FORMATS['ray_of_hope_campaigns_detailed']['Start Date'])
+    source = df['Source Category'].astype('category')
+    target = df['Target Amount'].fillna(0)
+    
+    return pd.DataFrame({
+        'Source Category': source,
+        'Primary Category': primary_categories(df['Categories']),
+        'Year': start.dt.year.astype('Int16'),
+        'Month': start.dt.month.astype('Int8'),
+        'Completed': (df['Days to Go'] == 0).fillna(False).astype(bool),
+        'Outlier': target >= OUTLIER_TARGET,
+        'Giving Circle': giving_circles(source),
+        'Amount Raised': df['Amount Raised'].fillna(0),
+        'Target Amount': target,
+        'Number of Donors': df['Number of Donors'].fillna(0).astype('int64'),
+        'Met Target': df['Amount Raised'].fillna(0) >= target,
+        'Met Completion': (df['Completion Percentage'] >= 100).fillna(False).astype(bool)
+    })
+
+def prepare_g2c(df):
+    """
+    Typed G2C campaign rows for CampaignMetrics. G2C has no categories, and, as on the
+    dashboard, a campaign counts as completed once it reached its target.
+    """
+    start = parse_dates(df['Start Date'], DATE_FORMATS['G2C_campaigns']['Start Date'])
+    target = df['Target Amount'].fillna(0)
+    reached = (df['Percentage Completion'] >= 100).fillna(False).astype(bool)
+    
+    return pd.DataFrame({
+        'Source Category': pd.Categorical([None] * len(df)),
+        'Primary Category': pd.Categorical([None] * len(df)),
+        'Year': start.dt.year.astype('Int16'),
+        'Month': start.dt.month.astype('Int8'),
+        'Completed': reached,
+        'Outlier': target >= OUTLIER_TARGET,
+        'Giving Circle': False,
+        'Amount Raised': df['Amount Raised'].fillna(0),
+        'Target Amount': target,
+        'Number of Donors': df['Number of Donors'].fillna(0).astype('int64'),
+        'Met Target': df['Amount Raised'].fillna(0) >= target,
+        'Met Completion': reached
+    }, index=df.index)
+
+def derive_metrics(sums, round_overall=False):
+    """
+    Turn additive sums (Campaigns, CampaignsMetTarget, AmountRaised, TargetAmount,
+    Donors) into the dashboard metrics. round_overall reproduces the rounding of
+    the dashboard's overall table, which works with the amount raised rounded to
+    whole dollars and shows the two percentages as whole numbers.
+    """
+    table = sums.copy()
+    if round_overall:
+        table['AmountRaised'] = half_up(table['AmountRaised'])
+    
+    campaigns = table['Campaigns']
+    raised = table['AmountRaised']
+    target = table['TargetAmount']
+    donors = table['Donors']
+    
+    table['FundraisingEfficiency'] = (raised / target.where(target > 0) * 100).fillna(0)
+    table['TargetSuccessRate'] = table['CampaignsMetTarget'] / campaigns * 100
+    table['AvgDonorsPerCampaign'] = donors / campaigns
+    table['AvgAmountPerDonor'] = (raised / donors.where(donors > 0)).fillna(0)
+    table['AvgAmountPerCampaign'] = raised / campaigns
+    
+    if round_overall:
+        table['FundraisingEfficiency'] = half_up(table['FundraisingEfficiency'])
+        table['TargetSuccessRate'] = half_up(table['TargetSuccessRate'])
+    
+    return table[METRICS]
+
+class CampaignMetrics:
+    """
+    Dashboard metrics over a table of campaigns (see prepare_roh / prepare_g2c).
+    
+    The rows are reduced once, in a single groupby over the filter flags, the
+    combined source categories, primary category, year and month. Every metric
+    table for any filter combination is then a roll-up of those totals, so
+    millions of campaign snapshots cost one pass and each table is near free.
+    """
+    def __init__(self, campaigns):
+        values = pd.DataFrame({
+            'Campaigns': np.ones(len(campaigns), dtype='int64'),
+            'CampaignsMetTarget': campaigns['Met Target'].to_numpy(dtype='int64'),
+            'CampaignsMetCompletion': campaigns['Met Completion'].to_numpy(dtype='int64'),
+            'AmountRaised': campaigns['Amount Raised'].to_numpy(dtype='float64'),
+            'TargetAmount': campaigns['Target Amount'].to_numpy(dtype='float64'),
+            'Donors': campaigns['Number of Donors'].to_numpy(dtype='int64')
+        })
+        keys = [campaigns[key].reset_index(drop=True) for key in FLAG_KEYS + DIMENSIONS]
+        self.totals = values.groupby(keys, observed=True, dropna=False, sort=False).sum()
+        
+        # Which individual categories each combined 'Source Category' string stands for
+        combined = campaigns['Source Category'].cat.categories
+        self.category_links = pd.DataFrame(
+            [(value, category) for value in combined for category in split_categories(value)],
+            columns=['Source Category', 'Category']
+        )
+        self.source_categories = sorted(self.category_links['Category'].unique())
+        self.primary_categories = list(campaigns['Primary Category'].cat.categories)
+    
+    def select(self, completed_only=False, remove_outliers=False, exclude_giving_circles=False):
+        """
+        The totals left after the dashboard filters
+        """
+        totals = self.totals
+        keep = np.ones(len(totals), dtype=bool)
+        if completed_only:
+            keep &= totals.index.get_level_values('Completed').to_numpy(dtype=bool)
+        if remove_outliers:
+            keep &= ~totals.index.get_level_values('Outlier').to_numpy(dtype=bool)
+        if exclude_giving_circles:
+            keep &= ~totals.index.get_level_values('Giving Circle').to_numpy(dtype=bool)
+        return totals[keep]
+    
+    def sums(self, by, met='target', **filters):
+        """
+        Additive sums grouped by `by`, a list of DIMENSIONS. 'Source Category' means
+        the individual categories, so a campaign counts once in each of its categories.
+        met='completion' counts a target as met when the completion percentage is at
+        least 100, as the platform comparison does, instead of raised >= target.
+        """
+        totals = self.select(**filters)
+        columns = ['Campaigns', 'CampaignsMetTarget' if met == 'target' else 'CampaignsMetCompletion',
+                   'AmountRaised', 'TargetAmount', 'Donors']
+        totals = totals[columns].rename(columns={columns[1]: 'CampaignsMetTarget'})
+        
+        if 'Source Category' not in by:
+            return totals.groupby(level=by, observed=True).sum()
+        
+        other = [key for key in by if key != 'Source Category']
+        partial = totals.groupby(level=['Source Category'] + other, observed=True).sum().reset_index()
+        partial['Source Category'] = partial['Source Category'].astype('object')
+        exploded = partial.merge(self.category_links, on='Source Category')
+        exploded['Source Category'] = pd.Categorical(exploded.pop('Category'), categories=self.source_categories)
+        return exploded.groupby(by, observed=True).sum()
+    
+    def table(self, by, met='target', round_overall=False, **filters):
+        """
+        Dashboard metrics (METRICS columns) for each group of `by`
+        """
+        return derive_metrics(self.sums(by, met, **filters), round_overall)
+    
+    def monthly_starts(self, **filters):
+        """
+        Campaigns started per month: {year: [12 counts]}
+        """
+        counts = self.sums(['Year', 'Month'], **filters)['Campaigns']
+        return {
+            str(year): [int(counts.get((year, month), 0)) for month in range(1, 13)]
+            for year in counts.index.get_level_values('Year').unique()
+        }
@@ -0,0 +1,95 @@
+// Runs the dashboard's own aggregation code under node, for check_metrics.py.
+//
+// Usage: node check_metrics.js COMPONENT.js ... < input.json > output.json
+//
+// Each component's source, without the statements rendering JSX, is evaluated with stand-ins
+// for React's hooks, fetch and XLSX. The numbers therefore come from the code the
+// dashboard ships, not from a copy of it. input.json holds {"tables": {file name:
+// rows as XLSX.utils.sheet_to_json returns them}, "combinations": {key: {state
+// variable: value}}}; the output holds the component state after each combination.
+const fs = require('fs');
+
+function componentBody(path) {
+    const lines = fs.readFileSync(path, 'utf8').split('\n');
+    const start = lines.findIndex(line => /^const \w+ = \(\) => \{/.test(line));
+    const end = lines.findIndex((line, i) => i > start && line.startsWith('};'));
+    if (start === -1 || end === -1) {
+        throw new Error(`Could not find the component in ${path}`);
+    }
+
+    // Split the body into its top-level statements and leave out those rendering JSX
+    const statements = [];
+    for (const line of lines.slice(start + 1, end)) {
+        if (statements.length === 0 || /^    [^\s})\]]/.test(line)) {
+            statements.push([]);
+        }
+        statements[statements.length - 1].push(line);
+    }
+    const body = statements.map(statement => statement.join('\n'))
+        .filter(statement => !/<\/?[A-Za-z]/.test(statement))
+        .join('\n');
+
+    // Pass the name of each state variable to useState, so the filters can be set by name
+    return body.replace(/const \[(\w+), (\w+)\] = useState\(/g, "const [$1, $2] = useState('$1', ");
+}
+
+async function render(body, tables, overrides) {
+    // Render like React does: run the body, then its effects, until the state stops changing
+    const names = Object.keys(tables);
+    const state = { ...overrides };
+    const quiet = { log: () => {}, error: (...args) => console.error(...args) };
+
+    // Each fetched file is an ArrayBuffer holding its index in names, which XLSX.read turns back into rows
+    const fetch = async url => {
+        const index = names.indexOf(url.split('/').pop());
+        return { arrayBuffer: async () => new Uint8Array([index]).buffer };
+    };
+    const XLSX = {
+        read: data => ({ SheetNames: ['Sheet1'], Sheets: { Sheet1: names[data[0]] } }),
+        utils: { sheet_to_json: name => structuredClone(tables[name]) }
+    };
+
+    for (let pass = 0; pass < 10; pass++) {
+        const before = JSON.stringify(state);
+        const effects = [];
+        const useState = (name, initial) => {
+            if (!(name in state)) {
+                state[name] = initial;
+            }
+            return [state[name], next => {
+                state[name] = typeof next === 'function' ? next(state[name]) : next;
+            }];
+        };
+        const useEffect = effect => effects.push(effect);
+
+        new Function('useState', 'useEffect', 'fetch', 'XLSX', 'process', 'console', body)(
+            useState, useEffect, fetch, XLSX, { env: { PUBLIC_URL: '' } }, quiet);
+        effects.forEach(effect => effect());
+
+        // Let the effects' promises settle
+        await new Promise(resolve => setTimeout(resolve, 0));
+        if (JSON.stringify(state) === before) {
+            return state;
+        }
+    }
+    throw new Error('The component state did not settle');
+}
+
+async function main() {
+    const input = JSON.parse(fs.readFileSync(0, 'utf8'));
+    const bodies = process.argv.slice(2).map(componentBody);
+
+    const output = {};
+    for (const [key, overrides] of Object.entries(input.combinations)) {
+        output[key] = {};
+        for (const body of bodies) {
+            Object.assign(output[key], await render(body, input.tables, overrides));
+        }
+    }
+    process.stdout.write(JSON.stringify(output));
+}
+
+main().catch(error => {
+    console.error(error);
+    process.exit(1);
+});
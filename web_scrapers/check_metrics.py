@@ -0,0 +1,139 @@
+import argparse
+import itertools
+import json
+import math
+import os
+import subprocess
+import sys
+import pandas as pd
+from campaign_metrics import METRICS
+from dashboard_aggregates import FILTERS, build_aggregates, filter_key
+
+SCRAPERS_DIR = os.path.dirname(os.path.abspath(__file__))
+DASHBOARD_DIR = os.path.join(SCRAPERS_DIR, '..', 'ray-of-hope-analysis')
+PUBLIC_DIR = os.path.join(DASHBOARD_DIR, 'public')
+
+# The dashboard components whose aggregation code check_metrics.js runs
+COMPONENTS = [os.path.join(DASHBOARD_DIR, 'src', 'RayOfHopeAnalysis.js'),
+              os.path.join(DASHBOARD_DIR, 'src', 'PlatformComparison.js')]
+
+# The dashboard's state variables for each filter in FILTERS
+FILTER_STATES = ['showOnlyCompleted', 'removeOutliers', 'excludeGivingCircles']
+
+# Years the dashboard's monthly chart and platform comparison are limited to
+DASHBOARD_YEARS = ['2023', '2024']
+
+# dashboard_aggregates rounds every value to 2 decimals
+TOLERANCE = 0.005 + 1e-9
+
+def load_rows(path):
+    """
+    Rows of a workbook as dicts without the empty cells, like sheet_to_json
+    """
+    df = pd.read_excel(path)
+    return [{key: value for key, value in row.items() if not pd.isna(value)} for row in df.to_dict('records')]
+
+def run_dashboard(roh_path, g2c_path):
+    """
+    State of the dashboard components for every filter combination, keyed like
+    dashboard_aggregates, as computed by their own JavaScript under node
+    """
+    combinations = {
+        filter_key(*flags): dict(zip(FILTER_STATES, flags))
+        for flags in itertools.product([False, True], repeat=len(FILTERS))
+    }
+    payload = {
+        'tables': {
+            'ray_of_hope_campaigns_detailed.xlsx': load_rows(roh_path),
+            'G2C_campaigns.xlsx': load_rows(g2c_path)
+        },
+        'combinations': combinations
+    }
+    result = subprocess.run(['node', os.path.join(SCRAPERS_DIR, 'check_metrics.js'), *COMPONENTS],
+                            input=json.dumps(payload, default=str), stdout=subprocess.PIPE, text=True, check=True)
+    return json.loads(result.stdout)
+
+def table_rows(table, years=None):
+    """
+    {key: metrics} of a dashboard_aggregates table; the key is its non-metric columns as text
+    """
+    key_columns = [i for i, column in enumerate(table['columns']) if column not in METRICS]
+    rows = {}
+    for row in table['rows']:
+        key = tuple(str(row[i]) for i in key_columns)
+        if years is None or key[-1] in years:
+            rows[key] = dict(zip(table['columns'], row))
+    return rows
+
+def js_rows(records, key_columns):
+    """
+    {key: metrics} of the dashboard's metric records. Groups without campaigns
+    are left out, as dashboard_aggregates has no rows for them.
+    """
+    return {tuple(str(record[column]) for column in key_columns): record
+            for record in records if record['Campaigns'] > 0}
+
+def same(expected, actual):
+    if expected is None or actual is None:
+        return expected is actual
+    return math.isclose(expected, actual, rel_tol=1e-9, abs_tol=TOLERANCE)
+
+def compare(name, expected, actual):
+    """
+    Compare the dashboard's {key: metrics} with those of dashboard_aggregates
+    """
+    mismatches = []
+    for key in sorted(set(expected) | set(actual)):
+        if key not in actual or key not in expected:
+            mismatches.append(f"{name} {key}: only in {'dashboard' if key in expected else 'dashboard_aggregates'}")
+            continue
+        for metric in METRICS:
+            if not same(expected[key][metric], actual[key][metric]):
+                mismatches.append(f"{name} {key} {metric}: {expected[key][metric]} != {actual[key][metric]}")
+    return mismatches
+
+def check_metrics(roh_path, g2c_path):
+    """
+    Compare dashboard_aggregates with the dashboard's JavaScript for every filter combination
+    """
+    dashboard = run_dashboard(roh_path, g2c_path)
+    aggregates = build_aggregates(pd.read_excel(roh_path), pd.read_excel(g2c_path))
+    
+    mismatches = []
+    for key, data in aggregates['data'].items():
+        state = dashboard[key]
+        found = []
+        if state['data'].get('error') or state['dataState'].get('error'):
+            found.append(f"dashboard error: {state['data'].get('error') or state['dataState'].get('error')}")
+        
+        found += compare('overall', js_rows(state['data']['overallMetrics'], ['Year']), table_rows(data['overall']))
+        found += compare('source category', js_rows(state['data']['categoryMetrics'], ['Category', 'Year']),
+                         table_rows(data['sourceCategory']))
+        found += compare('primary category', js_rows(state['data']['primaryCategoryMetrics'], ['Category', 'Year']),
+                         table_rows(data['primaryCategory']))
+        
+        for year in DASHBOARD_YEARS:
+            expected = state['monthlyDistribution'][year]
+            actual = data['monthly'].get(year, [0] * 12)
+            if expected != actual:
+                found.append(f"monthly {year}: {expected} != {actual}")
+        
+        for platform, table in data['platforms'].items():
+            expected = {(year,): metrics for year, metrics in state['platformData'][platform].items() if metrics}
+            found += compare(f"platform {platform}", expected, table_rows(table, DASHBOARD_YEARS))
+        
+        print(f"{key}: {'identical' if not found else f'{len(found)} DIFFERENT'}")
+        mismatches += found
+    
+    return mismatches
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check dashboard_aggregates against the dashboard's JavaScript, run under node")
+    parser.add_argument('--roh', default=os.path.join(PUBLIC_DIR, 'ray_of_hope_campaigns_detailed.xlsx'))
+    parser.add_argument('--g2c', default=os.path.join(PUBLIC_DIR, 'G2C_campaigns.xlsx'))
+    args = parser.parse_args()
+    
+    mismatches = check_metrics(args.roh, args.g2c)
+    for mismatch in mismatches:
+        print(f"Mismatch: {mismatch}")
+    sys.exit(1 if mismatches else 0)
@@ -0,0 +1,35 @@
+import glob
+import os
+import sys
+from RoH_scraper import LISTING_PARSERS, parse_campaign_posts
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'roh')
+
+def check_listing_parsers(fixture_dir=FIXTURE_DIR):
+    """
+    Parse every saved listing page with each parser in LISTING_PARSERS and
+    report any fixture where the campaign records are not identical
+    """
+    mismatches = []
+    
+    for path in sorted(glob.glob(os.path.join(fixture_dir, '*.html'))):
+        with open(path, 'rb') as f:
+            content = f.read()
+        
+        results = {parser: parse_campaign_posts(content, 'fixture', parser) for parser in LISTING_PARSERS}
+        reference = results[LISTING_PARSERS[0]]
+        
+        for parser, result in results.items():
+            if result != reference:
+                mismatches.append((os.path.basename(path), parser))
+        
+        print(f"{os.path.basename(path)}: {len(reference.campaigns)} campaigns, "
+              f"{'identical' if all(r == reference for r in results.values()) else 'DIFFERENT'}")
+    
+    return mismatches
+
+if __name__ == "__main__":
+    mismatches = check_listing_parsers()
+    for fixture, parser in mismatches:
+        print(f"Mismatch: {parser} differs from {LISTING_PARSERS[0]} on {fixture}")
+    sys.exit(1 if mismatches else 0)
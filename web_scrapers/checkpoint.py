@@ -0,0 +1,111 @@
+import json
+import os
+import threading
+
+def journal_path(name, directory='.'):
+    """
+    Path of the journal of the output table name, next to the table in directory
+    """
+    return os.path.join(directory, f"{name}.journal.jsonl")
+
+def json_default(value):
+    # NumPy/pandas scalars (e.g. from a previous output table) as plain Python values
+    if hasattr(value, 'item'):
+        return value.item()
+    return str(value)
+
+class Journal:
+    """
+    Append-only JSON-lines checkpoint of finished records, keyed by URL.
+    
+    Each record is written and flushed as soon as it is finished, so a crashed or
+    killed crawl loses at most the record being written. With resume=True the
+    records of the previous run are kept (a partly written last line is
+    dropped) and new ones are appended. With restart=True an existing journal
+    is discarded and the journal starts empty. With neither, an existing
+    journal raises FileExistsError rather than being overwritten, so a rerun
+    that forgets --resume cannot lose the records of an interrupted run.
+    Only the file offset of each URL's latest record is kept in memory; get()
+    and items() read the records back from the file.
+    """
+    def __init__(self, path, resume=False, restart=False):
+        if not resume and not restart and os.path.exists(path) and os.path.getsize(path):
+            raise FileExistsError(f"{path} holds the campaigns of an interrupted run; "
+                                  f"rerun with --resume to continue it or --restart to discard it")
+        self.path = path
+        self.lock = threading.Lock()
+        self.offsets = self.load() if resume else {}
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.file = open(path, 'ab' if resume else 'wb')
+        self.reader = open(path, 'rb')
+    
+    def load(self):
+        try:
+            with open(self.path, 'rb') as f:
+                content = f.read()
+        except FileNotFoundError:
+            return {}
+        
+        # Cut off a line left unfinished by a crash, so new lines start cleanly
+        complete = len(content[:content.rfind(b'\n') + 1])
+        if complete < len(content):
+            with open(self.path, 'r+b') as f:
+                f.truncate(complete)
+        
+        offsets = {}
+        offset = 0
+        for line in content[:complete].splitlines(keepends=True):
+            try:
+                offsets[json.loads(line)['url']] = offset
+            except ValueError:
+                pass
+            offset += len(line)
+        return offsets
+    
+    def __contains__(self, url):
+        return url in self.offsets
+    
+    def __len__(self):
+        return len(self.offsets)
+    
+    def get(self, url):
+        """
+        The latest record journaled for url
+        """
+        with self.lock:
+            self.reader.seek(self.offsets[url])
+            return json.loads(self.reader.readline())['record']
+    
+    def items(self):
+        """
+        Yield (url, record) for every URL in the journal, in the order they were first written
+        """
+        for url in list(self.offsets):
+            yield url, self.get(url)
+    
+    def append(self, url, record):
+        line = json.dumps({'url': url, 'record': record}, default=json_default).encode('utf-8') + b'\n'
+        with self.lock:
+            offset = self.file.tell()
+            self.file.write(line)
+            self.file.flush()
+            self.offsets[url] = offset
+    
+    def close(self):
+        if not self.file.closed:
+            self.file.close()
+            self.reader.close()
+    
+    def remove(self):
+        """
+        Delete the journal once its records are safely in the final output
+        """
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,92 @@
+import argparse
+import os
+from http_cache import ResponseCache
+from fragment_cache import FragmentCache, code_version
+from parse_pool import ParsePool
+from snapshot_store import SnapshotStore
+from crawl_scheduler import crawl_platforms
+from normalize import run_timestamp
+from G2C_scraper import G2CPlatform
+from RoH_detail_scraper import RoHDetailPlatform
+import G2C_scraper
+import RoH_scraper
+import run_metrics
+
+# Platforms crawl_all.py can crawl, by name
+PLATFORMS = {platform.name: platform for platform in [RoHDetailPlatform, G2CPlatform]}
+
+def main():
+    parser = argparse.ArgumentParser(description="Crawl several charity platforms at once")
+    parser.add_argument('--platforms', nargs='+', choices=list(PLATFORMS), default=list(PLATFORMS),
+                        help="platforms to crawl (default: all)")
+    parser.add_argument('--max-per-host', type=int, default=4, help="maximum concurrent requests per host")
+    parser.add_argument('--rate', type=float,
+                        help="requests per second per host to start from (default: each platform's own rate); "
+                             "the rate then adapts to the server's responses")
+    parser.add_argument('--max-rate', type=float,
+                        help="highest requests per second per host the rate may climb to (default 4x each platform's rate)")
+    parser.add_argument('--parser', choices=RoH_scraper.LISTING_PARSERS, default='html.parser',
+                        help="RoH listing page parser")
+    parser.add_argument('--no-excel', dest='excel', action='store_false',
+                        help="only write Parquet output, without the Excel/CSV exports")
+    parser.add_argument('--output-dir', default='.', help="directory to write the tables and their journals to")
+    parser.add_argument('--incremental', action='store_true',
+                        help="reuse the details of campaigns that had ended in the previous output")
+    parser.add_argument('--resume', action='store_true',
+                        help="continue an interrupted run, skipping the campaigns already in its journals")
+    parser.add_argument('--restart', action='store_true',
+                        help="discard the journals of an interrupted run and scrape every campaign again")
+    parser.add_argument('--run-date', help="date the RoH Days Active is counted to (default: today)")
+    parser.add_argument('--snapshot-db',
+                        help="SQLite file to append this run's campaign progress to (see snapshot_store.py)")
+    parser.add_argument('--roh-site-url', default=RoH_scraper.SITE_URL, help="root URL of the Ray of Hope site")
+    parser.add_argument('--g2c-base-url', default="https://www.childrensociety.org.sg/g2c/campaigns/",
+                        help="URL of the first G2C campaign list page")
+    parser.add_argument('--cache-dir', help="directory for the on-disk HTTP response cache (disabled if omitted)")
+    parser.add_argument('--cache-ttl', type=float, default=0,
+                        help="seconds a cached page is used without revalidating it with the server")
+    parser.add_argument('--fragment-dir',
+                        help="directory of each platform's listing fragment cache (roh.json, g2c.json), so only "
+                             "changed listing cards are parsed (disabled if omitted)")
+    parser.add_argument('--parse-workers', type=int, default=0,
+                        help="processes to parse pages in (0 parses them on the fetching threads)")
+    parser.add_argument('--metrics', action='store_true',
+                        help="time every request, parse, save and sleep and print a summary at the end")
+    parser.add_argument('--trace', help="JSON-lines file to write every timed event to (implies --metrics)")
+    args = parser.parse_args()
+    
+    if args.metrics or args.trace:
+        run_metrics.enable(args.trace)
+    
+    RoH_scraper.SITE_URL = args.roh_site_url.rstrip('/')
+    cache = ResponseCache(args.cache_dir, ttl=args.cache_ttl) if args.cache_dir else None
+    parse_pool = ParsePool(args.parse_workers) if args.parse_workers else None
+    snapshots = SnapshotStore(args.snapshot_db) if args.snapshot_db else None
+    options = {'roh': {'parser': args.parser, 'run_time': run_timestamp(args.run_date)},
+               'g2c': {'base_url': args.g2c_base_url}}
+    
+    fragments = {}
+    if args.fragment_dir:
+        # Each platform's cards are parsed by its own scraper, so its records are versioned by that file
+        versions = {'roh': code_version(RoH_scraper.__file__), 'g2c': code_version(G2C_scraper.__file__)}
+        os.makedirs(args.fragment_dir, exist_ok=True)
+        fragments = {name: FragmentCache(os.path.join(args.fragment_dir, f'{name}.json'), versions[name])
+                     for name in args.platforms}
+    
+    print(f"Crawling {', '.join(args.platforms)}...")
+    platforms = [PLATFORMS[name](**options.get(name, {})) for name in args.platforms]
+    try:
+        crawl_platforms(platforms, args.max_per_host, cache, args.rate, args.max_rate, args.excel, parse_pool,
+                        args.output_dir, args.resume, args.restart, args.incremental, fragments, snapshots)
+    finally:
+        if snapshots is not None:
+            snapshots.close()
+        if parse_pool is not None:
+            parse_pool.close()
+    if parse_pool is not None:
+        parse_pool.print_summary()
+    print("Crawling completed.")
+    run_metrics.finish()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,342 @@
+import queue
+import threading
+from collections import defaultdict, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from functools import partial
+from urllib.parse import urlparse
+import requests
+from requests.adapters import HTTPAdapter
+from rate_limit import AdaptiveThrottle
+from http_cache import fetch, parse_response
+from checkpoint import Journal, journal_path
+from table_io import BATCH_SIZE, read_table
+
+# Key of the listing holding a platform's known_campaigns(), ahead of every crawled listing
+KNOWN_KEY = (-1, 0)
+
+class PlatformCrawl:
+    """
+    One platform's part of a crawl: the listing pages parsed so far (by page
+    key) and the details of each campaign page (by URL). Listing pages are
+    handed on to the platform's output as soon as they and every page before
+    them are done, with the details of all their campaigns.
+    
+    - journal: Journal the details are appended to as they are scraped;
+      campaign pages already in it (from an interrupted run) are not fetched
+    - frozen: {url: details} reused for campaigns that had ended (see Platform.frozen_details)
+    - fragments: FragmentCache the listing pages are parsed with
+    """
+    def __init__(self, platform, journal=None, frozen=None, fragments=None):
+        self.platform = platform
+        self.journal = journal
+        self.frozen = frozen or {}
+        self.fragments = fragments
+        self.listings = {}
+        self.outstanding = set()
+        self.ended = set()
+        self.details = {}
+        self.detail_urls = set()
+        self.waiting = set()
+        self.output = queue.Queue()
+        self.stats = {'listed': 0, 'fetched': 0, 'failed': 0, 'frozen': 0, 'journaled': 0}
+    
+    def ready(self, campaigns):
+        return not any(self.platform.detail_url(campaign) in self.waiting for campaign in campaigns or [])
+    
+    def flush(self):
+        """
+        Hand on the listing pages that are done, in key order. A page waits for
+        every page with a smaller key still being crawled, since that page may end
+        its listing, and for the campaign pages of its campaigns.
+        """
+        while self.listings:
+            key = min(self.listings)
+            if self.outstanding and min(self.outstanding) < key:
+                return
+            campaigns = self.listings[key]
+            if not self.ready(campaigns):
+                return
+            del self.listings[key]
+            
+            seed = key[0]
+            if seed in self.ended:
+                continue
+            if campaigns is None:
+                self.ended.add(seed)
+                continue
+            self.stats['listed'] += len(campaigns)
+            self.output.put(campaigns)
+    
+    def campaigns(self):
+        """
+        Yield the listed campaigns in key order while the crawl goes on; an
+        exception of the crawl is raised here
+        """
+        while (campaigns := self.output.get()) is not None:
+            if isinstance(campaigns, BaseException):
+                raise campaigns
+            yield from campaigns
+    
+    def print_summary(self):
+        stats = self.stats
+        print(f"[{self.platform.name}] {stats['listed']} listed campaigns; campaign pages: {stats['fetched']} fetched, "
+              f"{stats['failed']} failed, {stats['frozen']} reused from the previous output, "
+              f"{stats['journaled']} from the journal")
+
+class CrawlScheduler:
+    """
+    Crawls the listing and campaign pages of any number of platforms (see
+    platforms.py) at once, on one pool of threads.
+    
+    Pages wait in a queue per host and are sent while fewer than max_per_host
+    requests are in flight to their host, each host being paced by its own
+    AdaptiveThrottle (starting at requests_per_second, or else at the rate of
+    the first platform on it, up to max_rate); max_per_host=1 crawls one page at a
+    time. The listing pages each page points to, and the campaign pages
+    of the campaigns it lists, are queued as soon as it is parsed, so listing
+    and detail crawls of all platforms overlap.
+    A listing page that cannot be fetched or parsed ends its listing, like a
+    page marking the end does; a campaign page that fails leaves its campaign
+    without details and out of the journal, so a resumed run fetches it again.
+    With a ParsePool, the fetching threads hand the pages to its worker
+    processes for parsing, so parsing runs on every core. Pages parsed with a
+    FragmentCache, or by platforms keeping state in this process, are parsed here.
+    """
+    def __init__(self, crawls, max_per_host=4, cache=None, requests_per_second=None, max_rate=None, parse_pool=None):
+        self.crawls = {crawl.platform.name: crawl for crawl in crawls}
+        self.max_per_host = max_per_host
+        self.cache = cache
+        self.requests_per_second = requests_per_second
+        self.max_rate = max_rate
+        self.parse_pool = parse_pool
+        self.pending = defaultdict(deque)
+        self.in_flight = defaultdict(int)
+        self.throttles = {}
+    
+    def queue(self, crawl, kind, url, page=None):
+        host = urlparse(url).netloc
+        if host not in self.throttles:
+            rate = self.requests_per_second or crawl.platform.requests_per_second
+            self.throttles[host] = AdaptiveThrottle(rate, self.max_rate)
+        if kind == 'listing':
+            crawl.outstanding.add(page.key)
+        self.pending[host].append((crawl, kind, url, page))
+    
+    def queue_details(self, crawl, campaigns):
+        platform = crawl.platform
+        for campaign in campaigns or []:
+            url = platform.detail_url(campaign)
+            if url is None or url in crawl.detail_urls:
+                continue
+            crawl.detail_urls.add(url)
+            
+            if url in crawl.frozen and platform.ended(campaign):
+                crawl.details[url] = crawl.frozen[url]
+                crawl.stats['frozen'] += 1
+            elif crawl.journal is not None and url in crawl.journal:
+                crawl.details[url] = crawl.journal.get(url)
+                crawl.stats['journaled'] += 1
+            else:
+                crawl.waiting.add(url)
+                self.queue(crawl, 'detail', url)
+    
+    def fetch_page(self, session, crawl, kind, url, page):
+        """
+        Fetch and parse one page on a worker thread. Returns the parse result, or
+        None if the page could not be fetched or parsed.
+        """
+        platform = crawl.platform
+        print(f"[{platform.name}] Scraping {kind} page: {url}")
+        try:
+            response = fetch(url, session, self.cache, headers=platform.headers, timeout=platform.timeout,
+                             throttle=self.throttles[urlparse(url).netloc])
+            if response.status_code != 200:
+                print(f"[{platform.name}] Failed to access {url} (Status code: {response.status_code})")
+                return None
+            
+            # Bound methods of the platform, so they can be sent to the ParsePool's processes
+            pool = None if crawl.fragments is not None or platform.in_process else self.parse_pool
+            if kind == 'listing':
+                return parse_response(response, platform.parse_name(kind),
+                                      partial(platform.parse_listing, page=page, fragments=crawl.fragments),
+                                      self.cache, pool)
+            return parse_response(response, platform.parse_name(kind), platform.parse_detail, self.cache, pool)
+        except requests.exceptions.RequestException as e:
+            print(f"[{platform.name}] Error accessing {url}: {e}")
+        except Exception as e:
+            print(f"[{platform.name}] An error occurred while processing {url}: {e}")
+        return None
+    
+    def finish_page(self, crawl, kind, url, page, result):
+        # Runs on the scheduling thread, so the crawl state needs no lock
+        if kind == 'detail':
+            crawl.waiting.discard(url)
+            if result is None:
+                crawl.stats['failed'] += 1
+            else:
+                crawl.details[url] = result
+                crawl.stats['fetched'] += 1
+                if crawl.journal is not None:
+                    crawl.journal.append(url, result)
+        else:
+            self.finish_listing(crawl, page, result)
+        crawl.flush()
+    
+    def finish_listing(self, crawl, page, result):
+        crawl.outstanding.discard(page.key)
+        if result is None:
+            crawl.listings[page.key] = None
+            return
+        crawl.listings[page.key] = result['campaigns']
+        self.queue_details(crawl, result['campaigns'])
+        for next_page in crawl.platform.next_pages(page, result):
+            self.queue(crawl, 'listing', next_page.url, next_page)
+    
+    def run(self):
+        """
+        Crawl every platform to the end, handing each platform's campaigns to its
+        PlatformCrawl.output as they are ready; the end of the crawl, or the
+        exception it stopped with, is put there last. Returns {platform name: PlatformCrawl}.
+        """
+        try:
+            self.crawl()
+        except BaseException as e:
+            for crawl in self.crawls.values():
+                crawl.output.put(e)
+            raise
+        for crawl in self.crawls.values():
+            crawl.output.put(None)
+        return self.crawls
+    
+    def crawl(self):
+        for crawl in self.crawls.values():
+            known = crawl.platform.known_campaigns()
+            if known:
+                crawl.listings[KNOWN_KEY] = known
+                self.queue_details(crawl, known)
+            for page in crawl.platform.listing_pages():
+                self.queue(crawl, 'listing', page.url, page)
+            crawl.flush()
+        
+        with requests.Session() as session:
+            # Room for max_per_host connections to each host
+            adapter = HTTPAdapter(pool_maxsize=self.max_per_host)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            
+            # Campaign pages are on the hosts of their listings, so these threads are enough for every host
+            with ThreadPoolExecutor(max_workers=self.max_per_host * max(len(self.throttles), 1)) as executor:
+                running = {}
+                while running or any(self.pending.values()):
+                    for host, tasks in self.pending.items():
+                        while tasks and self.in_flight[host] < self.max_per_host:
+                            task = tasks.popleft()
+                            self.in_flight[host] += 1
+                            running[executor.submit(self.fetch_page, session, *task)] = (host, task)
+                    
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        host, task = running.pop(future)
+                        self.in_flight[host] -= 1
+                        self.finish_page(*task, future.result())
+        
+        for host, throttle in self.throttles.items():
+            print(f"{host}: ", end='')
+            throttle.print_summary()
+        if self.cache is not None:
+            self.cache.print_summary()
+
+def open_journals(platforms, directory='.', resume=False, restart=False):
+    """
+    {platform name: Journal} for the platforms crawling campaign pages, or None
+    (after closing those already opened) when a journal of an interrupted run is
+    in the way and neither resume nor restart is set
+    """
+    journals = {}
+    for platform in platforms:
+        if not platform.details:
+            continue
+        path = journal_path(platform.table, directory)
+        try:
+            journals[platform.name] = Journal(path, resume, restart)
+        except FileExistsError as e:
+            print(f"Error: {e}")
+            for journal in journals.values():
+                journal.close()
+            return None
+        if resume:
+            print(f"[{platform.name}] Resuming: {len(journals[platform.name])} campaigns already in {path}")
+    return journals
+
+def crawl_platforms(platforms, max_per_host=4, cache=None, requests_per_second=None, max_rate=None, excel=True,
+                    parse_pool=None, directory='.', resume=False, restart=False, incremental=False, fragments=None,
+                    snapshots=None, batch_size=BATCH_SIZE):
+    """
+    Crawl the platforms concurrently with a CrawlScheduler and save each
+    platform's tables in directory. Each platform's campaigns stream into its
+    save() on a thread of its own as the crawl lists them, in listing order, so
+    only the pages being crawled are held in memory.
+    
+    The details of every campaign page are journaled in directory as soon as
+    they are scraped (see checkpoint.py). With resume=True the campaign pages
+    already in the journal of an interrupted run are not fetched again; with
+    restart=True that journal is discarded instead, and with neither the crawl
+    does not start rather than overwrite it. A journal is deleted once its
+    platform's tables are written, and kept if they are not.
+    With incremental=True, the details of campaigns that had ended in the
+    previous output in directory are reused instead of fetched.
+    fragments is {platform name: FragmentCache} for the listing pages; each one
+    is saved for the next run at the end.
+    Pass a SnapshotStore to append each saved platform table to its history.
+    Returns {platform name: True if its tables were saved}, or None if the crawl did not start.
+    """
+    journals = open_journals(platforms, directory, resume, restart)
+    if journals is None:
+        return None
+    fragments = fragments or {}
+    
+    crawls = []
+    for platform in platforms:
+        frozen = platform.frozen_details(directory) if incremental else None
+        crawls.append(PlatformCrawl(platform, journals.get(platform.name), frozen, fragments.get(platform.name)))
+    
+    saved = {}
+    errors = []
+    
+    def save(crawl):
+        try:
+            saved[crawl.platform.name] = crawl.platform.save(crawl.campaigns(), crawl.details, excel, batch_size,
+                                                             directory)
+        except BaseException as e:
+            errors.append(e)
+    
+    threads = [threading.Thread(target=save, args=(crawl,), daemon=True) for crawl in crawls]
+    for thread in threads:
+        thread.start()
+    try:
+        CrawlScheduler(crawls, max_per_host, cache, requests_per_second, max_rate, parse_pool).run()
+    finally:
+        for thread in threads:
+            thread.join()
+        for journal in journals.values():
+            journal.close()
+    if errors:
+        raise errors[0]
+    
+    for crawl in crawls:
+        name = crawl.platform.name
+        crawl.print_summary()
+        if crawl.fragments is not None:
+            crawl.fragments.save()
+            crawl.fragments.print_summary()
+        
+        if not saved.get(name):
+            if crawl.journal is not None and len(crawl.journal):
+                print(f"Keeping {crawl.journal.path}; rerun with --resume to skip the campaigns it holds")
+            continue
+        if crawl.journal is not None:
+            crawl.journal.remove()
+        if snapshots is not None:
+            snapshots.record(name, read_table(crawl.platform.table, directory))
+    
+    return saved
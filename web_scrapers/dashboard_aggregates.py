@@ -0,0 +1,106 @@
+import argparse
+import itertools
+import json
+from datetime import datetime, timezone
+import numpy as np
+from campaign_metrics import METRICS, CampaignMetrics, prepare_g2c, prepare_roh
+from table_io import read_table
+
+# Dashboard filter toggles. Every combination gets its own set of aggregates.
+FILTERS = ['completed_only', 'remove_outliers', 'exclude_giving_circles']
+
+# The platform comparison only looks at RoH campaigns for this beneficiary group
+CHILDREN_CATEGORY = 'children-12-years-and-below'
+
+def to_rows(table, decimals=2):
+    """
+    Flatten a metric table to {"columns": [...], "rows": [[...], ...]} for compact JSON
+    """
+    table = table.reset_index()
+    rows = []
+    for record in table.itertuples(index=False):
+        row = []
+        for value in record:
+            if isinstance(value, (float, np.floating)):
+                value = round(float(value), decimals)
+                value = int(value) if value.is_integer() else value
+            elif isinstance(value, (np.integer,)):
+                value = int(value)
+            row.append(value)
+        rows.append(row)
+    return {'columns': list(table.columns), 'rows': rows}
+
+def roh_aggregates(roh, filters):
+    sources = roh.table(['Source Category', 'Year'], **filters)
+    return {
+        'overall': to_rows(roh.table(['Year'], round_overall=True, **filters)),
+        'sourceCategory': to_rows(sources.rename_axis(index={'Source Category': 'Category'})),
+        'primaryCategory': to_rows(roh.table(['Primary Category', 'Year'], **filters)),
+        'monthly': roh.monthly_starts(**filters)
+    }
+
+def platform_aggregates(roh, g2c, filters):
+    """
+    Yearly metrics for RoH children's campaigns and for G2C, as on the platform comparison page.
+    A campaign met its target when its completion percentage is at least 100.
+    """
+    children = roh.table(['Source Category', 'Year'], met='completion', **filters)
+    if CHILDREN_CATEGORY in children.index.get_level_values('Source Category'):
+        children = children.xs(CHILDREN_CATEGORY, level='Source Category')
+    else:
+        children = children.iloc[:0].droplevel('Source Category')
+    
+    return {
+        'Ray of Hope (Children)': to_rows(children),
+        'G2C': to_rows(g2c.table(['Year'], met='completion', **filters))
+    }
+
+def filter_key(completed_only, remove_outliers, exclude_giving_circles):
+    """
+    Name of a filter combination, e.g. 'completed_only+exclude_giving_circles' or 'none'
+    """
+    enabled = [name for name, on in zip(FILTERS, [completed_only, remove_outliers, exclude_giving_circles]) if on]
+    return '+'.join(enabled) or 'none'
+
+def build_aggregates(roh, g2c):
+    roh = CampaignMetrics(prepare_roh(roh))
+    g2c = CampaignMetrics(prepare_g2c(g2c))
+    
+    aggregates = {
+        'generated_at': datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'),
+        'metrics': METRICS,
+        'filters': FILTERS,
+        'sourceCategories': roh.source_categories,
+        'primaryCategories': roh.primary_categories,
+        'data': {}
+    }
+    
+    for flags in itertools.product([False, True], repeat=len(FILTERS)):
+        filters = dict(zip(FILTERS, flags))
+        aggregates['data'][filter_key(*flags)] = {
+            **roh_aggregates(roh, filters),
+            'platforms': platform_aggregates(roh, g2c, filters)
+        }
+    return aggregates
+
+def write_aggregates(output='dashboard_aggregates.json', directory='.'):
+    roh = read_table('ray_of_hope_campaigns_detailed', directory)
+    g2c = read_table('G2C_campaigns', directory)
+    if roh is None or g2c is None:
+        print("Error: ray_of_hope_campaigns_detailed and G2C_campaigns are needed. Run the scrapers first.")
+        return None
+    
+    aggregates = build_aggregates(roh, g2c)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(aggregates, f, separators=(',', ':'))
+    
+    print(f"Aggregates for {len(aggregates['data'])} filter combinations saved to {output}")
+    return aggregates
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precompute the dashboard metrics for every filter combination")
+    parser.add_argument('--output', default='dashboard_aggregates.json', help="JSON file to write")
+    parser.add_argument('--input-dir', default='.', help="directory holding the scraped tables")
+    args = parser.parse_args()
+    
+    write_aggregates(args.output, args.input_dir)
@@ -0,0 +1,138 @@
+import hashlib
+import json
+import os
+import re
+import threading
+
+# Marks a card whose hash is not in the map, so it has to be parsed
+MISSING = object()
+
+# Runs a card is kept for after it was last seen. Pages whose parse result is
+# reused from a ResponseCache are not split, so their cards are not seen.
+KEEP_RUNS = 3
+
+def code_version(*paths):
+    """
+    Hash of the source files the records are extracted by, so a changed parser starts a fresh map
+    """
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+def card_spans(content, tag, class_name):
+    """
+    (start, end) byte offsets of every <tag> element carrying class_name in a
+    raw page, matching the class like BeautifulSoup's find_all(tag, class_=...).
+    Each card ends where its opening tag is closed again, counting nested tags
+    of the same name.
+    """
+    tag_bytes = re.escape(tag.encode('ascii'))
+    start_pattern = re.compile(rb'<' + tag_bytes + rb'\b[^>]*?\bclass\s*=\s*["\'](?:[^"\']*\s)?'
+                               + re.escape(class_name.encode('ascii')) + rb'(?=["\'\s])', re.IGNORECASE)
+    tag_pattern = re.compile(rb'<(/?)' + tag_bytes + rb'\b[^>]*>', re.IGNORECASE)
+    
+    spans = []
+    position = 0
+    while True:
+        start = start_pattern.search(content, position)
+        if start is None:
+            return spans
+        
+        depth = 0
+        for match in tag_pattern.finditer(content, start.start()):
+            depth += -1 if match.group(1) else 1
+            if depth == 0:
+                break
+        else:
+            # Unclosed card: the page is cut off, so leave it to the parser as a whole
+            return None
+        spans.append((start.start(), match.end()))
+        position = match.end()
+
+class FragmentCache:
+    """
+    Records parsed from listing cards in earlier runs, keyed by the hash of each
+    card's raw HTML.
+    
+    split() cuts a page into its cards. Cards whose hash is in the map
+    already have their record, and are cut out of the page, so only the
+    changed cards (and the rest of the page, e.g. its pagination) are parsed.
+    The parser then add()s the records of those cards. save() drops the cards
+    not seen in the last KEEP_RUNS runs, so the map follows the current
+    catalogue instead of growing. Records must be JSON serialisable.
+    """
+    def __init__(self, path, version):
+        self.path = path
+        self.version = version
+        self.lock = threading.Lock()
+        # {digest: [record, number of the run it was last seen in]}
+        self.entries = {}
+        self.run = 0
+        self.load()
+        self.stats = {'cards': 0, 'hits': 0}
+    
+    def load(self):
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return
+        if saved.get('version') != self.version:
+            print(f"Parser changed since {self.path} was saved; parsing every card")
+            return
+        self.entries = saved['entries']
+        self.run = saved['run'] + 1
+    
+    def split(self, content, tag, class_name):
+        """
+        Returns (cards, rest): cards is [(digest, record or MISSING)] in page order,
+        and rest the page without the cards that have a record. Returns None
+        when the cards cannot be told apart in the raw page.
+        """
+        if isinstance(content, str):
+            content = content.encode('utf-8')
+        spans = card_spans(content, tag, class_name)
+        if spans is None:
+            return None
+        
+        cards = []
+        pieces = []
+        position = 0
+        with self.lock:
+            for start, end in spans:
+                digest = hashlib.sha1(content[start:end]).hexdigest()
+                entry = self.entries.get(digest)
+                record = entry[0] if entry is not None else MISSING
+                cards.append((digest, record))
+                if entry is not None:
+                    entry[1] = self.run
+                    pieces.append(content[position:start])
+                    position = end
+            self.stats['cards'] += len(cards)
+            self.stats['hits'] += sum(record is not MISSING for _, record in cards)
+        pieces.append(content[position:])
+        return cards, b''.join(pieces)
+    
+    def add(self, digest, record):
+        with self.lock:
+            self.entries[digest] = [record, self.run]
+    
+    def save(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self.lock:
+            self.entries = {digest: entry for digest, entry in self.entries.items()
+                            if entry[1] > self.run - KEEP_RUNS}
+            saved = {'version': self.version, 'run': self.run, 'entries': self.entries}
+            with open(self.path + '.part', 'w', encoding='utf-8') as f:
+                json.dump(saved, f)
+        os.replace(self.path + '.part', self.path)
+    
+    def print_summary(self):
+        stats = self.stats
+        ratio = stats['hits'] / stats['cards'] if stats['cards'] else 0
+        print(f"Fragments: {stats['cards']} cards, {stats['hits']} unchanged ({ratio:.0%} hit ratio), "
+              f"{stats['cards'] - stats['hits']} parsed; {len(self.entries)} kept in {self.path}")
@@ -0,0 +1,256 @@
+import functools
+import glob
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+import requests
+import run_metrics
+from fragment_cache import code_version
+
+class ResponseCache:
+    """
+    On-disk cache of HTTP response bodies keyed by URL, shared by the scrapers.
+    
+    - Entries younger than `ttl` seconds are served without touching the network.
+    - Older entries are revalidated with If-None-Match / If-Modified-Since; a 304
+      serves the stored body and keeps any parse results stored next to it.
+    - Entries not used for `max_age` seconds are evicted, and the least recently
+      used entries are evicted once the bodies exceed `max_bytes`.
+    """
+    def __init__(self, directory='http_cache', ttl=0, max_age=30 * 24 * 3600, max_bytes=500 * 1024 * 1024):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.stats = {'fresh': 0, 'revalidated': 0, 'downloaded': 0, 'parse_reused': 0}
+        
+        os.makedirs(directory, exist_ok=True)
+        self.total_bytes = sum(meta['size'] for _, meta in self.entries())
+        self.evict()
+    
+    def base_path(self, url):
+        return os.path.join(self.directory, hashlib.sha256(url.encode('utf-8')).hexdigest())
+    
+    def entries(self):
+        """
+        Yield (base path, metadata) for every stored entry
+        """
+        for meta_path in glob.glob(os.path.join(self.directory, '*.meta.json')):
+            try:
+                with open(meta_path, encoding='utf-8') as f:
+                    yield meta_path[:-len('.meta.json')], json.load(f)
+            except (OSError, ValueError):
+                continue
+    
+    def load_meta(self, url):
+        base = self.base_path(url)
+        try:
+            with open(base + '.meta.json', encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        
+        # Metadata without its body is useless for revalidation
+        if meta.get('url') != url or not os.path.exists(base + '.body'):
+            return None
+        return meta
+    
+    def write_json(self, path, data):
+        # Write to a temporary file first so readers never see a partial file
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+    
+    def get(self, url, session=None, headers=None, timeout=10, throttle=None):
+        """
+        GET a URL through the cache. Returns a requests.Response with an extra
+        `from_cache` attribute that is True when the body came from disk.
+        Only requests that reach the network, revalidations included, go
+        through the throttle; a fresh entry neither waits for it nor feeds it.
+        """
+        meta = self.load_meta(url)
+        now = time.time()
+        
+        if meta and now - meta['fetched_at'] < self.ttl:
+            self.count('fresh')
+            return self.cached_response(url, meta, now)
+        
+        request_headers = dict(headers or {})
+        if meta:
+            if meta.get('etag'):
+                request_headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                request_headers['If-Modified-Since'] = meta['last_modified']
+        
+        response = get(url, session, request_headers, timeout, throttle)
+        
+        if response.status_code == 304 and meta:
+            self.count('revalidated')
+            meta['fetched_at'] = now
+            return self.cached_response(url, meta, now)
+        
+        self.count('downloaded')
+        response.from_cache = False
+        if response.status_code == 200:
+            self.store(url, response, now)
+            response.cache_key = url
+        return response
+    
+    def cached_response(self, url, meta, now):
+        base = self.base_path(url)
+        with open(base + '.body', 'rb') as f:
+            body = f.read()
+        
+        meta['used_at'] = now
+        self.write_json(base + '.meta.json', meta)
+        
+        response = requests.Response()
+        response.status_code = 200
+        response._content = body
+        response.url = url
+        response.headers.update(meta.get('headers', {}))
+        response.from_cache = True
+        response.cache_key = url
+        return response
+    
+    def store(self, url, response, now):
+        base = self.base_path(url)
+        old_meta = self.load_meta(url)
+        
+        # A new body invalidates the parse results stored for the old one
+        for parsed_path in glob.glob(base + '.parsed-*.json'):
+            os.remove(parsed_path)
+        
+        tmp_path = f"{base}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(response.content)
+        os.replace(tmp_path, base + '.body')
+        
+        meta = {
+            'url': url,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'headers': {k: v for k, v in response.headers.items() if k.lower() == 'content-type'},
+            'size': len(response.content),
+            'fetched_at': now,
+            'used_at': now
+        }
+        self.write_json(base + '.meta.json', meta)
+        
+        with self.lock:
+            self.total_bytes += meta['size'] - (old_meta['size'] if old_meta else 0)
+            over_budget = self.total_bytes > self.max_bytes
+        if over_budget:
+            self.evict()
+    
+    def parse(self, response, name, parse_fn, version=None):
+        """
+        Return parse_fn(response.content), reusing the stored result when the
+        body came from the cache and was already parsed by the parser `name`
+        at the same code version (default: parser_version(parse_fn)), so a
+        changed parser does not serve results of its old code.
+        Parse results must be JSON serialisable.
+        """
+        key = getattr(response, 'cache_key', None)
+        if key is None:
+            return parse_fn(response.content)
+        
+        if version is None:
+            version = parser_version(parse_fn)
+        parsed_path = f"{self.base_path(key)}.parsed-{name}-{version}.json"
+        if response.from_cache:
+            try:
+                with open(parsed_path, encoding='utf-8') as f:
+                    value = json.load(f)['value']
+                self.count('parse_reused')
+                return value
+            except (OSError, ValueError, KeyError):
+                pass
+        
+        value = parse_fn(response.content)
+        self.write_json(parsed_path, {'value': value})
+        return value
+    
+    def evict(self):
+        """
+        Remove entries older than max_age, then least recently used entries until under max_bytes
+        """
+        now = time.time()
+        with self.lock:
+            entries = sorted(self.entries(), key=lambda entry: entry[1].get('used_at', 0))
+            total = sum(meta['size'] for _, meta in entries)
+            
+            for base, meta in entries:
+                expired = self.max_age is not None and now - meta.get('used_at', 0) > self.max_age
+                if not expired and total <= self.max_bytes:
+                    continue
+                for path in glob.glob(base + '.*'):
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+                total -= meta['size']
+            
+            self.total_bytes = total
+    
+    def count(self, key):
+        with self.lock:
+            self.stats[key] += 1
+    
+    def print_summary(self):
+        stats = self.stats
+        print(f"Cache: {stats['fresh']} fresh, {stats['revalidated']} revalidated (304), "
+              f"{stats['downloaded']} downloaded, {stats['parse_reused']} parses reused")
+
+def get(url, session=None, headers=None, timeout=10, throttle=None):
+    """
+    GET a URL over the network, timed when run metrics are enabled (see run_metrics.py).
+    With an AdaptiveThrottle (rate_limit.py) the request is paced by it and retried on overload.
+    """
+    if throttle is not None:
+        return throttle.call(functools.partial(get, url, session, headers, timeout))
+    if run_metrics.METRICS is not None:
+        return run_metrics.METRICS.get(url, session, headers, timeout)
+    return (session or requests).get(url, headers=headers, timeout=timeout)
+
+def fetch(url, session=None, cache=None, headers=None, timeout=10, throttle=None):
+    """
+    GET a URL, through the cache when one is given. With an AdaptiveThrottle
+    (rate_limit.py) the network requests are paced by it and retried on
+    overload; pages served from the cache without a request skip it.
+    """
+    if cache is not None:
+        return cache.get(url, session, headers=headers, timeout=timeout, throttle=throttle)
+    return get(url, session, headers, timeout, throttle)
+
+@functools.lru_cache(maxsize=None)
+def module_version(module_name):
+    module = sys.modules.get(module_name)
+    path = getattr(module, '__file__', None)
+    return code_version(path) if path else 'unversioned'
+
+def parser_version(parse_fn):
+    """
+    Hash of the source file of the module parse_fn (or the function a partial wraps) is defined in
+    """
+    while isinstance(parse_fn, functools.partial):
+        parse_fn = parse_fn.func
+    return module_version(getattr(parse_fn, '__module__', None))
+
+def parse_response(response, name, parse_fn, cache=None, pool=None):
+    """
+    Parse a response body, reusing a cached parse result when possible.
+    With a ParsePool, the body is parsed in one of its worker processes.
+    """
+    version = parser_version(parse_fn)
+    if pool is not None:
+        parse_fn = functools.partial(pool.parse, parse_fn)
+    with run_metrics.span('parse', parser=name, url=response.url):
+        if cache is not None:
+            return cache.parse(response, name, parse_fn, version)
+        return parse_fn(response.content)
@@ -0,0 +1,73 @@
+import argparse
+import pandas as pd
+from table_io import DATE_FORMATS, SCHEMAS, apply_schema, parse_dates, parse_numbers, read_table, write_table
+
+# Tables holding RoH listing records, whose text fields need cleaning beyond their schema
+ROH_TABLES = ['ray_of_hope_campaigns_all', 'ray_of_hope_campaigns_unique', 'ray_of_hope_campaigns_detailed']
+
+def run_timestamp(run_date=None):
+    """
+    The timestamp a run counts Days Active to: run_date (any date text pandas
+    reads, e.g. '2025-03-13') or else now. Taken once per run, so every row is
+    counted to the same day and a rerun with the same run_date gives the same table.
+    """
+    return pd.Timestamp(run_date) if run_date is not None else pd.Timestamp.now()
+
+def normalize_roh_listing(df):
+    """
+    Clean the types of a batch of scraped RoH listing records
+    """
+    # Clean days to go - extract just the number
+    if not pd.api.types.is_numeric_dtype(df['Days to Go']):
+        df['Days to Go'] = df['Days to Go'].astype('string').str.extract(r'(\d+)', expand=False).astype('Int64')
+    
+    # Convert currency values to numeric (remove commas)
+    df['Amount Raised'] = parse_numbers(df['Amount Raised']).astype('float64')
+    df['Target Amount'] = parse_numbers(df['Target Amount']).astype('float64')
+    
+    # Add completion percentage column
+    df['Completion Percentage'] = (df['Amount Raised'] / df['Target Amount'] * 100).round(2)
+    
+    return df
+
+def days_active(start_dates, run_time):
+    """
+    Whole days from each RoH start date (DD/MM/YYYY text or dates) to the day of run_time, as Int64
+    """
+    start = parse_dates(start_dates, DATE_FORMATS['ray_of_hope_campaigns_detailed']['Start Date'])
+    return (run_time.normalize() - start).dt.days.astype('Int64')
+
+def normalize_table(df, name, run_time=None):
+    """
+    Map a table of either platform to its typed schema in SCHEMAS: amounts and
+    counts from their scraped text to nullable numbers, dates (including G2C's
+    mix of '1 January 2024' and '13 Mar 2025') to datetimes, and RoH's derived
+    columns recomputed, with Days Active counted to run_time (see run_timestamp).
+    """
+    df = df.copy()
+    if name in ROH_TABLES:
+        df = normalize_roh_listing(df)
+    if 'Days Active' in SCHEMAS.get(name, {}) and 'Start Date' in df.columns:
+        df['Days Active'] = days_active(df['Start Date'], run_time if run_time is not None else run_timestamp())
+    return apply_schema(df, name)
+
+def main():
+    parser = argparse.ArgumentParser(description="Rewrite scraped tables with typed columns")
+    parser.add_argument('tables', nargs='+', choices=list(SCHEMAS), help="tables to normalize")
+    parser.add_argument('--input-dir', default='.', help="directory holding the tables")
+    parser.add_argument('--output-dir', default='.', help="directory to write the normalized tables to")
+    parser.add_argument('--run-date', help="date Days Active is counted to (default: today)")
+    parser.add_argument('--no-excel', dest='excel', action='store_false',
+                        help="only write Parquet output, without the Excel export")
+    args = parser.parse_args()
+    
+    run_time = run_timestamp(args.run_date)
+    for name in args.tables:
+        df = read_table(name, args.input_dir)
+        if df is None:
+            print(f"Could not find {name} in {args.input_dir}")
+            continue
+        write_table(normalize_table(df, name, run_time), name, excel=args.excel, directory=args.output_dir)
+
+if __name__ == "__main__":
+    main()
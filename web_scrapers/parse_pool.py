@@ -0,0 +1,118 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+
+def parse_batch(tasks):
+    """
+    Run a batch of (parse_fn, content) in a worker process. Returns one
+    (True, result) or (False, exception) per task, so one bad page does not fail the batch.
+    """
+    results = []
+    for parse_fn, content in tasks:
+        try:
+            results.append((True, parse_fn(content)))
+        except Exception as e:
+            results.append((False, e))
+    return results
+
+class ParsePool:
+    """
+    Pool of worker processes the scrapers hand raw page bodies to for parsing.
+    BeautifulSoup holds the GIL while it parses, so parsing on the fetching
+    threads serializes them on one core; in worker processes it runs on every
+    core while the fetching threads keep the network busy.
+    
+    Fetching threads call parse(parse_fn, content), which blocks until the
+    record dicts come back. A page goes to the workers straight away while one
+    of them is idle. Once all are busy, pages queue up and leave as one batch
+    (of up to batch_size pages) when a worker is free again, so under load the
+    pickling and IPC overhead is paid per batch rather than per page.
+    parse_fn must be picklable (a module-level function, or a functools.partial
+    of one) and return plain data. It runs in another process, so it cannot
+    update state of this one, such as a CampaignIndex or FragmentCache.
+    """
+    def __init__(self, workers=None, batch_size=8):
+        self.workers = workers or os.cpu_count()
+        self.batch_size = batch_size
+        # Spawned rather than forked: the scrapers start workers while their fetching threads run
+        self.executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'))
+        # Reentrant, as a batch that is already done runs its callback in send()
+        self.lock = threading.RLock()
+        self.pending = []
+        self.in_flight = 0
+        self.stats = {'pages': 0, 'batches': 0}
+    
+    def submit(self, parse_fn, content):
+        """
+        Queue a page for parsing. Returns a Future of parse_fn(content).
+        """
+        future = Future()
+        with self.lock:
+            self.pending.append((parse_fn, content, future))
+            if self.in_flight < self.workers or len(self.pending) >= self.batch_size:
+                self.send()
+        return future
+    
+    def parse(self, parse_fn, content):
+        return self.submit(parse_fn, content).result()
+    
+    def flush(self):
+        with self.lock:
+            while self.pending:
+                self.send()
+    
+    def send(self):
+        # Send the pending pages as one batch; must be called with the lock held
+        if not self.pending:
+            return
+        batch, self.pending = self.pending[:self.batch_size], self.pending[self.batch_size:]
+        self.in_flight += 1
+        self.stats['pages'] += len(batch)
+        self.stats['batches'] += 1
+        
+        futures = [future for _, _, future in batch]
+        try:
+            done = self.executor.submit(parse_batch, [(parse_fn, content) for parse_fn, content, _ in batch])
+        except Exception as e:
+            # The pool is broken or shut down; fail the pages instead of leaving their threads waiting
+            self.in_flight -= 1
+            for future in futures:
+                future.set_exception(e)
+            return
+        done.add_done_callback(lambda done: self.deliver(done, futures))
+    
+    def deliver(self, done, futures):
+        # A worker is free again: send the pages that queued up meanwhile
+        with self.lock:
+            self.in_flight -= 1
+            self.send()
+        
+        try:
+            results = done.result()
+        except Exception as e:
+            # The batch never ran, e.g. a worker died or a parse_fn could not be pickled
+            for future in futures:
+                future.set_exception(e)
+            return
+        for future, (ok, value) in zip(futures, results):
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
+    
+    def close(self):
+        self.flush()
+        self.executor.shutdown()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
+    def print_summary(self):
+        stats = self.stats
+        per_batch = stats['pages'] / stats['batches'] if stats['batches'] else 0
+        print(f"Parse pool: {stats['pages']} pages parsed in {stats['batches']} batches "
+              f"({per_batch:.1f} pages per batch) on {self.workers} processes")
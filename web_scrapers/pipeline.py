@@ -0,0 +1,335 @@
+import argparse
+import ast
+import glob
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timezone
+from checkpoint import journal_path
+from dashboard_aggregates import write_aggregates
+from table_io import read_table, write_table
+from normalize import normalize_table, run_timestamp
+import RoH_scraper
+
+# Directory of the scrapers; the scrape stages run them as scripts
+SCRAPERS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# The dashboard's static files, which the export stage updates
+PUBLIC_DIR = os.path.normpath(os.path.join(SCRAPERS_DIR, '..', 'ray-of-hope-analysis', 'public'))
+
+# One stage of the pipeline:
+# - deps: stages whose outputs it reads
+# - code: the scripts it runs; they and every local module they import are part of its key, so editing them reruns it
+# - params: options that change its output, also part of its key
+# - outputs: files it must produce; their contents are what later stages are keyed by
+# - run(inputs, directory, args): produce the outputs in directory, given {dep: its directory}
+# - cached: False for stages that write outside the store and so run every time
+Stage = namedtuple('Stage', ['name', 'deps', 'code', 'params', 'outputs', 'run', 'cached'], defaults=[True])
+
+def run_script(script, arguments, directory):
+    """
+    Run one of the scraper scripts with its working directory set to the stage
+    directory, logging its output to stage.log there
+    """
+    log_path = os.path.join(directory, 'stage.log')
+    with open(log_path, 'w', encoding='utf-8') as log:
+        result = subprocess.run([sys.executable, os.path.join(SCRAPERS_DIR, script), *arguments], cwd=directory,
+                                stdout=log, stderr=subprocess.STDOUT)
+    if result.returncode != 0:
+        raise RuntimeError(f"{script} exited with status {result.returncode} (see {log_path})")
+
+def rate_arguments(args):
+    arguments = []
+    if args.rate:
+        arguments += ['--rate', str(args.rate)]
+    if args.max_rate:
+        arguments += ['--max-rate', str(args.max_rate)]
+    if args.cache_dir:
+        arguments += ['--cache-dir', os.path.abspath(args.cache_dir)]
+    return arguments
+
+def fragment_arguments(args, name):
+    # The fragment cache only saves parsing, so it is not a param: outputs are the same without it
+    if args.fragment_dir:
+        return ['--fragment-cache', os.path.abspath(os.path.join(args.fragment_dir, f'{name}.json'))]
+    return []
+
+def resume_arguments(name, directory):
+    # A journal left in the work directory by an interrupted run is resumed instead of started over
+    if os.path.exists(journal_path(name, directory)):
+        return ['--resume']
+    return []
+
+def run_roh_list(inputs, directory, args):
+    run_script('RoH_scraper.py', ['--no-excel', '--site-url', args.roh_site_url, '--parser', args.parser,
+                                  *rate_arguments(args), *fragment_arguments(args, 'roh')], directory)
+
+def run_roh_dedup(inputs, directory, args):
+    df_all = read_table('ray_of_hope_campaigns_all', inputs['roh_list'])
+    RoH_scraper.save_deduplicated(df_all, excel=False, directory=directory)
+
+def run_roh_detail(inputs, directory, args):
+    run_script('RoH_detail_scraper.py', ['--no-excel', '--input-dir', os.path.abspath(inputs['roh_dedup']),
+                                         '--workers', str(args.workers), *rate_arguments(args),
+                                         *resume_arguments('ray_of_hope_campaigns_detailed', directory)], directory)
+
+def run_g2c_scrape(inputs, directory, args):
+    run_script('G2C_scraper.py', ['--no-excel', '--base-url', args.g2c_base_url, '--workers', str(args.workers),
+                                  *rate_arguments(args), *fragment_arguments(args, 'g2c'),
+                                  *resume_arguments('G2C_campaigns', directory)], directory)
+
+def run_normalize(inputs, directory, args):
+    # Days Active is counted to the run date, so the stage's output only depends on its key
+    run_time = run_timestamp(args.run_date)
+    for name, dep in [('ray_of_hope_campaigns_detailed', 'roh_detail'), ('G2C_campaigns', 'g2c_scrape')]:
+        df = read_table(name, inputs[dep])
+        if df is None or not write_table(normalize_table(df, name, run_time), name, excel=True, directory=directory):
+            raise RuntimeError(f"Could not normalize {name}")
+
+def run_aggregates(inputs, directory, args):
+    if write_aggregates(os.path.join(directory, 'dashboard_aggregates.json'), inputs['normalize']) is None:
+        raise RuntimeError("Could not build the dashboard aggregates")
+
+def run_export(inputs, directory, args):
+    """
+    Copy the dashboard's files into the public/ directory, leaving unchanged files untouched
+    """
+    files = [(inputs['normalize'], 'ray_of_hope_campaigns_detailed.xlsx'), (inputs['normalize'], 'G2C_campaigns.xlsx'),
+             (inputs['aggregates'], 'dashboard_aggregates.json')]
+    for source_dir, filename in files:
+        source = os.path.join(source_dir, filename)
+        target = os.path.join(args.public_dir, filename)
+        if os.path.exists(target) and file_hash(target) == file_hash(source):
+            print(f"{target} is up to date")
+            continue
+        shutil.copyfile(source, target)
+        print(f"Updated {target}")
+    # Record what was exported, so the stage has an output like every other
+    with open(os.path.join(directory, 'exported.json'), 'w', encoding='utf-8') as f:
+        json.dump({filename: file_hash(os.path.join(source_dir, filename)) for source_dir, filename in files}, f)
+
+STAGES = [
+    Stage('roh_list', [], ['RoH_scraper.py'], ['scrape_key', 'roh_site_url', 'parser'],
+          ['ray_of_hope_campaigns_all.parquet'], run_roh_list),
+    Stage('roh_dedup', ['roh_list'], ['RoH_scraper.py'], [],
+          ['ray_of_hope_campaigns_unique.parquet', 'ray_of_hope_campaign_categories.parquet'], run_roh_dedup),
+    Stage('roh_detail', ['roh_dedup'], ['RoH_detail_scraper.py'], ['scrape_key'],
+          ['ray_of_hope_campaigns_detailed.parquet'], run_roh_detail),
+    Stage('g2c_scrape', [], ['G2C_scraper.py'], ['scrape_key', 'g2c_base_url'],
+          ['G2C_campaigns.parquet'], run_g2c_scrape),
+    Stage('normalize', ['roh_detail', 'g2c_scrape'], ['normalize.py'], ['run_date'],
+          ['ray_of_hope_campaigns_detailed.parquet', 'G2C_campaigns.parquet'], run_normalize),
+    Stage('aggregates', ['normalize'], ['dashboard_aggregates.py'], [],
+          ['dashboard_aggregates.json'], run_aggregates),
+    Stage('export', ['normalize', 'aggregates'], [], ['public_dir'], ['exported.json'], run_export, cached=False),
+]
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def local_imports(filenames):
+    """
+    The given source files plus every module of SCRAPERS_DIR they import,
+    directly or through each other, as sorted file names
+    """
+    found = set()
+    pending = list(filenames)
+    while pending:
+        filename = pending.pop()
+        if filename in found:
+            continue
+        found.add(filename)
+        with open(os.path.join(SCRAPERS_DIR, filename), encoding='utf-8') as f:
+            tree = ast.parse(f.read(), filename)
+        # Imports anywhere in the file count, including those inside functions
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                modules = [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom) and not node.level and node.module:
+                modules = [node.module]
+            else:
+                continue
+            for module in modules:
+                local = module.split('.')[0] + '.py'
+                if os.path.exists(os.path.join(SCRAPERS_DIR, local)):
+                    pending.append(local)
+    return sorted(found)
+
+def stage_key(stage, input_hashes, args):
+    """
+    Hash of everything a stage's output depends on: its code, its options and the contents of its inputs
+    """
+    key = {
+        'stage': stage.name,
+        'code': {filename: file_hash(os.path.join(SCRAPERS_DIR, filename)) for filename in local_imports(stage.code)},
+        'params': {param: getattr(args, param) for param in stage.params},
+        'inputs': input_hashes
+    }
+    return hashlib.sha256(json.dumps(key, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+
+class StageStore:
+    """
+    Stage outputs on disk: {root}/{stage}/{key}/ holds the outputs of one run of
+    a stage, plus a manifest with the hash of every output once it finished.
+    A stage whose key already has a manifest is not run again.
+    """
+    def __init__(self, root):
+        self.root = root
+    
+    def directory(self, stage, key):
+        return os.path.join(self.root, stage.name, key)
+    
+    def manifest(self, stage, key):
+        """
+        The manifest of a finished run, or None if there is none with all its outputs in place
+        """
+        directory = self.directory(stage, key)
+        try:
+            with open(os.path.join(directory, 'manifest.json'), encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not all(os.path.exists(os.path.join(directory, filename)) for filename in manifest['outputs']):
+            return None
+        return manifest
+    
+    def run(self, stage, key, inputs, args):
+        """
+        Run a stage into a temporary directory, which becomes the key's directory once every output is there.
+        The temporary directory of an interrupted scrape is kept while it holds
+        the scrape's journal, so the next run of the same key resumes it.
+        """
+        directory = self.directory(stage, key)
+        work = directory + '.part'
+        if not glob.glob(os.path.join(work, '*.journal.jsonl')):
+            shutil.rmtree(work, ignore_errors=True)
+        os.makedirs(work, exist_ok=True)
+        
+        stage.run(inputs, work, args)
+        missing = [filename for filename in stage.outputs if not os.path.exists(os.path.join(work, filename))]
+        if missing:
+            raise RuntimeError(f"{stage.name} did not produce {', '.join(missing)} (see {work})")
+        
+        manifest = {
+            'stage': stage.name,
+            'key': key,
+            'finished_at': datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'),
+            'outputs': {filename: file_hash(os.path.join(work, filename)) for filename in stage.outputs}
+        }
+        with open(os.path.join(work, 'manifest.json'), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+        shutil.rmtree(directory, ignore_errors=True)
+        os.replace(work, directory)
+        return manifest
+
+def run_pipeline(args, stages=STAGES):
+    """
+    Run the stages in dependency order, independent ones in parallel (up to
+    args.jobs at a time). A stage is skipped when the store already holds the
+    outputs for its key, unless it is named in args.force. Stages depending on
+    a failed stage are not run. Returns {stage name: status}.
+    """
+    store = StageStore(args.store)
+    stages = {stage.name: stage for stage in stages}
+    manifests = {}
+    directories = {}
+    status = {}
+    
+    def start(executor, stage):
+        input_hashes = {dep: manifests[dep]['outputs'] for dep in stage.deps}
+        key = stage_key(stage, input_hashes, args)
+        manifest = store.manifest(stage, key)
+        if manifest is not None and stage.cached and stage.name not in args.force:
+            print(f"[{stage.name}] unchanged ({key}), reusing {store.directory(stage, key)}")
+            return None, key, manifest
+        
+        print(f"[{stage.name}] running ({key})")
+        inputs = {dep: directories[dep] for dep in stage.deps}
+        return executor.submit(store.run, stage, key, inputs, args), key, None
+    
+    with ThreadPoolExecutor(max_workers=args.jobs) as executor:
+        running = {}
+        started = {}
+        while True:
+            # Start every stage whose inputs are ready; reused stages may make more ready at once
+            ready = True
+            while ready:
+                ready = False
+                for name, stage in stages.items():
+                    if name in status or name in started or not all(status.get(dep) in ('ran', 'reused')
+                                                                    for dep in stage.deps):
+                        continue
+                    future, key, manifest = start(executor, stage)
+                    directories[name] = store.directory(stage, key)
+                    if future is None:
+                        manifests[name] = manifest
+                        status[name] = 'reused'
+                        ready = True
+                    else:
+                        running[future] = name
+                        started[name] = time.perf_counter()
+            
+            if not running:
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                seconds = time.perf_counter() - started[name]
+                try:
+                    manifests[name] = future.result()
+                    status[name] = 'ran'
+                    print(f"[{name}] finished in {seconds:.1f} s")
+                except Exception as e:
+                    status[name] = 'failed'
+                    print(f"[{name}] failed after {seconds:.1f} s: {e}")
+    
+    for name in stages:
+        status.setdefault(name, 'skipped')
+    print("\nPipeline summary:")
+    for name, result in status.items():
+        print(f"  {name:<12} {result}")
+    return status
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run the whole workflow: list scrape -> dedup -> detail scrape -> normalize -> aggregates -> "
+                    "dashboard export, skipping stages whose code and inputs have not changed")
+    parser.add_argument('--store', default='pipeline_store', help="directory keeping the outputs of every stage")
+    parser.add_argument('--public-dir', default=PUBLIC_DIR, help="the dashboard's public/ directory to export to")
+    parser.add_argument('--scrape-key', default=datetime.now(timezone.utc).strftime('%Y-%m-%d'),
+                        help="scrapes are rerun when this changes; defaults to today's date, so the sites "
+                             "are scraped at most once a day")
+    parser.add_argument('--run-date', default=datetime.now(timezone.utc).strftime('%Y-%m-%d'),
+                        help="date the normalize stage counts Days Active to; defaults to today's date")
+    parser.add_argument('--force', nargs='+', default=[], choices=[stage.name for stage in STAGES],
+                        help="stages to run even if their outputs are up to date")
+    parser.add_argument('--jobs', type=int, default=4, help="stages run in parallel at most")
+    parser.add_argument('--workers', type=int, default=4, help="concurrent page fetches of the detail scrapes")
+    parser.add_argument('--rate', type=float, help="starting requests per second passed to the scrapers")
+    parser.add_argument('--max-rate', type=float, help="highest requests per second passed to the scrapers")
+    parser.add_argument('--parser', choices=RoH_scraper.LISTING_PARSERS, default='html.parser',
+                        help="RoH listing page parser")
+    parser.add_argument('--roh-site-url', default=RoH_scraper.SITE_URL, help="root URL of the Ray of Hope site")
+    parser.add_argument('--g2c-base-url', default="https://www.childrensociety.org.sg/g2c/campaigns/",
+                        help="URL of the first G2C campaign list page")
+    parser.add_argument('--cache-dir', help="HTTP response cache directory shared by the scrapers")
+    parser.add_argument('--fragment-dir',
+                        help="directory of the list scrapers' fragment caches, so reruns only parse the changed "
+                             "listing cards (disabled if omitted)")
+    args = parser.parse_args()
+    
+    status = run_pipeline(args)
+    sys.exit(0 if all(result in ('ran', 'reused') for result in status.values()) else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+from collections import namedtuple
+import pandas as pd
+from table_io import BATCH_SIZE, SCHEMAS, ChunkedTableWriter, batched
+
+# A listing page to crawl. key = (seed, page number) orders the campaigns of all
+# listing pages as a serial crawl would list them; pages with the same seed are
+# one paginated listing. context is whatever the platform's parser needs to know.
+ListingPage = namedtuple('ListingPage', ['url', 'key', 'context'])
+
+class Platform:
+    """
+    Adapter for one charity platform. A platform only describes its pages; the
+    crawl itself (fetching, pacing, retries, per-host limits, journaling) is
+    done by crawl_scheduler.CrawlScheduler, which can crawl several platforms at once.
+    
+    - listing_pages(): the listing pages to start from
+    - known_campaigns(): campaigns listed without crawling, e.g. read from an
+      earlier table; their campaign pages are crawled before any listing
+    - parse_listing(content, page, fragments): {'campaigns': [...], 'page_count':
+      n or None} for a listing page, parsing only the changed cards with a
+      FragmentCache. campaigns is None when the page marks the end of its
+      listing; later pages with the same seed are then left out. The result is
+      stored as a parse result when a ResponseCache is used, so it must be JSON
+      serialisable.
+    - next_pages(page, listing): listing pages to crawl after this one
+    - detail_url(campaign) and parse_detail(content): the campaign page of a
+      listed campaign, if it has one, and the fields read from it
+    - frozen_details(directory) and ended(campaign): details of the previous
+      output that can no longer change, reused by incremental crawls
+    - table and save(): the SCHEMAS table the records are mapped to and written as
+    
+    A new platform subclasses Platform, writes these parsers and adds its table to SCHEMAS.
+    """
+    name = None
+    table = None
+    headers = {}
+    requests_per_second = 2.0
+    timeout = 30
+    # Whether campaign pages are crawled; their details are then journaled
+    details = True
+    # Whether the parsers use state of this process, so pages are never sent to a ParsePool
+    in_process = False
+    
+    def listing_pages(self):
+        raise NotImplementedError
+    
+    def known_campaigns(self):
+        return []
+    
+    def parse_listing(self, content, page, fragments=None):
+        raise NotImplementedError
+    
+    def parse_name(self, kind):
+        # Name the parse results of 'listing' and 'detail' pages are cached under
+        return f"{self.name}-{kind}"
+    
+    def next_pages(self, page, listing):
+        return []
+    
+    def detail_url(self, campaign):
+        return None
+    
+    def parse_detail(self, content):
+        return {}
+    
+    def frozen_details(self, directory='.'):
+        return {}
+    
+    def ended(self, campaign):
+        # Platforms whose listing does not say take the previous output's word for it
+        return True
+    
+    def records(self, campaigns, details):
+        """
+        Full records: each campaign merged with the details of its campaign page
+        """
+        for campaign in campaigns:
+            yield {**campaign, **details.get(self.detail_url(campaign), {})}
+    
+    def save(self, campaigns, details, excel=True, batch_size=BATCH_SIZE, directory='.'):
+        """
+        Write the full records as self.table in directory, with the columns of its
+        schema. campaigns is consumed as the crawl lists them, in listing order;
+        details holds the details of every campaign listed so far.
+        Returns True if the table was saved.
+        """
+        columns = list(SCHEMAS.get(self.table, {})) or None
+        with ChunkedTableWriter(self.table, excel=excel, directory=directory, columns=columns) as writer:
+            for batch in batched(self.records(campaigns, details), batch_size):
+                writer.write(pd.DataFrame(batch, columns=columns))
+        print(f"{self.name}: {writer.rows} campaigns saved to {self.table}")
+        return writer.saved
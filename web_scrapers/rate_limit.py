@@ -0,0 +1,173 @@
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+import requests
+from run_metrics import record_retry, record_sleep
+
+# Responses meaning the server is overloaded or rate limiting us. They slow the
+# throttle down and are retried.
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Request failures treated like an overload response
+RETRY_EXCEPTIONS = (requests.exceptions.ConnectionError, requests.exceptions.Timeout)
+
+class TokenBucket:
+    """
+    Thread-safe token bucket used to pace requests to a host.
+    
+    `rate` tokens are added per second up to `capacity`. Callers reserve a
+    token with reserve(), which returns how long they must wait before sending
+    their request, so the same bucket can be used from threads (time.sleep) and
+    from asyncio code (asyncio.sleep).
+    """
+    def __init__(self, rate, capacity=None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+    
+    def refill(self, now):
+        # Add the tokens earned since the last update; must be called with the lock held
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+    
+    def reserve(self):
+        """
+        Take one token and return the number of seconds to wait before using it
+        """
+        with self.lock:
+            self.refill(time.monotonic())
+            
+            # Tokens can go negative: later callers queue up behind earlier ones
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+    
+    def acquire(self):
+        """
+        Block the current thread until a token is available
+        """
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+            record_sleep(wait, 'rate limit')
+        return wait
+
+def retry_after_seconds(value):
+    """
+    Seconds to wait according to a Retry-After header, which is either a number
+    of seconds or an HTTP date. Returns None if there is no usable value.
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+class AdaptiveThrottle(TokenBucket):
+    """
+    Token bucket whose rate follows the server's responses (additive increase,
+    multiplicative decrease), shared by all requests to one host.
+    
+    - Every healthy response adds increase / rate, so while the server keeps up
+      the rate climbs by about `increase` requests per second every second, up
+      to max_rate (four times the starting rate unless given).
+    - A 429/5xx response, connection error or timeout multiplies the rate by
+      `decrease`, down to min_rate. This happens at most once per second, so the
+      failures of requests that were already in flight count as one.
+    - A Retry-After header holds back every request until the time it names.
+    
+    call() sends a request through the throttle and retries those failures.
+    Without a Retry-After, the n-th retry of a request first waits
+    backoff * 2**(n-1) seconds, like urllib3's Retry(backoff_factor=1).
+    """
+    def __init__(self, rate, max_rate=None, min_rate=0.1, increase=0.5, decrease=0.5, retries=5, backoff=1.0,
+                 max_retry_after=300):
+        super().__init__(rate)
+        self.max_rate = float(max_rate if max_rate is not None else rate * 4)
+        self.min_rate = min(float(min_rate), self.rate)
+        self.increase = increase
+        self.decrease = decrease
+        self.retries = retries
+        self.backoff = backoff
+        self.max_retry_after = max_retry_after
+        self.slowed_at = float('-inf')
+        self.stats = {'slowdowns': 0, 'retries': 0, 'retry_after': 0}
+    
+    def set_rate(self, rate, now):
+        # Settle the tokens earned at the old rate before switching; called with the lock held
+        self.refill(now)
+        self.rate = min(self.max_rate, max(self.min_rate, rate))
+        self.capacity = max(1.0, self.rate)
+    
+    def feedback(self, status=None, retry_after=None):
+        """
+        Adjust the rate after a response with the given status, or after a failed
+        request when status is None. Returns True if the request should be retried.
+        """
+        with self.lock:
+            now = time.monotonic()
+            if status is not None and status not in RETRY_STATUSES:
+                self.set_rate(self.rate + self.increase / self.rate, now)
+                return False
+            
+            if now - self.slowed_at >= 1.0:
+                self.set_rate(self.rate * self.decrease, now)
+                self.slowed_at = now
+                self.stats['slowdowns'] += 1
+            
+            if retry_after is not None:
+                # Spend the tokens of the whole pause, so the next one is earned when it ends
+                self.refill(now)
+                self.tokens = min(self.tokens, 1 - min(retry_after, self.max_retry_after) * self.rate)
+                self.stats['retry_after'] += 1
+            return True
+    
+    def call(self, send):
+        """
+        Wait for a token, then return send(), a function making one request.
+        Overload responses and connection errors are retried up to `retries`
+        times; after that the last response is returned or the error raised.
+        """
+        for attempt in range(self.retries + 1):
+            self.acquire()
+            
+            try:
+                response = send()
+                retry_after = retry_after_seconds(response.headers.get('Retry-After'))
+                if not self.feedback(response.status_code, retry_after) or attempt == self.retries:
+                    return response
+                reason = response.status_code
+            except RETRY_EXCEPTIONS as e:
+                self.feedback(None)
+                if attempt == self.retries:
+                    raise
+                retry_after = None
+                reason = type(e).__name__
+            
+            with self.lock:
+                self.stats['retries'] += 1
+            record_retry(reason)
+            # The server named its own wait, which the throttle already holds every request for
+            if retry_after is None and self.backoff > 0:
+                wait = self.backoff * 2 ** attempt
+                time.sleep(wait)
+                record_sleep(wait, 'backoff')
+    
+    def print_summary(self):
+        stats = self.stats
+        print(f"Throttle: finished at {self.rate:.1f} requests/s, {stats['slowdowns']} slowdowns, "
+              f"{stats['retries']} retries, {stats['retry_after']} Retry-After pauses")
@@ -0,0 +1,238 @@
+import contextlib
+import json
+import socket
+import threading
+import time
+from collections import Counter, defaultdict
+import numpy as np
+import requests
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+# The RunMetrics collecting this run's timings, or None while metrics are disabled.
+# Every hook checks this first, so a disabled run costs one global lookup per call.
+METRICS = None
+
+# Connection timings of the request being sent on each thread
+current = threading.local()
+
+# Phases of a request, in order, as reported in the summary
+REQUEST_PHASES = ['dns', 'connect', 'ttfb', 'download']
+
+class TimedConnectionMixin:
+    """
+    Adds DNS and connect (TCP + TLS) times of new connections to the current
+    thread's request timings. Reused keep-alive connections add nothing.
+    """
+    def _new_conn(self):
+        timing = getattr(current, 'timing', None)
+        if timing is None:
+            return super()._new_conn()
+        
+        host = self._dns_host
+        start = time.perf_counter()
+        try:
+            address = socket.getaddrinfo(host, self.port, 0, socket.SOCK_STREAM)[0][4][0]
+        except OSError:
+            # Let urllib3 resolve again and raise its usual error
+            address = host
+        timing['dns'] += time.perf_counter() - start
+        
+        # Connect to the resolved address so the name is only looked up once
+        self._dns_host = address
+        try:
+            return super()._new_conn()
+        finally:
+            self._dns_host = host
+    
+    def connect(self):
+        timing = getattr(current, 'timing', None)
+        start = time.perf_counter()
+        try:
+            super().connect()
+        finally:
+            if timing is not None:
+                timing['connect'] += time.perf_counter() - start
+
+class TimedHTTPConnection(TimedConnectionMixin, HTTPConnection):
+    pass
+
+class TimedHTTPSConnection(TimedConnectionMixin, HTTPSConnection):
+    pass
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+TIMED_POOL_CLASSES = {'http': TimedHTTPConnectionPool, 'https': TimedHTTPSConnectionPool}
+
+def instrument_session(session):
+    # Pools are created on first use, so this has to run before the session's first request
+    for adapter in session.adapters.values():
+        poolmanager = getattr(adapter, 'poolmanager', None)
+        if poolmanager is not None and poolmanager.pool_classes_by_scheme is not TIMED_POOL_CLASSES:
+            poolmanager.pool_classes_by_scheme = TIMED_POOL_CLASSES
+
+class RunMetrics:
+    """
+    Timings of one scraper run: every request (DNS, connect, time to first byte,
+    download, bytes, status), every parse, save and sleep, and a count of the
+    requests the throttle retried.
+    
+    Each event is appended to a JSON-lines trace when trace_path is given, and
+    print_summary() reports totals and p50/p99 per phase at the end of the run.
+    """
+    def __init__(self, trace_path=None):
+        self.trace_path = trace_path
+        self.trace = open(trace_path, 'w', encoding='utf-8') if trace_path else None
+        self.lock = threading.Lock()
+        self.started = time.perf_counter()
+        self.durations = defaultdict(list)
+        self.statuses = Counter()
+        self.bytes = 0
+        self.retries = 0
+    
+    def write(self, event):
+        if self.trace is not None:
+            event = {'t': round(time.perf_counter() - self.started, 6), 'thread': threading.get_ident(), **event}
+            self.trace.write(json.dumps(event) + '\n')
+    
+    def get(self, url, session=None, headers=None, timeout=10):
+        """
+        requests GET of url, recording its timings
+        """
+        if session is None:
+            # Same as requests.get, but with a session whose connections can be timed
+            with requests.Session() as session:
+                return self.get(url, session, headers, timeout)
+        
+        instrument_session(session)
+        timing = current.timing = {'dns': 0.0, 'connect': 0.0}
+        start = time.perf_counter()
+        try:
+            response = session.get(url, headers=headers, timeout=timeout)
+        except requests.exceptions.RequestException as e:
+            with self.lock:
+                self.statuses[type(e).__name__] += 1
+                self.write({'event': 'request', 'url': url, 'error': str(e),
+                            'total_ms': round((time.perf_counter() - start) * 1000, 3)})
+            raise
+        finally:
+            current.timing = None
+        total = time.perf_counter() - start
+        
+        # elapsed runs from sending the request to parsing the response headers;
+        # requests reads the body after that
+        elapsed = response.elapsed.total_seconds()
+        connect = max(timing['connect'] - timing['dns'], 0.0)
+        phases = {
+            'dns': timing['dns'],
+            'connect': connect,
+            'ttfb': max(elapsed - timing['connect'], 0.0),
+            'download': max(total - elapsed, 0.0)
+        }
+        size = len(response.content)
+        
+        with self.lock:
+            for phase, seconds in phases.items():
+                self.durations[phase].append(seconds)
+            self.durations['request'].append(total)
+            self.statuses[response.status_code] += 1
+            self.bytes += size
+            self.write({
+                'event': 'request', 'url': url, 'status': response.status_code, 'bytes': size,
+                **{f'{phase}_ms': round(seconds * 1000, 3) for phase, seconds in phases.items()},
+                'total_ms': round(total * 1000, 3)
+            })
+        return response
+    
+    def add(self, kind, seconds, **fields):
+        """
+        Record `seconds` spent on a parse, save or sleep
+        """
+        with self.lock:
+            self.durations[kind].append(seconds)
+            self.write({'event': kind, 'ms': round(seconds * 1000, 3), **fields})
+    
+    def add_retry(self, reason=None):
+        """
+        Count a request that is sent again, e.g. after a 503 or a timeout
+        """
+        with self.lock:
+            self.retries += 1
+            self.write({'event': 'retry', 'reason': reason})
+    
+    def close(self):
+        if self.trace is not None:
+            self.trace.close()
+            self.trace = None
+    
+    def print_summary(self):
+        wall = time.perf_counter() - self.started
+        requests_made = len(self.durations['request'])
+        statuses = ', '.join(f"{status}: {count}" for status, count in sorted(self.statuses.items(), key=str))
+        
+        print(f"\nRun metrics ({wall:.1f} s wall time)")
+        print(f"Requests: {requests_made} ({statuses or 'none'}), {self.retries} retries, "
+              f"{self.bytes / 1024:,.0f} KB downloaded")
+        print(f"{'Phase':<10} {'Count':>7} {'Total s':>9} {'Mean ms':>9} {'p50 ms':>9} {'p99 ms':>9}")
+        for kind in REQUEST_PHASES + ['request'] + sorted(set(self.durations) - set(REQUEST_PHASES) - {'request'}):
+            durations = np.array(self.durations.get(kind, [])) * 1000
+            if not len(durations):
+                continue
+            print(f"{kind:<10} {len(durations):>7} {durations.sum() / 1000:>9.2f} {durations.mean():>9.1f} "
+                  f"{np.percentile(durations, 50):>9.1f} {np.percentile(durations, 99):>9.1f}")
+        if self.trace_path:
+            print(f"Trace written to {self.trace_path}")
+
+def enable(trace_path=None):
+    """
+    Start collecting metrics for this run, optionally writing a JSON-lines trace
+    """
+    global METRICS
+    METRICS = RunMetrics(trace_path)
+    return METRICS
+
+def finish(summary=True):
+    """
+    Close the trace, print the summary unless summary=False, and stop collecting
+    """
+    global METRICS
+    if METRICS is not None:
+        METRICS.close()
+        if summary:
+            METRICS.print_summary()
+        METRICS = None
+
+@contextlib.contextmanager
+def span(kind, **fields):
+    """
+    Time the body of a with-block as a `kind` event ('parse', 'save', ...)
+    """
+    metrics = METRICS
+    if metrics is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.add(kind, time.perf_counter() - start, **fields)
+
+def record_sleep(seconds, reason=None):
+    """
+    Record time a scraper waited, e.g. for a rate limiter, without sleeping itself
+    """
+    metrics = METRICS
+    if metrics is not None and seconds > 0:
+        metrics.add('sleep', seconds, reason=reason)
+
+def record_retry(reason=None):
+    """
+    Record a request the scraper is about to send again, with the status or error that caused it
+    """
+    metrics = METRICS
+    if metrics is not None:
+        metrics.add_retry(reason)
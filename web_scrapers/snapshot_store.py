@@ -0,0 +1,210 @@
+import argparse
+import sqlite3
+from datetime import datetime, timezone
+import pandas as pd
+
+# Progress values kept for every campaign, and the column each platform's table stores them in
+PLATFORM_COLUMNS = {
+    'roh': {
+        'Title': 'Title',
+        'Amount Raised': 'Amount Raised',
+        'Target Amount': 'Target Amount',
+        'Number of Donors': 'Number of Donors',
+        'Days Left': 'Days to Go'
+    },
+    'g2c': {
+        'Title': 'Campaign Title',
+        'Amount Raised': 'Amount Raised',
+        'Target Amount': 'Target Amount',
+        'Number of Donors': 'Number of Donors',
+        'Days Left': 'Days Left'
+    }
+}
+
+# Snapshot columns in the database, in the order of SNAPSHOT_FIELDS
+SNAPSHOT_FIELDS = ['Amount Raised', 'Target Amount', 'Number of Donors', 'Days Left']
+SNAPSHOT_COLUMNS = ['amount_raised', 'target_amount', 'donors', 'days_left']
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY,
+    platform TEXT NOT NULL,
+    scraped_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_by_date ON runs (platform, scraped_at);
+
+CREATE TABLE IF NOT EXISTS campaigns (
+    campaign_id INTEGER PRIMARY KEY,
+    platform TEXT NOT NULL,
+    url TEXT NOT NULL,
+    title TEXT,
+    first_run INTEGER NOT NULL,
+    last_run INTEGER NOT NULL,
+    UNIQUE (platform, url)
+);
+CREATE INDEX IF NOT EXISTS campaigns_by_url ON campaigns (url);
+
+CREATE TABLE IF NOT EXISTS snapshots (
+    campaign_id INTEGER NOT NULL,
+    run_id INTEGER NOT NULL,
+    amount_raised REAL,
+    target_amount REAL,
+    donors INTEGER,
+    days_left INTEGER,
+    PRIMARY KEY (campaign_id, run_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS snapshots_by_run ON snapshots (run_id);
+"""
+
+def to_python(value):
+    """
+    Convert a pandas/NumPy cell to a value SQLite accepts, with missing values as None
+    """
+    if pd.isna(value):
+        return None
+    return value.item() if hasattr(value, 'item') else value
+
+class SnapshotStore:
+    """
+    Append-only SQLite history of campaign progress, keyed by (platform, URL, scrape time).
+    
+    Every call to record() is one run. A campaign only gets a new snapshot row when one
+    of its values changed since its previous snapshot, so repeated runs over mostly
+    closed campaigns add almost nothing. Values missing from a run (e.g. donors in the
+    RoH listing) carry over from the previous snapshot instead of counting as a change.
+    """
+    def __init__(self, path='campaign_snapshots.sqlite'):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(SCHEMA)
+    
+    def close(self):
+        self.conn.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+    
+    def latest_values(self, platform):
+        """
+        Return {url: [values in SNAPSHOT_COLUMNS order]} from each campaign's newest snapshot
+        """
+        rows = self.conn.execute(f"""
+            SELECT c.url, {', '.join('s.' + column for column in SNAPSHOT_COLUMNS)}
+            FROM campaigns c
+            JOIN snapshots s ON s.campaign_id = c.campaign_id
+            WHERE c.platform = ?
+              AND s.run_id = (SELECT MAX(run_id) FROM snapshots WHERE campaign_id = c.campaign_id)
+        """, (platform,))
+        return {row[0]: list(row[1:]) for row in rows}
+    
+    def record(self, platform, campaigns, scraped_at=None):
+        """
+        Record one run of a platform's campaigns table (a DataFrame using that
+        platform's column names, see PLATFORM_COLUMNS). Rows are written in batches
+        inside a single transaction. Returns (run_id, number of snapshot rows added).
+        """
+        columns = PLATFORM_COLUMNS[platform]
+        scraped_at = scraped_at or datetime.now(timezone.utc)
+        scraped_at = pd.Timestamp(scraped_at).strftime('%Y-%m-%dT%H:%M:%S')
+        
+        last = self.conn.execute("SELECT MAX(scraped_at) FROM runs WHERE platform = ?", (platform,)).fetchone()[0]
+        if last is not None and scraped_at < last:
+            raise ValueError(f"Snapshots are append-only: {scraped_at} is before the last {platform} run at {last}")
+        
+        campaigns = campaigns[campaigns['URL'].notna() & (campaigns['URL'] != "Unknown")].drop_duplicates('URL')
+        urls = [to_python(url) for url in campaigns['URL']]
+        titles = [to_python(title) for title in campaigns[columns['Title']]] if columns['Title'] in campaigns else [None] * len(urls)
+        values = [
+            [to_python(value) for value in campaigns[columns[field]]] if columns[field] in campaigns else [None] * len(urls)
+            for field in SNAPSHOT_FIELDS
+        ]
+        
+        previous = self.latest_values(platform)
+        
+        with self.conn:
+            run_id = self.conn.execute(
+                "INSERT INTO runs (platform, scraped_at) VALUES (?, ?)", (platform, scraped_at)
+            ).lastrowid
+            
+            self.conn.executemany("""
+                INSERT INTO campaigns (platform, url, title, first_run, last_run) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (platform, url) DO UPDATE SET
+                    title = COALESCE(excluded.title, title),
+                    last_run = excluded.last_run
+            """, [(platform, url, title, run_id, run_id) for url, title in zip(urls, titles)])
+            
+            campaign_ids = dict(self.conn.execute(
+                "SELECT url, campaign_id FROM campaigns WHERE platform = ? AND last_run = ?", (platform, run_id)
+            ))
+            
+            rows = []
+            for i, url in enumerate(urls):
+                old = previous.get(url)
+                new = [value[i] for value in values]
+                if old is not None:
+                    new = [o if n is None else n for n, o in zip(new, old)]
+                    if new == old:
+                        continue
+                rows.append((campaign_ids[url], run_id, *new))
+            
+            self.conn.executemany(
+                f"INSERT INTO snapshots (campaign_id, run_id, {', '.join(SNAPSHOT_COLUMNS)}) VALUES (?, ?, ?, ?, ?, ?)",
+                rows
+            )
+        
+        print(f"Snapshot run {run_id} ({platform}, {scraped_at}): {len(urls)} campaigns, {len(rows)} changed")
+        return run_id, len(rows)
+    
+    def progress(self, url, platform=None, every_run=False):
+        """
+        Return a campaign's progress curve as a DataFrame with a 'Scraped At' column
+        and the SNAPSHOT_FIELDS, oldest first.
+        
+        By default there is one row per change. With every_run=True there is one row
+        per run of the platform from the campaign's first to its last appearance,
+        carrying values forward over runs where nothing changed.
+        """
+        query = "SELECT campaign_id, platform, first_run, last_run FROM campaigns WHERE url = ?"
+        params = [url]
+        if platform is not None:
+            query += " AND platform = ?"
+            params.append(platform)
+        found = self.conn.execute(query, params).fetchone()
+        
+        columns = ['Scraped At'] + SNAPSHOT_FIELDS
+        if found is None:
+            return pd.DataFrame(columns=columns)
+        campaign_id, platform, first_run, last_run = found
+        
+        changes = pd.read_sql_query(f"""
+            SELECT s.run_id, r.scraped_at, {', '.join('s.' + column for column in SNAPSHOT_COLUMNS)}
+            FROM snapshots s JOIN runs r ON r.run_id = s.run_id
+            WHERE s.campaign_id = ?
+            ORDER BY s.run_id
+        """, self.conn, params=(campaign_id,))
+        
+        if every_run:
+            runs = pd.read_sql_query(
+                "SELECT run_id, scraped_at FROM runs WHERE platform = ? AND run_id BETWEEN ? AND ? ORDER BY run_id",
+                self.conn, params=(platform, first_run, last_run)
+            )
+            changes = pd.merge_asof(runs, changes.drop(columns='scraped_at'), on='run_id')
+        
+        changes = changes.rename(columns=dict(zip(['scraped_at'] + SNAPSHOT_COLUMNS, columns)))
+        changes['Scraped At'] = pd.to_datetime(changes['Scraped At'])
+        changes['Number of Donors'] = changes['Number of Donors'].astype('Int64')
+        changes['Days Left'] = changes['Days Left'].astype('Int64')
+        return changes[columns].reset_index(drop=True)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Show a campaign's progress from the snapshot store")
+    parser.add_argument('url', help="campaign URL")
+    parser.add_argument('--db', default='campaign_snapshots.sqlite', help="snapshot database file")
+    parser.add_argument('--every-run', action='store_true', help="one row per run instead of one row per change")
+    args = parser.parse_args()
+    
+    with SnapshotStore(args.db) as store:
+        print(store.progress(args.url, every_run=args.every_run).to_string(index=False))
@@ -0,0 +1,381 @@
+import itertools
+import os
+import pandas as pd
+from run_metrics import span
+
+# Explicit column types for every table passed between the pipeline stages.
+# 'date' columns are stored as real dates in Parquet and written back in their
+# text format (DATE_FORMATS) when exported to Excel/CSV. 'category' columns are
+# stored as dictionary-encoded strings and read back as categoricals.
+ROH_LISTING_COLUMNS = {
+    'Title': 'string',
+    'Days to Go': 'Int64',
+    'Amount Raised': 'float64',
+    'Target Amount': 'float64',
+    'Categories': 'string',
+    'URL': 'string',
+    'Source Category': 'string',
+    'Completion Percentage': 'float64'
+}
+
+SCHEMAS = {
+    'ray_of_hope_campaigns_all': ROH_LISTING_COLUMNS,
+    'ray_of_hope_campaigns_unique': {**ROH_LISTING_COLUMNS, 'Category Appearances': 'Int64'},
+    'ray_of_hope_campaign_categories': {'URL': 'string', 'Source Category': 'category'},
+    'ray_of_hope_campaigns_detailed': {
+        **ROH_LISTING_COLUMNS,
+        'Category Appearances': 'Int64',
+        'Start Date': 'date',
+        'Number of Donors': 'Int64',
+        'Days Active': 'Int64'
+    },
+    'G2C_campaigns': {
+        'Campaign Title': 'string',
+        'URL': 'string',
+        'Start Date': 'date',
+        'End Date': 'date',
+        'Percentage Completion': 'float64',
+        'Number of Donors': 'Int64',
+        'Amount Raised': 'float64',
+        'Target Amount': 'float64',
+        'Days Left': 'Int64'
+    }
+}
+
+# Text formats of the 'date' columns of each table, as scraped from the sites.
+# Text dates are read with each format in turn; exports use the first.
+G2C_DATE_FORMATS = ['%d %b %Y', '%d %B %Y']
+
+DATE_FORMATS = {
+    'ray_of_hope_campaigns_detailed': {'Start Date': ['%d/%m/%Y']},
+    # G2C pages mix '1 January 2024' and '13 Mar 2025'
+    'G2C_campaigns': {'Start Date': G2C_DATE_FORMATS, 'End Date': G2C_DATE_FORMATS}
+}
+
+def parse_numbers(values):
+    """
+    Numbers from a column of scraped text like '1,234.50', or of numbers already
+    parsed (as in records from earlier runs). Unreadable values become NaN.
+    """
+    if pd.api.types.is_numeric_dtype(values):
+        return values
+    return pd.to_numeric(values.astype('string').str.replace(',', '', regex=False), errors='coerce')
+
+def parse_dates(values, formats):
+    """
+    Datetimes from a column of text dates in any of `formats`, each distinct text
+    being parsed once: histories repeat the same dates across many rows.
+    """
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values
+    codes, uniques = pd.factorize(values)
+    if len(uniques) and isinstance(uniques[0], str):
+        uniques = pd.Series(uniques, dtype='string')
+        parsed = pd.Series(pd.NaT, index=uniques.index, dtype='datetime64[ns]')
+        for date_format in formats:
+            missing = parsed.isna()
+            parsed[missing] = pd.to_datetime(uniques[missing], format=date_format, errors='coerce')
+    else:
+        # Dates read back from Parquet come as datetime.date objects
+        parsed = pd.to_datetime(pd.Series(uniques, dtype=object), errors='coerce')
+    # Missing values have code -1, which picks the trailing NaT
+    parsed = pd.DatetimeIndex(parsed).append(pd.DatetimeIndex([pd.NaT]))
+    return pd.Series(parsed[codes], index=values.index)
+
+def apply_schema(df, name):
+    """
+    Cast the columns of a table to its schema. Columns not in the schema are left as they are.
+    """
+    df = df.copy()
+    for column, dtype in SCHEMAS.get(name, {}).items():
+        if column not in df.columns:
+            continue
+        if dtype == 'date':
+            df[column] = parse_dates(df[column], DATE_FORMATS[name][column])
+        elif dtype == 'category':
+            # Keep the categories (and their codes) of a column that is already categorical
+            if not isinstance(df[column].dtype, pd.CategoricalDtype):
+                df[column] = df[column].astype('category')
+        elif dtype == 'Int64':
+            df[column] = parse_numbers(df[column]).astype('Int64')
+        elif dtype == 'float64':
+            df[column] = parse_numbers(df[column]).astype('float64')
+        else:
+            df[column] = df[column].astype(dtype)
+    return df
+
+def arrow_schema(df, name):
+    """
+    Arrow schema for a table: the explicit types from SCHEMAS, inferred types for other columns
+    """
+    import pyarrow as pa
+    
+    arrow_types = {'string': pa.string(), 'Int64': pa.int64(), 'float64': pa.float64(), 'date': pa.date32()}
+    inferred = pa.Schema.from_pandas(df, preserve_index=False)
+    schema = SCHEMAS.get(name, {})
+    fields = [
+        pa.field(field.name, arrow_types[schema[field.name]]) if schema.get(field.name) in arrow_types else field
+        for field in inferred
+    ]
+    return pa.schema(fields, metadata=inferred.metadata)
+
+def write_parquet(df, name, directory='.'):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    
+    df = apply_schema(df, name)
+    table = pa.Table.from_pandas(df, preserve_index=False).cast(arrow_schema(df, name))
+    path = os.path.join(directory, f"{name}.parquet")
+    pq.write_table(table, path)
+    return path
+
+def export_text_dates(df, name):
+    """
+    Format 'date' columns back to their scraped text so Excel/CSV files look as before
+    """
+    df = df.copy()
+    for column, dtype in SCHEMAS.get(name, {}).items():
+        if dtype == 'date' and column in df.columns and pd.api.types.is_datetime64_any_dtype(df[column]):
+            df[column] = df[column].dt.strftime(DATE_FORMATS[name][column][0])
+    return df
+
+def write_table(df, name, excel=True, csv=False, directory='.'):
+    """
+    Save a pipeline table as {name}.parquet, plus optional {name}.xlsx/{name}.csv exports.
+    Falls back to CSV when Parquet or Excel cannot be written.
+    Returns True if the data was saved in at least one format.
+    """
+    saved = False
+    csv_path = os.path.join(directory, f"{name}.csv")
+    
+    try:
+        with span('save', table=name, format='parquet'):
+            path = write_parquet(df, name, directory)
+        print(f"Data saved to {path}")
+        saved = True
+    except ImportError:
+        print("pyarrow is not installed; skipping Parquet output (pip install pyarrow)")
+        csv = True
+    except Exception as e:
+        print(f"Error saving Parquet file: {e}")
+        csv = True
+    
+    export_df = export_text_dates(apply_schema(df, name), name) if (excel or csv) else None
+    
+    if excel:
+        xlsx_path = os.path.join(directory, f"{name}.xlsx")
+        try:
+            with span('save', table=name, format='xlsx'):
+                export_df.to_excel(xlsx_path, index=False)
+            print(f"Data saved to {xlsx_path}")
+            saved = True
+        except Exception as e:
+            print(f"Error saving Excel file: {e}")
+            csv = True
+    
+    if csv:
+        try:
+            with span('save', table=name, format='csv'):
+                export_df.to_csv(csv_path, index=False)
+            print(f"Data saved to {csv_path}")
+            saved = True
+        except Exception as e:
+            print(f"Error saving CSV file: {e}")
+    
+    return saved
+
+# Records per batch of the streaming pipelines
+BATCH_SIZE = 500
+
+def batched(records, size=BATCH_SIZE):
+    """
+    Yield lists of up to `size` records from any iterable, consuming it lazily
+    """
+    iterator = iter(records)
+    while batch := list(itertools.islice(iterator, size)):
+        yield batch
+
+def excel_value(value):
+    # openpyxl only takes plain Python values, with missing values as empty cells
+    if pd.isna(value):
+        return None
+    return value.item() if hasattr(value, 'item') else value
+
+class ChunkedTableWriter:
+    """
+    Write a pipeline table one batch at a time, for tables that never have to be
+    in memory as a whole: {name}.parquet gets one row group per batch, and the
+    optional {name}.xlsx/{name}.csv exports are appended row by row (Excel in
+    openpyxl's write-only mode). The output matches write_table().
+    
+    Every batch is cast to the table's schema and reindexed to `columns` (by
+    default the columns of the first batch). Files are written under a .part
+    name and only replace the previous output in close(), so a run that fails
+    halfway leaves the last complete table in place. Use it as a context
+    manager, or call close() (or abort()) when done.
+    """
+    def __init__(self, name, excel=False, csv=False, directory='.', columns=None):
+        self.name = name
+        self.directory = directory
+        self.columns = columns
+        self.excel = excel
+        self.csv = csv
+        self.rows = 0
+        self.parquet = None
+        self.workbook = None
+        self.paths = {}
+        self.failed = set()
+        self.saved = False
+    
+    def part_path(self, format):
+        path = os.path.join(self.directory, f"{self.name}.{format}")
+        self.paths[format] = path
+        return path + '.part'
+    
+    def write(self, df):
+        """
+        Append a batch of rows (a DataFrame) to every output format
+        """
+        if self.columns is None:
+            self.columns = list(df.columns)
+        df = apply_schema(df.reindex(columns=self.columns), self.name)
+        
+        if 'parquet' not in self.failed:
+            try:
+                with span('save', table=self.name, format='parquet'):
+                    self.write_parquet(df)
+            except ImportError:
+                print("pyarrow is not installed; skipping Parquet output (pip install pyarrow)")
+                self.fail('parquet')
+            except Exception as e:
+                print(f"Error saving Parquet file: {e}")
+                self.fail('parquet')
+        
+        if (self.excel or self.csv) and len(df):
+            export_df = export_text_dates(df, self.name)
+            if self.excel and 'xlsx' not in self.failed:
+                try:
+                    with span('save', table=self.name, format='xlsx'):
+                        self.write_excel(export_df)
+                except Exception as e:
+                    print(f"Error saving Excel file: {e}")
+                    self.fail('xlsx')
+            if self.csv and 'csv' not in self.failed:
+                try:
+                    with span('save', table=self.name, format='csv'):
+                        self.write_csv(export_df)
+                except Exception as e:
+                    print(f"Error saving CSV file: {e}")
+                    self.fail('csv')
+        
+        self.rows += len(df)
+    
+    def fail(self, format):
+        # Drop the partial file of a format that could not be written
+        self.failed.add(format)
+        if format == 'parquet' and self.parquet is not None:
+            try:
+                self.parquet.close()
+            except Exception:
+                pass
+        if format == 'xlsx':
+            self.workbook = None
+        path = self.paths.get(format)
+        if path is not None and os.path.exists(path + '.part'):
+            os.remove(path + '.part')
+        
+        # Like write_table, fall back to CSV, which only holds every row if nothing was written yet
+        if format != 'csv' and not self.csv:
+            if self.rows:
+                print(f"Cannot fall back to CSV after {self.rows} rows; {self.name}.{format} is not saved")
+            else:
+                self.csv = True
+    
+    def write_parquet(self, df):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        
+        if self.parquet is None:
+            self.schema = arrow_schema(df, self.name)
+            self.parquet = pq.ParquetWriter(self.part_path('parquet'), self.schema)
+        self.parquet.write_table(pa.Table.from_pandas(df, preserve_index=False).cast(self.schema))
+    
+    def write_excel(self, df):
+        from openpyxl import Workbook
+        
+        if self.workbook is None:
+            self.part_path('xlsx')
+            self.workbook = Workbook(write_only=True)
+            self.sheet = self.workbook.create_sheet('Sheet1')
+            self.sheet.append(list(df.columns))
+        for row in df.itertuples(index=False):
+            self.sheet.append([excel_value(value) for value in row])
+    
+    def write_csv(self, df):
+        first = 'csv' not in self.paths
+        path = self.part_path('csv')
+        df.to_csv(path, index=False, header=first, mode='w' if first else 'a')
+    
+    def close(self):
+        """
+        Finish every file and move it into place. Returns True if the table was
+        saved in at least one format.
+        """
+        if self.parquet is not None and 'parquet' not in self.failed:
+            self.parquet.close()
+        if self.workbook is not None:
+            with span('save', table=self.name, format='xlsx'):
+                self.workbook.save(self.paths['xlsx'] + '.part')
+            self.workbook = None
+        
+        saved = False
+        for format, path in self.paths.items():
+            if format not in self.failed and os.path.exists(path + '.part'):
+                os.replace(path + '.part', path)
+                print(f"Data saved to {path}")
+                saved = True
+        self.paths = {}
+        return saved
+    
+    def abort(self):
+        """
+        Remove the partly written files, keeping any previous output
+        """
+        if self.parquet is not None and 'parquet' not in self.failed:
+            self.parquet.close()
+        self.workbook = None
+        for path in self.paths.values():
+            if os.path.exists(path + '.part'):
+                os.remove(path + '.part')
+        self.paths = {}
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, *exc):
+        if exc_type is None:
+            self.saved = self.close()
+        else:
+            self.abort()
+
+def table_exists(name, directory='.'):
+    return any(os.path.exists(os.path.join(directory, f"{name}.{ext}")) for ext in ('parquet', 'xlsx', 'csv'))
+
+def read_table(name, directory='.'):
+    """
+    Load a pipeline table, preferring Parquet over Excel over CSV.
+    Returns None if no version of the table exists.
+    """
+    base = os.path.join(directory, name)
+    
+    if os.path.exists(base + '.parquet'):
+        try:
+            return apply_schema(pd.read_parquet(base + '.parquet'), name)
+        except ImportError:
+            print("pyarrow is not installed; reading the Excel/CSV version instead")
+    
+    if os.path.exists(base + '.xlsx'):
+        return apply_schema(pd.read_excel(base + '.xlsx'), name)
+    if os.path.exists(base + '.csv'):
+        return apply_schema(pd.read_csv(base + '.csv'), name)
+    return None